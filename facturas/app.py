@@ -1,74 +1,147 @@
-from io_utils import ensure_files_exist
-import inventory as inv
-import invoices as fac
-
-def menu_inventory():
-    while True:
-        print("\n=== Menu del Inventario ===")
-        print("1. Añadir producto")
-        print("2. Listar productos")
-        print("3. Buscar producto")
-        print("4. Actualizar precio o stock")
-        print("5. Eliminar producto")
-        print("0. Volver")
-        opt = input("Opcion: ").strip()
-        if opt == "1":
-            inv.add_product()
-        elif opt == "2":
-            inv.list_products()
-        elif opt == "3":
-            inv.search_product()
-        elif opt == "4":
-            inv.update_product()
-        elif opt == "5":
-            inv.delete_product()
-        elif opt == "0":
-            break
-        else:
-            print("Opcion invalida.")
-
-def menu_invoices():
-    while True:
-        print("\n=== Menu Facturas ===")
-        print("1. Crear nueva factura")
-        print("2. Listar facturas")
-        print("3. Mostrar detalle de factura")
-        print("4. Editar elementos de factura")
-        print("5. Eliminar una factura")
-        print("0. Volver")
-        opt = input("Opcion: ").strip()
-        if opt == "1":
-            fac.create_invoice()
-        elif opt == "2":
-            fac.list_invoices()
-        elif opt == "3":
-            fac.show_invoice_detail()
-        elif opt == "4":
-            fac.edit_invoice()
-        elif opt == "5":
-            fac.delete_invoice()
-        elif opt == "0":
-            break
-        else:
-            print("Opcion invalida.")
-
-def main():
-    ensure_files_exist()
-    while True:
-        print("\n=== Sistema de Inventario y Facturacion ===")
-        print("1. Inventario")
-        print("2. Facturas")
-        print("0. Salir")
-        opt = input("Opcion: ").strip()
-        if opt == "1":
-            menu_inventory()
-        elif opt == "2":
-            menu_invoices()
-        elif opt == "0":
-            print("Hasta luego.")
-            break
-        else:
-            print("Opcion invalida.")
-
-if __name__ == "__main__":
-    main()
+from io_utils import ensure_files_exist
+import inventory as inv
+import invoices as fac
+import invoice_import as imp
+import reports as rep
+import invoice_export as exp
+import reorder as rop
+import bulk_update as bulk
+import stats
+
+def menu_inventory():
+    while True:
+        print("\n=== Menu del Inventario ===")
+        print("1. Añadir producto")
+        print("2. Listar productos")
+        print("3. Buscar producto")
+        print("4. Actualizar precio o stock")
+        print("5. Eliminar producto")
+        print("6. Productos para reponer")
+        print("7. Definir umbral de reposicion")
+        print("8. Exportar lista de reposicion")
+        print("9. Actualizacion masiva de precios y stock")
+        print("0. Volver")
+        opt = input("Opcion: ").strip()
+        if opt == "1":
+            inv.add_product()
+        elif opt == "2":
+            inv.list_products()
+        elif opt == "3":
+            inv.search_product()
+        elif opt == "4":
+            inv.update_product()
+        elif opt == "5":
+            inv.delete_product()
+        elif opt == "6":
+            rop.show_reorder()
+        elif opt == "7":
+            rop.define_threshold()
+        elif opt == "8":
+            rop.export_reorder_list()
+        elif opt == "9":
+            bulk.bulk_update()
+        elif opt == "0":
+            break
+        else:
+            print("Opcion invalida.")
+
+def menu_invoices():
+    while True:
+        print("\n=== Menu Facturas ===")
+        print("1. Crear nueva factura")
+        print("2. Listar facturas")
+        print("3. Mostrar detalle de factura")
+        print("4. Editar elementos de factura")
+        print("5. Eliminar una factura")
+        print("6. Compactar archivo de facturas")
+        print("7. Importar facturas desde archivo")
+        print("8. Listar facturas por fecha")
+        print("9. Buscar facturas por cliente")
+        print("0. Volver")
+        opt = input("Opcion: ").strip()
+        if opt == "1":
+            fac.create_invoice()
+        elif opt == "2":
+            fac.list_invoices()
+        elif opt == "3":
+            fac.show_invoice_detail()
+        elif opt == "4":
+            fac.edit_invoice()
+        elif opt == "5":
+            fac.delete_invoice()
+        elif opt == "6":
+            fac.compact_invoice_file()
+        elif opt == "7":
+            imp.import_invoices()
+        elif opt == "8":
+            fac.list_invoices_by_date()
+        elif opt == "9":
+            fac.search_invoices_by_customer()
+        elif opt == "0":
+            break
+        else:
+            print("Opcion invalida.")
+
+def menu_reports():
+    while True:
+        print("\n=== Menu Reportes ===")
+        print("1. Productos mas vendidos")
+        print("2. Ventas por dia")
+        print("3. Ventas por cliente")
+        print("4. Reconstruir agregados")
+        print("5. Resumen por mes")
+        print("6. Cierre de mes")
+        print("7. Exportar lineas de factura (CSV)")
+        print("0. Volver")
+        opt = input("Opcion: ").strip()
+        if opt == "1":
+            rep.report_products()
+        elif opt == "2":
+            rep.report_days()
+        elif opt == "3":
+            rep.report_customers()
+        elif opt == "4":
+            rep.rebuild_reports()
+        elif opt == "5":
+            rep.report_months()
+        elif opt == "6":
+            rep.report_month_closing()
+        elif opt == "7":
+            exp.export_invoice_lines()
+        elif opt == "0":
+            break
+        else:
+            print("Opcion invalida.")
+
+def main():
+    try:
+        ensure_files_exist()
+    except (ConnectionError, ValueError) as e:
+        # FACTURAS_BACKEND=servidor sin server.py en ejecucion, o facturas.txt
+        # que no se puede incorporar a los segmentos
+        print(e)
+        return
+    while True:
+        print("\n=== Sistema de Inventario y Facturacion ===")
+        print("1. Inventario")
+        print("2. Facturas")
+        print("3. Reportes")
+        print("0. Salir")
+        opt = input("Opcion: ").strip()
+        if opt == "1":
+            menu_inventory()
+        elif opt == "2":
+            menu_invoices()
+        elif opt == "3":
+            menu_reports()
+        elif opt.lower() == "estadisticas":
+            # Opcion oculta: solo util con FACTURAS_STATS=1
+            stats.show_stats()
+        elif opt == "0":
+            print("Hasta luego.")
+            break
+        else:
+            print("Opcion invalida.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import builtins
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import io_utils
+import gen_data
+import inventory
+import invoices
+from models import InvoiceItem
+
+# Banco de pruebas: genera datos sinteticos, ejecuta cada operacion sin
+# interaccion (input() simulado) y guarda percentiles, rendimiento y pico de
+# memoria en JSON para comparar antes y despues de un cambio.
+#
+# Uso: python benchmark.py --productos 10000 --facturas 1000000 --salida base.json
+#      python benchmark.py --comparar base.json nuevo.json
+
+# Operaciones que leen o reescriben archivos completos: se repiten menos veces
+HEAVY_OPERATIONS = ("read_inventory", "write_inventory", "read_invoices")
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil q (0-100) por rango mas cercano; la lista debe venir ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+@contextlib.contextmanager
+def scripted_input(answers: List[str]):
+    """Reemplaza input() por una lista de respuestas y silencia la salida."""
+    pending = iter(answers)
+
+    def fake_input(prompt: str = "") -> str:
+        try:
+            return next(pending)
+        except StopIteration:
+            raise ValueError(f"Respuestas agotadas en: {prompt!r}")
+
+    original = builtins.input
+    builtins.input = fake_input
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original
+
+def _flow(fn: Callable[[], None], answers: Callable[[], List[str]]) -> Callable[[], None]:
+    def run() -> None:
+        with scripted_input(answers()):
+            fn()
+    return run
+
+def _operations(rng: random.Random) -> List[Tuple[str, Callable[[], Any]]]:
+    products = io_utils.read_inventory()
+    pids = [p.id for p in products]
+    terms = [rng.choice(p.nombre.split()) for p in rng.sample(products, min(len(products), 100))]
+    last_id = max(io_utils.count_invoices(), 1)
+
+    def read_inventory_cold() -> None:
+        io_utils.clear_cache()
+        io_utils.read_inventory()
+
+    def read_invoices_cold() -> None:
+        io_utils.clear_cache()
+        io_utils.read_invoices()
+
+    def append_invoice() -> None:
+        items = [InvoiceItem(p.id, p.nombre, 1, p.precio_cents) for p in rng.sample(products, 2)]
+        fecha = datetime.now().strftime(invoices.DATE_FORMAT)
+        io_utils.append_invoice(invoices.build_invoice(io_utils.next_id(io_utils.INVOICE_SEQUENCE), fecha, "Benchmark", items))
+
+    def find_product() -> None:
+        inventory._find_product(io_utils.read_inventory(), rng.choice(terms))
+
+    def create_answers() -> List[str]:
+        picked = rng.sample(pids, 2)
+        return ["Benchmark", str(picked[0]), "1", str(picked[1]), "2", ""]
+
+    def edit_answers() -> List[str]:
+        return [str(rng.randint(1, last_id)), str(rng.choice(pids)), str(rng.randint(1, 3)), ""]
+
+    return [
+        ("read_inventory", read_inventory_cold),
+        ("read_inventory_cache", io_utils.read_inventory),
+        ("write_inventory", lambda: io_utils.write_inventory(products)),
+        ("read_invoices", read_invoices_cold),
+        ("get_invoice", lambda: io_utils.get_invoice(rng.randint(1, last_id))),
+        ("append_invoice", append_invoice),
+        ("_find_product", find_product),
+        ("create_invoice", _flow(invoices.create_invoice, create_answers)),
+        ("edit_invoice", _flow(invoices.edit_invoice, edit_answers)),
+    ]
+
+def measure(fn: Callable[[], Any], runs: int) -> Dict[str, float]:
+    # Tiempos sin tracemalloc (lo vuelve varias veces mas lento); el pico se mide aparte
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    durations.sort()
+    total = sum(durations)
+    return {
+        "ejecuciones": runs,
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+        "media_ms": round(total / runs * 1000, 3),
+        "ops_por_seg": round(runs / total, 1) if total else 0.0,
+        "pico_memoria_kb": peak // 1024,
+    }
+
+def run(products: int, facturas: int, seed: int = 0, runs: int = 50, heavy_runs: int = 5,
+        only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Genera los datos en el directorio actual y mide cada operacion."""
+    start = time.perf_counter()
+    gen_data.generate(products, facturas, seed)
+    generated = time.perf_counter() - start
+    if io_utils.STORAGE_BACKEND == "sqlite":
+        import migrate_sqlite
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate_sqlite.migrate()
+
+    rng = random.Random(seed)
+    results: Dict[str, Any] = {}
+    for name, fn in _operations(rng):
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, heavy_runs if name in HEAVY_OPERATIONS else runs)
+    return {
+        "fecha": datetime.now().strftime(invoices.DATE_FORMAT),
+        "backend": io_utils.STORAGE_BACKEND,
+        "python": platform.python_version(),
+        "semilla": seed,
+        "productos": products,
+        "facturas": facturas,
+        "generacion_s": round(generated, 2),
+        "operaciones": results,
+    }
+
+def print_results(report: Dict[str, Any]) -> None:
+    print(f'{report["productos"]} productos, {report["facturas"]} facturas ({report["backend"]})')
+    print(f'{"Operacion":<22} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10} {"ops/s":>10} {"pico KB":>10}')
+    for name, r in report["operaciones"].items():
+        print(f'{name:<22} {r["p50_ms"]:>10.3f} {r["p95_ms"]:>10.3f} {r["p99_ms"]:>10.3f} '
+              f'{r["ops_por_seg"]:>10.1f} {r["pico_memoria_kb"]:>10}')
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path, "r", encoding="utf-8") as f:
+        before = json.load(f)["operaciones"]
+    with open(after_path, "r", encoding="utf-8") as f:
+        after = json.load(f)["operaciones"]
+    print(f'{"Operacion":<22} {"p50 antes":>10} {"p50 despues":>12} {"cambio":>8}')
+    for name, r in after.items():
+        if name not in before:
+            continue
+        old, new = before[name]["p50_ms"], r["p50_ms"]
+        change = f"{new / old - 1:+.0%}" if old else "-"
+        print(f'{name:<22} {old:>10.3f} {new:>12.3f} {change:>8}')
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mide las operaciones de inventario y facturas.")
+    parser.add_argument("--productos", type=int, default=1000)
+    parser.add_argument("--facturas", type=int, default=10000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--repeticiones-pesadas", type=int, default=5, help="para " + ", ".join(HEAVY_OPERATIONS))
+    parser.add_argument("--solo", nargs="*", help="operaciones a medir")
+    parser.add_argument("--dir", help="directorio de trabajo (por defecto uno temporal)")
+    parser.add_argument("--salida", default="benchmark.json")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"))
+    args = parser.parse_args(argv)
+    if args.comparar:
+        compare(*args.comparar)
+        return
+
+    output = os.path.abspath(args.salida)
+    workdir = args.dir or tempfile.mkdtemp(prefix="facturas-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    try:
+        report = run(args.productos, args.facturas, args.semilla, args.repeticiones,
+                     args.repeticiones_pesadas, args.solo)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        if not args.dir:
+            os.chdir(os.path.dirname(output))
+            shutil.rmtree(workdir, ignore_errors=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_results(report)
+    print(f"Resultados guardados en {output}.")
+
+if __name__ == "__main__":
+    main()
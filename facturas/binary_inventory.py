@@ -0,0 +1,185 @@
+import os
+import sys
+import mmap
+import struct
+import argparse
+from typing import List, Dict, Any, Optional, Tuple
+from models import Product, to_cents
+import io_utils
+import stats
+
+# Inventario binario (inventario.bin) con registros de ancho fijo, para
+# FACTURAS_INVENTARIO=binario. Se lee y se modifica con mmap: un cambio de
+# stock o de precio se escribe en el registro del producto, sin reescribir
+# el archivo. Agregar, renombrar o eliminar productos si lo reescribe.
+# Buscar un producto por id (io_utils.find_product) lee solo su registro.
+#
+#   encabezado (64 bytes): "FINV", version, flags, cantidad, lsn, inicio de nombres
+#   registros (64 bytes c/u): id, precio en centavos, stock, lsn, offset y largo del nombre
+#   nombres: UTF-8 concatenados
+#
+# El lsn del encabezado cumple la funcion de LSN_MARKER en inventario.txt. Cada
+# registro guarda ademas la ultima transaccion del log aplicada a el: si un
+# checkpoint se corta a mitad, ninguna transaccion se aplica dos veces.
+#
+# Uso: python binary_inventory.py --a-binario | --a-texto [--dir DIR]
+
+MAGIC = b"FINV"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIqQ36x")
+RECORD = struct.Struct("<qqqqQI20x")
+
+# Campos dentro de un registro (para escribir solo lo que cambia)
+STOCK_LSN = struct.Struct("<qq")
+PRICE = struct.Struct("<q")
+PRICE_OFFSET = 8
+STOCK_OFFSET = 16
+
+# Los ids de los registros estan en orden creciente: se puede buscar por biseccion
+FLAG_SORTED = 1
+
+def encode(products: List[Product], lsn: int) -> bytes:
+    """Contenido completo de inventario.bin; todos los registros quedan con el lsn dado."""
+    names = []
+    records = []
+    offset = 0
+    ids_sorted = True
+    for i, p in enumerate(products):
+        name = p.nombre.encode("utf-8")
+        records.append(RECORD.pack(p.id, p.precio_cents, p.stock, lsn, offset, len(name)))
+        names.append(name)
+        offset += len(name)
+        if i and p.id <= products[i - 1].id:
+            ids_sorted = False
+    flags = FLAG_SORTED if ids_sorted else 0
+    heap = HEADER.size + RECORD.size * len(products)
+    return HEADER.pack(MAGIC, VERSION, flags, len(products), lsn, heap) + b"".join(records) + b"".join(names)
+
+def _header(mm: Any) -> Tuple[int, int, int, int]:
+    magic, version, flags, count, lsn, heap = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("inventario.bin no tiene un formato reconocido.")
+    return flags, count, lsn, heap
+
+def read_lsn(path: str) -> int:
+    """Ultima transaccion del log incorporada a todo el archivo (-1 si ninguna)."""
+    with open(path, "rb") as f:
+        return _header(f.read(HEADER.size))[2]
+
+@stats.timed("binary_inventory.read")
+def read(path: str) -> Tuple[List[Product], Dict[int, int], int]:
+    """Productos en el orden del archivo, lsn de cada uno y lsn del encabezado."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _, count, lsn, heap = _header(mm)
+        names = mm[heap:]
+        products = []
+        lsns = {}
+        for pid, precio_cents, stock, applied, offset, length in RECORD.iter_unpack(mm[HEADER.size:heap]):
+            products.append(Product(pid, names[offset:offset + length].decode("utf-8"), precio_cents, stock))
+            lsns[pid] = applied
+        if stats.ENABLED:
+            stats.add("bytes_leidos", len(mm))
+            stats.add("registros", count)
+    return products, lsns, lsn
+
+def _record_id(mm: Any, pos: int) -> int:
+    return struct.unpack_from("<q", mm, HEADER.size + pos * RECORD.size)[0]
+
+def find(mm: Any, pid: int) -> Optional[int]:
+    """Posicion del registro del producto pid, o None si no esta."""
+    flags, count, _, _ = _header(mm)
+    if not count:
+        return None
+    # Ids correlativos: la posicion sale directo de la diferencia con el primero
+    pos = pid - _record_id(mm, 0)
+    if 0 <= pos < count and _record_id(mm, pos) == pid:
+        return pos
+    if flags & FLAG_SORTED:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _record_id(mm, mid) < pid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < count and _record_id(mm, lo) == pid else None
+    for pos in range(count):
+        if _record_id(mm, pos) == pid:
+            return pos
+    return None
+
+@stats.timed("binary_inventory.read_product")
+def read_product(path: str, pid: int) -> Optional[Tuple[Product, int, int]]:
+    """Producto pid, lsn de su registro y lsn del encabezado, o None si no esta."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = find(mm, pid)
+        if pos is None:
+            return None
+        _, _, lsn, heap = _header(mm)
+        _, precio_cents, stock, applied, offset, length = RECORD.unpack_from(mm, HEADER.size + pos * RECORD.size)
+        name = mm[heap + offset:heap + offset + length].decode("utf-8")
+    if stats.ENABLED:
+        stats.add("bytes_leidos", HEADER.size + RECORD.size + length)
+        stats.add("registros")
+    return Product(pid, name, precio_cents, stock), applied, lsn
+
+@stats.timed("binary_inventory.apply")
+def apply(path: str, records: List[Dict[str, Any]], lsn: int) -> int:
+    """Escribe en sitio el stock y los precios de las transacciones del log.
+
+    Cada registro se salta si ya tiene esa transaccion. Al final el
+    encabezado pasa a lsn: desde ahi el log ya no hace falta. Devuelve
+    cuantos registros se escribieron.
+    """
+    written = 0
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as mm:
+        for record in records:
+            record_lsn = record.get("lsn", 0)
+            stock = record.get("stock", {})
+            prices = record.get("precios", {})
+            for key in set(stock) | set(prices):
+                pos = find(mm, int(key))
+                if pos is None:
+                    # Producto eliminado despues del cambio
+                    continue
+                base = HEADER.size + pos * RECORD.size
+                current, applied = STOCK_LSN.unpack_from(mm, base + STOCK_OFFSET)
+                if applied >= record_lsn:
+                    continue
+                if key in prices:
+                    PRICE.pack_into(mm, base + PRICE_OFFSET, to_cents(prices[key]))
+                STOCK_LSN.pack_into(mm, base + STOCK_OFFSET, current + stock.get(key, 0), record_lsn)
+                written += 1
+        # Los registros tienen que estar en disco antes de adelantar el encabezado
+        mm.flush()
+        flags, count, _, heap = _header(mm)
+        HEADER.pack_into(mm, 0, MAGIC, VERSION, flags, count, lsn, heap)
+        mm.flush()
+    if stats.ENABLED:
+        stats.add("bytes_escritos", written * RECORD.size)
+    return written
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Convierte el inventario entre inventario.txt e inventario.bin.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--a-binario", dest="formato", action="store_const", const="binario")
+    target.add_argument("--a-texto", dest="formato", action="store_const", const="texto")
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+    try:
+        io_utils.use_backend("archivos")
+        io_utils.use_inventory_format(args.formato)
+        # ensure_files_exist convierte el archivo del otro formato, si lo hay
+        io_utils.ensure_files_exist()
+        count = len(io_utils.read_inventory())
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Inventario en {io_utils._inventory_path()}: {count} productos.")
+    if args.formato == "binario":
+        print("Iniciar la aplicacion con FACTURAS_INVENTARIO=binario para usarlo.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import re
+import sys
+import csv
+import json
+import fnmatch
+import argparse
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from models import Product, to_cents, from_cents
+from io_utils import read_inventory, apply_inventory_changes, inventory_version
+import search_index
+import stats
+
+# Actualizacion masiva de precios y stock. Cada regla elige productos por ids o
+# por un patron de nombre (comodines * y ?, sin distinguir mayusculas) y dice
+# que cambiar:
+#   precio        precio nuevo          precio_pct   porcentaje (+/-) sobre el precio
+#   precio_suma   monto a sumar/restar  stock        stock nuevo
+#   stock_suma    unidades a sumar/restar
+# Las reglas se aplican en orden sobre el inventario cargado una sola vez, y
+# todos los cambios se guardan juntos en una transaccion del log.
+#
+# Archivo: JSON Lines ({"nombre": "caja*", "precio_pct": 5}) o CSV con las
+# columnas ids, nombre y las de los cambios (ids separados por espacios).
+#
+# Uso: python bulk_update.py [ARCHIVO] [--ids 1,2 | --nombre PATRON] [--precio-pct N ...] [--simular]
+
+SELECTORS = ("ids", "nombre")
+CHANGES = ("precio", "precio_pct", "precio_suma", "stock", "stock_suma")
+
+def _parse_ids(value: Any) -> List[int]:
+    if isinstance(value, (list, tuple)):
+        return [int(v) for v in value]
+    if isinstance(value, int):
+        return [value]
+    return [int(v) for v in str(value).replace(",", " ").replace(";", " ").split()]
+
+def parse_rule(raw: Any) -> Dict[str, Any]:
+    """Valida una regla y la deja lista para aplicar (precios en centavos)."""
+    if not isinstance(raw, dict):
+        raise ValueError("registro invalido")
+    raw = {k: v for k, v in raw.items() if v not in (None, "")}
+    if not any(k in raw for k in SELECTORS):
+        raise ValueError("falta ids o nombre")
+    if not any(k in raw for k in CHANGES):
+        raise ValueError(f"falta el cambio ({', '.join(CHANGES)})")
+    if "precio" in raw and ("precio_pct" in raw or "precio_suma" in raw):
+        raise ValueError("precio no se combina con precio_pct ni precio_suma")
+    if "stock" in raw and "stock_suma" in raw:
+        raise ValueError("stock no se combina con stock_suma")
+    rule: Dict[str, Any] = {"ids": None, "patron": None}
+    try:
+        if "ids" in raw:
+            rule["ids"] = set(_parse_ids(raw["ids"]))
+        if "nombre" in raw:
+            rule["patron"] = re.compile(fnmatch.translate(str(raw["nombre"])), re.IGNORECASE).match
+        rule["precio"] = to_cents(raw["precio"]) if "precio" in raw else None
+        rule["precio_suma"] = to_cents(raw["precio_suma"]) if "precio_suma" in raw else None
+        rule["precio_pct"] = float(raw["precio_pct"]) if "precio_pct" in raw else None
+        rule["stock"] = int(raw["stock"]) if "stock" in raw else None
+        rule["stock_suma"] = int(raw["stock_suma"]) if "stock_suma" in raw else None
+    except (TypeError, ValueError):
+        raise ValueError("valor invalido")
+    if rule["precio"] is not None and rule["precio"] < 0:
+        raise ValueError("precio invalido")
+    if rule["stock"] is not None and rule["stock"] < 0:
+        raise ValueError("stock invalido")
+    return rule
+
+def _read_csv_rules(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        columns = reader.fieldnames or []
+        if not any(c in columns for c in SELECTORS) or not any(c in columns for c in CHANGES):
+            raise ValueError(f"El CSV necesita ids o nombre y al menos una de: {', '.join(CHANGES)}")
+        for n, row in enumerate(reader, start=2):
+            yield f"linea {n}", row
+
+def _read_jsonl_rules(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rule = json.loads(line)
+            except ValueError:
+                rule = None
+            yield f"linea {n}", rule
+
+def read_rules(path: str) -> List[Dict[str, Any]]:
+    """Reglas del archivo en orden; ValueError con la linea de la primera invalida."""
+    reader = _read_csv_rules(path) if path.lower().endswith(".csv") else _read_jsonl_rules(path)
+    rules = []
+    for ref, raw in reader:
+        try:
+            rules.append(parse_rule(raw))
+        except ValueError as e:
+            raise ValueError(f"{ref}: {e}")
+    return rules
+
+def _apply_rule(rule: Dict[str, Any], precio_cents: int, stock: int) -> Tuple[int, int]:
+    if rule["precio"] is not None:
+        precio_cents = rule["precio"]
+    if rule["precio_pct"] is not None:
+        precio_cents = round(precio_cents * (100 + rule["precio_pct"]) / 100)
+    if rule["precio_suma"] is not None:
+        precio_cents += rule["precio_suma"]
+    if rule["stock"] is not None:
+        stock = rule["stock"]
+    if rule["stock_suma"] is not None:
+        stock += rule["stock_suma"]
+    return precio_cents, stock
+
+@stats.timed("bulk_update.plan")
+def plan(products: List[Product], rules: List[Dict[str, Any]]) -> List[Tuple[Product, int, int]]:
+    """Cambios que dejan las reglas: (producto, precio nuevo en centavos, stock nuevo).
+
+    Un solo recorrido del inventario; si algun producto quedaria con precio o
+    stock negativo no se aplica nada.
+    """
+    changes = []
+    for p in products:
+        precio_cents, stock = p.precio_cents, p.stock
+        for rule in rules:
+            if rule["ids"] is not None and p.id not in rule["ids"]:
+                continue
+            if rule["patron"] is not None and not rule["patron"](p.nombre):
+                continue
+            precio_cents, stock = _apply_rule(rule, precio_cents, stock)
+        if precio_cents == p.precio_cents and stock == p.stock:
+            continue
+        if precio_cents < 0:
+            raise ValueError(f"El producto {p.id} ({p.nombre}) quedaria con precio negativo.")
+        if stock < 0:
+            raise ValueError(f"El producto {p.id} ({p.nombre}) quedaria con stock negativo.")
+        changes.append((p, precio_cents, stock))
+    if stats.ENABLED:
+        stats.add("registros", len(products))
+    return changes
+
+@stats.timed("bulk_update.apply_rules")
+def apply_rules(rules: List[Dict[str, Any]], dry_run: bool = False) -> List[Tuple[Product, int, int]]:
+    """Calcula los cambios y, salvo en simulacion, los guarda en una sola transaccion."""
+    changes = plan(read_inventory(), rules)
+    if changes and not dry_run:
+        deltas = {p.id: stock - p.stock for p, _, stock in changes if stock != p.stock}
+        prices = {p.id: precio_cents for p, precio_cents, _ in changes if precio_cents != p.precio_cents}
+        apply_inventory_changes(deltas, prices)
+        # Los nombres no cambian: el indice sigue valido
+        search_index.sync(inventory_version())
+    return changes
+
+def print_changes(changes: List[Tuple[Product, int, int]], limit: Optional[int] = None) -> None:
+    if not changes:
+        print("Ningun producto cambia.")
+        return
+    print(f'{"ID":<5} {"Nombre":<25} {"Precio":>12} {"Nuevo":>12} {"Stock":>8} {"Nuevo":>8}')
+    for p, precio_cents, stock in changes[:limit]:
+        print(f'{p.id:<5} {p.nombre:<25} {p.precio:>12.2f} {from_cents(precio_cents):>12.2f} {p.stock:>8} {stock:>8}')
+    if limit is not None and len(changes) > limit:
+        print(f"... y {len(changes) - limit} productos mas.")
+    print(f"{len(changes)} productos cambian.")
+
+def bulk_update() -> None:
+    path = input("Archivo de reglas (.jsonl o .csv): ").strip()
+    if not path or not os.path.exists(path):
+        print("Archivo no encontrado.")
+        return
+    try:
+        rules = read_rules(path)
+        changes = apply_rules(rules, dry_run=True)
+    except ValueError as e:
+        print(f"Actualizacion cancelada: {e}")
+        return
+    print_changes(changes, limit=20)
+    if not changes:
+        return
+    if input("Aplicar los cambios (S/N): ").strip().lower() != "s":
+        print("Operacion cancelada.")
+        return
+    try:
+        changes = apply_rules(rules)
+    except ValueError as e:
+        print(f"Actualizacion cancelada: {e}")
+        return
+    print(f"{len(changes)} productos actualizados.")
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Actualiza precios y stock de muchos productos a la vez.")
+    parser.add_argument("archivo", nargs="?", help="reglas en JSON Lines o CSV")
+    parser.add_argument("--ids", help="regla de linea de comandos: ids separados por coma")
+    parser.add_argument("--nombre", help="regla de linea de comandos: patron de nombre (ej: 'caja*')")
+    parser.add_argument("--precio", type=float)
+    parser.add_argument("--precio-pct", type=float)
+    parser.add_argument("--precio-suma", type=float)
+    parser.add_argument("--stock", type=int)
+    parser.add_argument("--stock-suma", type=int)
+    parser.add_argument("--simular", action="store_true", help="mostrar los cambios sin guardarlos")
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+    try:
+        rules = read_rules(args.archivo) if args.archivo else []
+        fields = {"ids": args.ids, "nombre": args.nombre, "precio": args.precio, "precio_pct": args.precio_pct,
+                  "precio_suma": args.precio_suma, "stock": args.stock, "stock_suma": args.stock_suma}
+        if any(v is not None for v in fields.values()):
+            rules.append(parse_rule(fields))
+        if not rules:
+            raise ValueError("Indicar un archivo de reglas o una regla (--ids/--nombre y un cambio).")
+        changes = apply_rules(rules, dry_run=args.simular)
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+    print_changes(changes, limit=None if args.simular else 20)
+    if not args.simular and changes:
+        print("Cambios guardados.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import argparse
+from typing import List, Dict, Any, Iterator, Tuple
+
+# Interfaz no interactiva para cron, scripts y pipelines:
+#
+#   python cli.py inventario listar|agregar|actualizar|eliminar|masivo
+#   python cli.py factura crear|mostrar|eliminar|listar
+#
+# (tambien en ingles: inventory list|add|update|delete|bulk, invoice create|show|delete|list)
+# La salida es JSON, un objeto por linea; los errores van a stderr con codigo 1.
+# Cada subcomando importa solo los modulos que usa, asi el arranque no paga por
+# menus, reportes o backends que no toca.
+
+def _emit(records: Iterator[Dict[str, Any]]) -> None:
+    out = sys.stdout
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def _item(text: str) -> Tuple[int, int]:
+    # ID:CANTIDAD
+    try:
+        pid, qty = text.split(":")
+        return int(pid), int(qty)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Item invalido: {text} (usar ID:CANTIDAD)")
+
+def inventory_list(args: argparse.Namespace) -> None:
+    from io_utils import read_inventory
+    _emit(p.to_dict() for p in read_inventory())
+
+def inventory_add(args: argparse.Namespace) -> None:
+    import inventory
+    _emit([inventory.create_product(args.nombre, args.precio, args.stock).to_dict()])
+
+def inventory_update(args: argparse.Namespace) -> None:
+    import inventory
+    if args.precio is None and args.stock is None:
+        raise ValueError("Indicar --precio y/o --stock.")
+    p = inventory.get_product(args.id)
+    _emit([inventory.change_product(p, args.precio, args.stock).to_dict()])
+
+def inventory_delete(args: argparse.Namespace) -> None:
+    import inventory
+    _emit([inventory.remove_product(inventory.get_product(args.id)).to_dict()])
+
+def inventory_bulk(args: argparse.Namespace) -> None:
+    import bulk_update
+    from models import from_cents
+    changes = bulk_update.apply_rules(bulk_update.read_rules(args.archivo), dry_run=args.simular)
+    _emit({"id": p.id, "nombre": p.nombre, "precio": p.precio, "precio_nuevo": from_cents(precio_cents),
+           "stock": p.stock, "stock_nuevo": stock} for p, precio_cents, stock in changes)
+
+def invoice_create(args: argparse.Namespace) -> None:
+    # invoices registra los listeners de reportes e indices: tienen que enterarse
+    import invoices
+    _emit([invoices.issue_invoice(args.cliente, args.item).to_dict()])
+
+def _get_invoice(iid: int) -> Any:
+    from io_utils import get_invoice
+    inv = get_invoice(iid)
+    if inv is None:
+        raise ValueError("Factura no encontrada.")
+    return inv
+
+def invoice_show(args: argparse.Namespace) -> None:
+    _emit([_get_invoice(args.id).to_dict()])
+
+def invoice_delete(args: argparse.Namespace) -> None:
+    import invoices
+    inv = _get_invoice(args.id)
+    invoices.cancel_invoice(inv)
+    _emit([inv.to_dict()])
+
+def invoice_list(args: argparse.Namespace) -> None:
+    from itertools import islice
+    from io_utils import iter_invoices
+    invoices = iter_invoices(from_id=args.desde_id, headers_only=not args.items, desde=args.desde, hasta=args.hasta)
+    _emit(inv.to_dict() for inv in islice(invoices, args.limite))
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="facturas", description="Inventario y facturas sin menus; salida JSON por linea.")
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    groups = parser.add_subparsers(dest="grupo", required=True)
+
+    inv = groups.add_parser("inventario", aliases=["inventory"], help="productos")
+    commands = inv.add_subparsers(dest="comando", required=True)
+    cmd = commands.add_parser("listar", aliases=["list"])
+    cmd.set_defaults(run=inventory_list)
+    cmd = commands.add_parser("agregar", aliases=["add"])
+    cmd.add_argument("--nombre", required=True)
+    cmd.add_argument("--precio", type=float, required=True)
+    cmd.add_argument("--stock", type=int, required=True)
+    cmd.set_defaults(run=inventory_add)
+    cmd = commands.add_parser("actualizar", aliases=["update"])
+    cmd.add_argument("id", type=int)
+    cmd.add_argument("--precio", type=float)
+    cmd.add_argument("--stock", type=int)
+    cmd.set_defaults(run=inventory_update)
+    cmd = commands.add_parser("eliminar", aliases=["delete"])
+    cmd.add_argument("id", type=int)
+    cmd.set_defaults(run=inventory_delete)
+    cmd = commands.add_parser("masivo", aliases=["bulk"], help="reglas de bulk_update.py")
+    cmd.add_argument("archivo", help="reglas en JSON Lines o CSV")
+    cmd.add_argument("--simular", action="store_true", help="solo mostrar los cambios")
+    cmd.set_defaults(run=inventory_bulk)
+
+    fac = groups.add_parser("factura", aliases=["invoice"], help="facturas")
+    commands = fac.add_subparsers(dest="comando", required=True)
+    cmd = commands.add_parser("crear", aliases=["create"])
+    cmd.add_argument("--cliente", required=True)
+    cmd.add_argument("--item", type=_item, action="append", required=True, help="ID:CANTIDAD (repetible)")
+    cmd.set_defaults(run=invoice_create)
+    cmd = commands.add_parser("mostrar", aliases=["show"])
+    cmd.add_argument("id", type=int)
+    cmd.set_defaults(run=invoice_show)
+    cmd = commands.add_parser("eliminar", aliases=["delete"])
+    cmd.add_argument("id", type=int)
+    cmd.set_defaults(run=invoice_delete)
+    cmd = commands.add_parser("listar", aliases=["list"])
+    cmd.add_argument("--desde", default="", help="AAAA-MM-DD")
+    cmd.add_argument("--hasta", default="", help="AAAA-MM-DD")
+    cmd.add_argument("--desde-id", type=int, default=None)
+    cmd.add_argument("--limite", type=int, default=None)
+    cmd.add_argument("--items", action="store_true", help="incluir los items de cada factura")
+    cmd.set_defaults(run=invoice_list)
+    return parser
+
+def main(argv: List[str] = None) -> None:
+    args = build_parser().parse_args(argv)
+    os.chdir(args.dir)
+    try:
+        args.run(args)
+    except (ValueError, ConnectionError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+from array import array
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+from models import Invoice, from_cents
+import io_utils
+import stats
+
+try:
+    import numpy as np
+except ImportError:
+    # Dependencia opcional: solo la usa este modulo (pip install numpy)
+    np = None
+
+# Exportacion columnar de las facturas para analisis vectorizado.
+# Cada columna es un archivo binario de enteros (columnas/<tabla>.<columna>.bin)
+# que se abre con np.memmap. meta.json guarda cuantas filas hay y hasta que
+# byte de cada segmento de facturas ya se exporto: refresh() solo procesa lo
+# agregado despues. Las versiones reemplazadas y las facturas eliminadas se
+# marcan en la columna "valida" en lugar de reescribir los archivos.
+#
+# Uso: python columnar.py [--reconstruir] [--periodo dia|mes|anio] [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+
+COLUMNS_DIR = "columnas"
+META_FILE = os.path.join(COLUMNS_DIR, "meta.json")
+
+# Columnas por tabla; segmento es el mes de origen como AAAAMM
+TABLES = {
+    "lineas": (("factura_id", "i8"), ("producto_id", "i8"), ("cantidad", "i8"), ("precio_cents", "i8"),
+               ("total_cents", "i8"), ("fecha", "i8"), ("segmento", "i8"), ("valida", "i1")),
+    "facturas": (("id", "i8"), ("fecha", "i8"), ("subtotal_cents", "i8"), ("iva_cents", "i8"),
+                 ("total_cents", "i8"), ("segmento", "i8"), ("valida", "i1")),
+}
+
+# Columna con el id de factura de cada tabla
+ID_COLUMNS = {"lineas": "factura_id", "facturas": "id"}
+
+# Se compacta una tabla cuando mas de esta fraccion de sus filas ya no es valida
+COMPACT_DEAD_RATIO = 0.5
+
+# Bytes al final de lo exportado de cada segmento que se comparan para
+# detectar que el archivo fue reescrito (vacuum_invoices, gen_data)
+CHECK_BYTES = 64
+
+PERIODS = {"dia": "D", "mes": "M", "anio": "Y"}
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# AAAA-MM-DD -> segundos desde 1970 a medianoche
+_days: Dict[str, int] = {}
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ValueError("La exportacion columnar necesita numpy (pip install numpy).")
+
+def _epoch(fecha: str) -> int:
+    """Segundos desde 1970-01-01 de "AAAA-MM-DD[ HH:MM:SS]" (sin zona horaria)."""
+    day = fecha[:10]
+    base = _days.get(day)
+    if base is None:
+        base = _days[day] = (date(int(day[:4]), int(day[5:7]), int(day[8:10])).toordinal() - _EPOCH_ORDINAL) * 86400
+    t = fecha[11:19]
+    if len(t) != 8:
+        return base
+    return base + int(t[:2]) * 3600 + int(t[3:5]) * 60 + int(t[6:8])
+
+def _column_path(table: str, column: str) -> str:
+    return os.path.join(COLUMNS_DIR, f"{table}.{column}.bin")
+
+def _empty_meta() -> Dict[str, Any]:
+    # segmentos: mes -> [bytes exportados, inodo, crc32 de los ultimos CHECK_BYTES]
+    # archivados: mes -> [bytes, inodo] del archivo comprimido ya exportado
+    return {"filas": {t: 0 for t in TABLES}, "muertas": {t: 0 for t in TABLES}, "max_id": 0,
+            "segmentos": {}, "archivados": {}}
+
+def _read_meta() -> Optional[Dict[str, Any]]:
+    try:
+        with open(META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Las columnas tienen que tener exactamente las filas que dice meta.json
+    try:
+        for table, columns in TABLES.items():
+            for column, dtype in columns:
+                path = _column_path(table, column)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                if size != meta["filas"][table] * np.dtype(dtype).itemsize:
+                    return None
+    except (KeyError, TypeError):
+        return None
+    return meta
+
+def _write_meta(meta: Dict[str, Any]) -> None:
+    tmp = META_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, META_FILE)
+
+def _open_table(table: str, rows: int, mode: str = "r") -> Dict[str, Any]:
+    if not rows:
+        # np.memmap no acepta archivos vacios
+        return {column: np.zeros(0, dtype) for column, dtype in TABLES[table]}
+    return {column: np.memmap(_column_path(table, column), dtype=dtype, mode=mode, shape=(rows,))
+            for column, dtype in TABLES[table]}
+
+def _tail_check(path: str, end: int) -> int:
+    with open(path, "rb") as f:
+        f.seek(max(0, end - CHECK_BYTES))
+        return zlib.crc32(f.read(min(end, CHECK_BYTES)))
+
+def _read_tail(path: str, start: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Registros completos del segmento desde start y el byte donde termina el ultimo."""
+    records = []
+    end = start
+    with open(path, "rb") as f:
+        f.seek(start)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                # Escritura en curso o interrumpida: queda para el proximo refresh
+                break
+            end += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Ignorar líneas corruptas
+                continue
+    if stats.ENABLED:
+        stats.add("bytes_leidos", end - start)
+        stats.add("registros", len(records))
+    return records, end
+
+def _kill(meta: Dict[str, Any], keys: List[int]) -> None:
+    # Marca como no validas las filas de esas (factura, segmento): key = id * 10**6 + AAAAMM
+    if not keys:
+        return
+    wanted = np.array(keys, dtype="i8")
+    for table, id_column in ID_COLUMNS.items():
+        rows = meta["filas"][table]
+        if not rows:
+            continue
+        cols = _open_table(table, rows, "r+")
+        mask = (cols["valida"] == 1) & np.isin(cols[id_column] * 1000000 + cols["segmento"], wanted)
+        dead = int(mask.sum())
+        if dead:
+            cols["valida"][mask] = 0
+            cols["valida"].flush()
+            meta["muertas"][table] += dead
+
+def _append(meta: Dict[str, Any], table: str, values: Dict[str, array]) -> None:
+    for column, dtype in TABLES[table]:
+        with open(_column_path(table, column), "ab") as f:
+            f.write(np.frombuffer(values[column], dtype=dtype).tobytes() if len(values[column]) else b"")
+    meta["filas"][table] += len(values[ID_COLUMNS[table]])
+
+def _new_values(table: str) -> Dict[str, array]:
+    return {column: array("b" if dtype == "i1" else "q") for column, dtype in TABLES[table]}
+
+def _export_segment(meta: Dict[str, Any], month: str, records: List[Dict[str, Any]]) -> None:
+    segment = int(month.replace("-", ""))
+
+    # La ultima version de cada factura en este tramo gana; una lapida la elimina
+    latest: Dict[int, Optional[Dict[str, Any]]] = {}
+    for record in records:
+        try:
+            latest[int(record["id"])] = None if io_utils._is_tombstone(record) else record
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    # Solo un id ya exportado puede tener filas viejas (los ids nuevos son siempre mayores)
+    _kill(meta, [iid * 1000000 + segment for iid in latest if iid <= meta["max_id"]])
+
+    lines = _new_values("lineas")
+    invoices = _new_values("facturas")
+    for iid, record in latest.items():
+        meta["max_id"] = max(meta["max_id"], iid)
+        if record is None:
+            continue
+        try:
+            inv = Invoice.from_dict(record)
+        except (KeyError, TypeError, ValueError):
+            # Ignorar registros incompletos
+            continue
+        fecha = _epoch(inv.fecha)
+        for value, column in ((iid, "id"), (fecha, "fecha"), (inv.subtotal_cents, "subtotal_cents"),
+                              (inv.iva_cents, "iva_cents"), (inv.total_cents, "total_cents"),
+                              (segment, "segmento"), (1, "valida")):
+            invoices[column].append(value)
+        for it in inv.items:
+            for value, column in ((iid, "factura_id"), (it.product_id, "producto_id"), (it.quantity, "cantidad"),
+                                  (it.unit_price_cents, "precio_cents"), (it.line_total_cents, "total_cents"),
+                                  (fecha, "fecha"), (segment, "segmento"), (1, "valida")):
+                lines[column].append(value)
+    _append(meta, "lineas", lines)
+    _append(meta, "facturas", invoices)
+
+def _compact(meta: Dict[str, Any], table: str) -> None:
+    rows = meta["filas"][table]
+    cols = _open_table(table, rows)
+    keep = cols["valida"] == 1
+    for column, _ in TABLES[table]:
+        path = _column_path(table, column)
+        with open(path + ".tmp", "wb") as f:
+            f.write(np.ascontiguousarray(cols[column][keep]).tobytes())
+    del cols
+    for column, _ in TABLES[table]:
+        path = _column_path(table, column)
+        os.replace(path + ".tmp", path)
+    meta["filas"][table] = int(keep.sum())
+    meta["muertas"][table] = 0
+
+def _archive_check(month: str) -> Optional[List[int]]:
+    if month not in io_utils._archive_manifests():
+        return None
+    st = os.stat(io_utils._archive_path(month))
+    return [st.st_size, st.st_ino]
+
+def _export_all(meta: Dict[str, Any]) -> None:
+    # SQLite o servidor: no hay segmentos que seguir, se exporta todo el historial
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for inv in io_utils.iter_invoices():
+        by_month.setdefault(io_utils._month(inv.fecha), []).append(inv.to_dict())
+    for month in sorted(by_month):
+        _export_segment(meta, month, by_month[month])
+
+@stats.timed("columnar.refresh")
+def refresh(rebuild: bool = False) -> Dict[str, int]:
+    """Incorpora a las columnas lo escrito en los segmentos desde la ultima vez.
+
+    Devuelve cuantas filas validas tiene cada tabla. Si un segmento fue
+    reescrito (vacuum_invoices), se archivo o se restauro un mes, o falta algun
+    archivo, se exporta todo de nuevo.
+    """
+    _require_numpy()
+    io_utils.ensure_files_exist()
+    meta = None if rebuild else _read_meta()
+    if meta is not None and io_utils.STORAGE_BACKEND == "archivos":
+        manifests = io_utils._manifests()
+        if set(meta["segmentos"]) - set(manifests):
+            meta = None
+        elif any(_archive_check(month) != check for month, check in meta.get("archivados", {}).items()):
+            # Mes archivado restaurado o reescrito
+            meta = None
+        for month in sorted(manifests):
+            if meta is None:
+                break
+            st = os.stat(io_utils._segment_path(month))
+            done, inode, check = meta["segmentos"].get(month, (0, st.st_ino, 0))
+            if inode != st.st_ino or st.st_size < done or (done and _tail_check(io_utils._segment_path(month), done) != check):
+                meta = None
+    elif io_utils.STORAGE_BACKEND != "archivos":
+        meta = None
+
+    if meta is None:
+        # Exportacion completa desde cero
+        shutil.rmtree(COLUMNS_DIR, ignore_errors=True)
+        os.makedirs(COLUMNS_DIR)
+        meta = _empty_meta()
+        if io_utils.STORAGE_BACKEND != "archivos":
+            _export_all(meta)
+
+    if io_utils.STORAGE_BACKEND == "archivos":
+        # Los meses archivados no cambian: se exportan una sola vez
+        archived = meta.setdefault("archivados", {})
+        for month in sorted(io_utils._archive_manifests()):
+            if month in archived:
+                continue
+            _export_segment(meta, month, [inv.to_dict() for inv in io_utils.iter_archived(month)])
+            archived[month] = _archive_check(month)
+        for month in sorted(io_utils._manifests()):
+            path = io_utils._segment_path(month)
+            st = os.stat(path)
+            done = meta["segmentos"].get(month, (0,))[0]
+            if st.st_size == done:
+                continue
+            records, end = _read_tail(path, done)
+            _export_segment(meta, month, records)
+            meta["segmentos"][month] = [end, st.st_ino, _tail_check(path, end)]
+
+    for table in TABLES:
+        if meta["muertas"][table] > meta["filas"][table] * COMPACT_DEAD_RATIO:
+            _compact(meta, table)
+    _write_meta(meta)
+    return {table: meta["filas"][table] - meta["muertas"][table] for table in TABLES}
+
+def _valid(table: str, desde: str = "", hasta: str = "") -> Tuple[Dict[str, Any], Any]:
+    refresh()
+    meta = _read_meta()
+    cols = _open_table(table, meta["filas"][table])
+    mask = cols["valida"] == 1
+    if desde:
+        mask &= cols["fecha"] >= _epoch(desde)
+    if hasta:
+        # hasta incluye el dia completo
+        mask &= cols["fecha"] < _epoch(hasta) + 86400
+    return cols, mask
+
+@stats.timed("columnar.top_sellers")
+def top_sellers(limit: int = 10, desde: str = "", hasta: str = "") -> List[Tuple[int, int, float]]:
+    """Productos con mas ingresos en el periodo: (id, unidades, ingresos)."""
+    cols, mask = _valid("lineas", desde, hasta)
+    pids = cols["producto_id"][mask]
+    if not len(pids):
+        return []
+    units = np.bincount(pids, weights=cols["cantidad"][mask])
+    revenue = np.bincount(pids, weights=cols["total_cents"][mask])
+    top = np.argsort(revenue, kind="stable")[::-1][:limit]
+    return [(int(pid), int(units[pid]), from_cents(int(revenue[pid]))) for pid in top if revenue[pid] > 0]
+
+@stats.timed("columnar.revenue_by_period")
+def revenue_by_period(periodo: str = "mes", desde: str = "", hasta: str = "") -> List[Tuple[str, int, float, float, float]]:
+    """Facturas, subtotal, IVA y total por dia, mes o anio: (periodo, facturas, subtotal, iva, total)."""
+    if periodo not in PERIODS:
+        raise ValueError(f"Periodo invalido: {periodo} (dia, mes o anio).")
+    cols, mask = _valid("facturas", desde, hasta)
+    keys = cols["fecha"][mask].astype("datetime64[s]").astype(f"datetime64[{PERIODS[periodo]}]")
+    if not len(keys):
+        return []
+    periods, inverse = np.unique(keys, return_inverse=True)
+    count = np.bincount(inverse)
+    sums = [np.bincount(inverse, weights=cols[c][mask]) for c in ("subtotal_cents", "iva_cents", "total_cents")]
+    return [(str(p), int(count[i]), *(from_cents(int(s[i])) for s in sums)) for i, p in enumerate(periods)]
+
+@stats.timed("columnar.iva_totals")
+def iva_totals(desde: str = "", hasta: str = "") -> Dict[str, Any]:
+    """Cantidad de facturas y suma de subtotal, IVA y total del periodo."""
+    cols, mask = _valid("facturas", desde, hasta)
+    return {
+        "facturas": int(mask.sum()),
+        "subtotal": from_cents(int(cols["subtotal_cents"][mask].sum())),
+        "iva": from_cents(int(cols["iva_cents"][mask].sum())),
+        "total": from_cents(int(cols["total_cents"][mask].sum())),
+    }
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporta las facturas a columnas NumPy y calcula totales.")
+    parser.add_argument("--reconstruir", action="store_true", help="exportar todo de nuevo")
+    parser.add_argument("--periodo", choices=sorted(PERIODS), default="mes")
+    parser.add_argument("--desde", default="", help="AAAA-MM-DD")
+    parser.add_argument("--hasta", default="", help="AAAA-MM-DD")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+    try:
+        start = time.perf_counter()
+        rows = refresh(args.reconstruir)
+        print(f'Columnas al dia: {rows["facturas"]} facturas, {rows["lineas"]} lineas '
+              f'({(time.perf_counter() - start) * 1000:.1f} ms).')
+
+        start = time.perf_counter()
+        totals = iva_totals(args.desde, args.hasta)
+        print(f'\nFacturas: {totals["facturas"]}  Subtotal: {totals["subtotal"]:.2f}  '
+              f'IVA: {totals["iva"]:.2f}  Total: {totals["total"]:.2f} ({(time.perf_counter() - start) * 1000:.1f} ms)')
+
+        start = time.perf_counter()
+        rows_period = revenue_by_period(args.periodo, args.desde, args.hasta)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f'\n{"Periodo":<12} {"Facturas":>9} {"Subtotal":>16} {"IVA":>14} {"Total":>16}')
+        for period, count, subtotal, iva, total in rows_period:
+            print(f'{period:<12} {count:>9} {subtotal:>16.2f} {iva:>14.2f} {total:>16.2f}')
+        print(f'({elapsed:.1f} ms)')
+
+        start = time.perf_counter()
+        top = top_sellers(args.top, args.desde, args.hasta)
+        elapsed = (time.perf_counter() - start) * 1000
+        names = {p.id: p.nombre for p in io_utils.read_inventory()}
+        print(f'\n{"ProdID":<7} {"Nombre":<25} {"Unidades":>9} {"Ingresos":>16}')
+        for pid, units, revenue in top:
+            print(f'{pid:<7} {names.get(pid, "(eliminado)"):<25} {units:>9} {revenue:>16.2f}')
+        print(f'({elapsed:.1f} ms)')
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
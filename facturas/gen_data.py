@@ -0,0 +1,161 @@
+import os
+import sys
+import shutil
+import random
+import argparse
+from array import array
+from itertools import groupby
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+from models import Product, Invoice, InvoiceItem
+import io_utils
+import reports
+import invoice_index
+import reorder
+from invoices import build_invoice, DATE_FORMAT
+
+# Generador de datos sinteticos para pruebas de rendimiento.
+# Escribe el inventario, los segmentos mensuales de facturas (con indice y
+# manifiesto), secuencias.txt, los agregados de reportes y los indices por
+# cliente y fecha en el directorio actual, con las funciones publicas de
+# io_utils (el inventario queda en el formato configurado). Misma semilla =
+# mismos archivos.
+
+TIPOS = [
+    "leche", "arroz", "cafe", "galletas", "aceite", "jabon", "cereal", "azucar",
+    "harina", "pasta", "atun", "detergente", "shampoo", "yogur", "queso", "mantequilla",
+    "chocolate", "te", "sal", "avena", "frijol", "lenteja", "salsa", "mayonesa",
+    "papel higienico", "servilletas", "gaseosa", "jugo", "agua", "cerveza",
+]
+MARCAS = [
+    "alpina", "colanta", "diana", "roa", "noel", "zenu", "fruco", "doria", "nestle",
+    "kellogs", "quaker", "postobon", "familia", "fab", "ariel", "dove", "colombina",
+    "luker", "corona", "manuelita", "incauca", "del valle", "cristal", "aguila", "sello rojo",
+]
+PRESENTACIONES = ["250 g", "500 g", "1 kg", "2 kg", "5 kg", "350 ml", "1 L", "2 L", "x6", "x12", "familiar", "mini"]
+
+NOMBRES = [
+    "Ana", "Luis", "Carlos", "Maria", "Jorge", "Lucia", "Pedro", "Sofia", "Andres", "Camila",
+    "Diego", "Valentina", "Juan", "Daniela", "Felipe", "Laura", "Nicolas", "Paula", "Mateo", "Sara",
+]
+APELLIDOS = [
+    "Garcia", "Rodriguez", "Martinez", "Lopez", "Gonzalez", "Perez", "Sanchez", "Ramirez",
+    "Torres", "Flores", "Rivera", "Gomez", "Diaz", "Cruz", "Morales", "Ortiz", "Villalba", "Castro",
+]
+
+# Estado derivado de columnar.py y reconcile.py, que se descarta al generar
+# (no se importan: columnar necesita numpy)
+COLUMNS_DIR = "columnas"
+BASELINE_FILE = "stock_base.json"
+
+_COMBOS = len(TIPOS) * len(MARCAS) * len(PRESENTACIONES)
+# Coprimo con _COMBOS: recorre todas las combinaciones en orden mezclado
+_STRIDE = 7919
+
+def product_name(i: int) -> str:
+    """Nombre unico y determinista para el producto numero i (desde 0)."""
+    k = (i * _STRIDE) % _COMBOS
+    tipo = TIPOS[k % len(TIPOS)]
+    k //= len(TIPOS)
+    marca = MARCAS[k % len(MARCAS)]
+    presentacion = PRESENTACIONES[k // len(MARCAS)]
+    name = f"{tipo} {marca} {presentacion}"
+    version = i // _COMBOS
+    return f"{name} v{version + 1}" if version else name
+
+def _customers(rng: random.Random, count: int) -> List[str]:
+    return [f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {n:04d}" for n in range(count)]
+
+def generate_products(rng: random.Random, count: int) -> List[Product]:
+    products = []
+    for i in range(count):
+        # Precios con distribucion log-normal (mediana ~3000), redondeados a 10
+        precio = max(100, int(round(rng.lognormvariate(8, 1), -1)))
+        products.append(Product(i + 1, product_name(i), precio * 100, rng.randint(1000, 100000)))
+    return products
+
+def _invoices(rng: random.Random, products: List[Product], count: int, days: int,
+              max_items: int, start: str) -> Iterator[Invoice]:
+    prices = array("q", (p.precio_cents for p in products))
+    names = [p.nombre for p in products]
+    customers = _customers(rng, max(100, count // 20))
+    first = datetime.strptime(start, "%Y-%m-%d")
+    span = days * 86400
+    for n in range(count):
+        fecha = (first + timedelta(seconds=span * n // max(count, 1) + rng.randrange(60))).strftime(DATE_FORMAT)
+        # Clientes y productos frecuentes: pocos concentran la mayoria de las compras
+        cliente = customers[int(len(customers) * rng.random() ** 3)]
+        picked: Dict[int, int] = {}
+        for _ in range(rng.randint(1, max_items)):
+            picked[int(len(products) * rng.random() ** 2)] = rng.randint(1, 5)
+        items = [InvoiceItem(k + 1, names[k], qty, prices[k]) for k, qty in picked.items()]
+        yield build_invoice(n + 1, fecha, cliente, items)
+
+def generate_invoices(rng: random.Random, products: List[Product], count: int, days: int = 730,
+                      max_items: int = 5, start: str = "2023-01-01") -> None:
+    """Escribe count facturas en orden de fecha, un segmento por mes, con agregados e indices."""
+    aggregates = reports._empty()
+    index = invoice_index._empty()
+
+    def tracked() -> Iterator[Invoice]:
+        for inv in _invoices(rng, products, count, days, max_items, start):
+            reports._merge(aggregates, reports._invoice_delta(inv, 1))
+            invoice_index._add(index, inv.id, invoice_index.normalize(inv.cliente), inv.fecha)
+            yield inv
+
+    # Fechas en orden: cada mes se escribe de corrido, sin tener el mes entero en memoria
+    for month, group in groupby(tracked(), key=lambda inv: inv.fecha[:7]):
+        io_utils.write_month(month, group)
+    reports._store.save(aggregates)
+    invoice_index._store.save(index)
+
+def generate(products: int, invoices: int, seed: int = 0, days: int = 730, max_items: int = 5) -> None:
+    """Reemplaza los datos del directorio actual por un conjunto sintetico."""
+    if products <= 0:
+        raise ValueError("Se necesita al menos un producto.")
+    # Todo lo que depende de los datos anteriores: formatos alternativos del
+    # inventario, estado derivado y configuracion atada a los ids de producto
+    # (facturas.txt es el formato anterior, de un solo archivo, con su indice .idx)
+    legacy_index = os.path.splitext(io_utils.INVOICES_FILE)[0] + ".idx"
+    for path in (io_utils.INVENTORY_FILE, io_utils.INVENTORY_JOURNAL_FILE, io_utils.INVENTORY_BINARY_FILE,
+                 io_utils.INVOICES_FILE, legacy_index, io_utils.SEQUENCES_FILE, reports.REPORTS_JOURNAL_FILE,
+                 invoice_index.INDEX_JOURNAL_FILE, reorder.THRESHOLDS_FILE, BASELINE_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+    for path in (io_utils.SEGMENTS_DIR, io_utils.ARCHIVE_DIR, COLUMNS_DIR):
+        shutil.rmtree(path, ignore_errors=True)
+
+    # Siempre en archivos: con SQLite se migran despues (ver benchmark.py)
+    backend = io_utils.STORAGE_BACKEND
+    io_utils.use_backend("archivos")
+    try:
+        # Los ids se reservan como en la aplicacion; sin datos previos empiezan en 1
+        io_utils.next_id(io_utils.PRODUCT_SEQUENCE, products)
+        io_utils.next_id(io_utils.INVOICE_SEQUENCE, invoices)
+        rng = random.Random(seed)
+        catalog = generate_products(rng, products)
+        io_utils.write_inventory(catalog)
+        generate_invoices(rng, catalog, invoices, days, max_items)
+    finally:
+        io_utils.use_backend(backend)
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera inventario y facturas sinteticos.")
+    parser.add_argument("--productos", type=int, default=1000)
+    parser.add_argument("--facturas", type=int, default=10000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--dias", type=int, default=730, help="dias cubiertos por las facturas")
+    parser.add_argument("--max-items", type=int, default=5)
+    parser.add_argument("--dir", default=".", help="directorio de destino")
+    args = parser.parse_args(argv)
+    os.makedirs(args.dir, exist_ok=True)
+    os.chdir(args.dir)
+    try:
+        generate(args.productos, args.facturas, args.semilla, args.dias, args.max_items)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Generados {args.productos} productos y {args.facturas} facturas en {os.getcwd()}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,151 +1,207 @@
-from typing import List, Dict, Any, Optional
-from io_utils import read_inventory, write_inventory
-
-def _next_product_id(products: List[Dict[str, Any]]) -> int:
-    return (max((p["id"] for p in products), default=0) + 1)
-
-def list_products() -> None:
-    products = read_inventory()
-    if not products:
-        print("No hay productos en el inventario.")
-        return
-    print("\n=== Inventario ===")
-    print(f'{"ID":<5} {"Nombre":<25} {"Precio":>10} {"Stock":>8}')
-    for p in products:
-        print(f'{p["id"]:<5} {p["nombre"]:<25} {p["precio"]:>10.2f} {p["stock"]:>8}')
-    print()
-
-def add_product() -> None:
-    products = read_inventory()
-    pid = _next_product_id(products)
-    nombre = input("Nombre del producto: ").strip()
-    if not nombre:
-        print("Nombre invalido.")
-        return
-    
-    # Validar precio
-    try:
-        precio = float(input("Precio (ej: 12000.0): ").strip())
-        if precio < 0:
-            raise ValueError
-    except ValueError:
-        print("Precio invalido.")
-        return
-    
-    # Validar stock
-    try:
-        stock = int(input("Stock (entero ≥ 0): ").strip())
-        if stock < 0:
-            raise ValueError
-    except ValueError:
-        print("Stock invalido.")
-        return
-
-    # Evitar duplicados por nombre (opcional, sensible a minúsculas)
-    if any(p["nombre"].lower() == nombre.lower() for p in products):
-        print("Ya existe un producto con ese nombre.")
-        return
-
-    products.append({"id": pid, "nombre": nombre, "precio": precio, "stock": stock})
-    write_inventory(products)
-    print(f"Producto agregado con ID {pid}.")
-
-def _find_product(products: List[Dict[str, Any]], term: str) -> List[Dict[str, Any]]:
-    term_lower = term.lower()
-    matches = []
-
-    # Buscar por ID exacto si es dígito
-    if term.isdigit():
-        pid = int(term)
-        matches.extend([p for p in products if p["id"] == pid])
-        return matches
-    
-    # Buscar por nombre contiene
-    matches.extend([p for p in products if term_lower in p["nombre"].lower()])
-    return matches
-
-def search_product() -> None:
-    products = read_inventory()
-    term = input("Buscar por ID o nombre: ").strip()
-    if not term:
-        print("Busqueda vacia.")
-        return
-    results = _find_product(products, term)
-    if not results:
-        print("Sin resultados.")
-        return
-    print("\n=== Resultados ===")
-    for p in results:
-        print(f'ID {p["id"]}: {p["nombre"]} | Precio: {p["precio"]:.2f} | Stock: {p["stock"]}')
-    print()
-
-def update_product() -> None:
-    products = read_inventory()
-    term = input("ID o nombre del producto a actualizar: ").strip()
-    matches = _find_product(products, term)
-    if not matches:
-        print("Producto no encontrado.")
-        return
-    
-    # Si hay varios, elegir por ID
-    if len(matches) > 1:
-        print("Multiples coincidencias. Especifique el ID.")
-        for p in matches:
-            print(f'ID {p["id"]}: {p["nombre"]}')
-        return
-    p = matches[0]
-    print(f'Seleccionado: ID {p["id"]} - {p["nombre"]} (Precio: {p["precio"]:.2f}, Stock: {p["stock"]})')
-    print("¿Qué desea actualizar?")
-    print("1. Precio")
-    print("2. Stock")
-    choice = input("Opción: ").strip()
-    if choice == "1":
-        try:
-            new_price = float(input("Nuevo precio: ").strip())
-            if new_price < 0:
-                raise ValueError
-        except ValueError:
-            print("Precio invalido.")
-            return
-        p["precio"] = new_price
-    elif choice == "2":
-        try:
-            new_stock = int(input("Nuevo stock (≥ 0): ").strip())
-            if new_stock < 0:
-                raise ValueError
-        except ValueError:
-            print("Stock invalido.")
-            return
-        p["stock"] = new_stock
-    else:
-        print("Opción invalida.")
-        return
-
-    # Persistir
-    for i, pr in enumerate(products):
-        if pr["id"] == p["id"]:
-            products[i] = p
-            break
-    write_inventory(products)
-    print("Producto actualizado.")
-
-def delete_product() -> None:
-    products = read_inventory()
-    term = input("ID o nombre del producto a eliminar: ").strip()
-    matches = _find_product(products, term)
-    if not matches:
-        print("Producto no encontrado.")
-        return
-    if len(matches) > 1:
-        print("Multiples coincidencias. Especifique el ID.")
-        for p in matches:
-            print(f'ID {p["id"]}: {p["nombre"]}')
-        return
-    p = matches[0]
-    confirm = input(f'Confirmar eliminación de "{p["nombre"]}" (S/N): ').strip().lower()
-    if confirm != "s":
-        print("Operacion cancelada.")
-        return
-    products = [pr for pr in products if pr["id"] != p["id"]]
-    write_inventory(products)
-    print("Producto eliminado.")
+from typing import List, Optional
+from models import Product, to_cents
+from io_utils import read_inventory, write_inventory, apply_inventory_changes, next_id, inventory_version, find_product, PRODUCT_SEQUENCE
+import search_index
+import stats
+
+def _next_product_id() -> int:
+    return next_id(PRODUCT_SEQUENCE)
+
+@stats.timed("inventory.list_products")
+def list_products() -> None:
+    products = read_inventory()
+    if not products:
+        print("No hay productos en el inventario.")
+        return
+    print("\n=== Inventario ===")
+    print(f'{"ID":<5} {"Nombre":<25} {"Precio":>10} {"Stock":>8}')
+    for p in products:
+        print(f'{p.id:<5} {p.nombre:<25} {p.precio:>10.2f} {p.stock:>8}')
+    print()
+
+@stats.timed("inventory.add_product")
+def add_product() -> None:
+    products = read_inventory()
+    nombre = stats.prompt("Nombre del producto: ").strip()
+    if not nombre:
+        print("Nombre invalido.")
+        return
+    
+    # Validar precio
+    try:
+        precio = float(stats.prompt("Precio (ej: 12000.0): ").strip())
+        if precio < 0:
+            raise ValueError
+    except ValueError:
+        print("Precio invalido.")
+        return
+    
+    # Validar stock
+    try:
+        stock = int(stats.prompt("Stock (entero ≥ 0): ").strip())
+        if stock < 0:
+            raise ValueError
+    except ValueError:
+        print("Stock invalido.")
+        return
+
+    try:
+        product = create_product(nombre, precio, stock, products)
+    except ValueError as e:
+        print(e)
+        return
+    print(f"Producto agregado con ID {product.id}.")
+
+def create_product(nombre: str, precio: float, stock: int, products: Optional[List[Product]] = None) -> Product:
+    """Agrega un producto al inventario; ValueError si algun dato no es valido."""
+    if products is None:
+        products = read_inventory()
+    nombre = nombre.strip()
+    if not nombre:
+        raise ValueError("Nombre invalido.")
+    if precio < 0:
+        raise ValueError("Precio invalido.")
+    if stock < 0:
+        raise ValueError("Stock invalido.")
+
+    # Evitar duplicados por nombre (opcional, sensible a minúsculas)
+    same_prefix = search_index.search(products, nombre, inventory_version(), mode="prefix")
+    if any(p.nombre.lower() == nombre.lower() for p in same_prefix):
+        raise ValueError("Ya existe un producto con ese nombre.")
+
+    pid = _next_product_id()
+    product = Product(pid, nombre, to_cents(precio), stock)
+    products.append(product)
+    write_inventory(products)
+    search_index.add(product, len(products) - 1)
+    search_index.sync(inventory_version())
+    return product
+
+@stats.timed("inventory._find_product")
+def _find_product(products: List[Product], term: str, mode: str = "contains") -> List[Product]:
+    # products debe venir de read_inventory(): el indice de nombres se alinea con ese orden
+    version = inventory_version()
+
+    # Buscar por ID exacto si es dígito
+    if term.isdigit():
+        p = search_index.find_id(products, int(term), version)
+        return [p] if p is not None else []
+    
+    # Buscar por nombre: contiene (por defecto), prefijo o contiene ordenado por relevancia
+    return search_index.search(products, term, version, mode)
+
+@stats.timed("inventory.search_product")
+def search_product() -> None:
+    products = read_inventory()
+    term = stats.prompt("Buscar por ID o nombre: ").strip()
+    if not term:
+        print("Busqueda vacia.")
+        return
+    results = _find_product(products, term, mode="ranked")
+    if not results:
+        print("Sin resultados.")
+        return
+    print("\n=== Resultados ===")
+    for p in results:
+        print(f'ID {p.id}: {p.nombre} | Precio: {p.precio:.2f} | Stock: {p.stock}')
+    print()
+
+@stats.timed("inventory.update_product")
+def update_product() -> None:
+    products = read_inventory()
+    term = stats.prompt("ID o nombre del producto a actualizar: ").strip()
+    matches = _find_product(products, term)
+    if not matches:
+        print("Producto no encontrado.")
+        return
+    
+    # Si hay varios, elegir por ID
+    if len(matches) > 1:
+        print("Multiples coincidencias. Especifique el ID.")
+        for p in matches:
+            print(f'ID {p.id}: {p.nombre}')
+        return
+    p = matches[0]
+    print(f'Seleccionado: ID {p.id} - {p.nombre} (Precio: {p.precio:.2f}, Stock: {p.stock})')
+    print("¿Qué desea actualizar?")
+    print("1. Precio")
+    print("2. Stock")
+    choice = stats.prompt("Opción: ").strip()
+    if choice == "1":
+        try:
+            new_price = float(stats.prompt("Nuevo precio: ").strip())
+            if new_price < 0:
+                raise ValueError
+        except ValueError:
+            print("Precio invalido.")
+            return
+        change_product(p, precio=new_price)
+    elif choice == "2":
+        try:
+            new_stock = int(stats.prompt("Nuevo stock (≥ 0): ").strip())
+            if new_stock < 0:
+                raise ValueError
+        except ValueError:
+            print("Stock invalido.")
+            return
+        change_product(p, stock=new_stock)
+    else:
+        print("Opción invalida.")
+        return
+    print("Producto actualizado.")
+
+def get_product(pid: int) -> Product:
+    """Producto con ese id; ValueError si no existe."""
+    p = find_product(pid)
+    if p is None:
+        raise ValueError("Producto no encontrado.")
+    return p
+
+def change_product(p: Product, precio: Optional[float] = None, stock: Optional[int] = None) -> Product:
+    """Cambia el precio y/o el stock de un producto (leido de read_inventory)."""
+    if precio is not None and precio < 0:
+        raise ValueError("Precio invalido.")
+    if stock is not None and stock < 0:
+        raise ValueError("Stock invalido.")
+    deltas = {p.id: stock - p.stock} if stock is not None else {}
+    prices = {p.id: to_cents(precio)} if precio is not None else {}
+    apply_inventory_changes(deltas, prices)
+
+    # Los nombres no cambian: el indice sigue valido
+    search_index.sync(inventory_version())
+    if precio is not None:
+        p.precio_cents = to_cents(precio)
+    if stock is not None:
+        p.stock = stock
+    return p
+
+@stats.timed("inventory.delete_product")
+def delete_product() -> None:
+    products = read_inventory()
+    term = stats.prompt("ID o nombre del producto a eliminar: ").strip()
+    matches = _find_product(products, term)
+    if not matches:
+        print("Producto no encontrado.")
+        return
+    if len(matches) > 1:
+        print("Multiples coincidencias. Especifique el ID.")
+        for p in matches:
+            print(f'ID {p.id}: {p.nombre}')
+        return
+    p = matches[0]
+    confirm = stats.prompt(f'Confirmar eliminación de "{p.nombre}" (S/N): ').strip().lower()
+    if confirm != "s":
+        print("Operacion cancelada.")
+        return
+    remove_product(p, products)
+    print("Producto eliminado.")
+
+def remove_product(p: Product, products: Optional[List[Product]] = None) -> Product:
+    """Saca el producto del inventario."""
+    if products is None:
+        products = read_inventory()
+    products = [pr for pr in products if pr.id != p.id]
+    write_inventory(products)
+    search_index.remove(p.id)
+    search_index.sync(inventory_version())
+    return p
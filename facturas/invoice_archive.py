@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import argparse
+from bisect import bisect_right
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from models import Invoice
+import io_utils
+import stats
+
+# Archivo frio de facturas: los meses cerrados salen de segmentos/ y pasan a
+# archivo/AAAA-MM.zblk, con los registros comprimidos en bloques independientes
+# de unos BLOCK_BYTES. Buscar una factura descomprime un solo bloque y los
+# recorridos leen muchos menos bytes. Los meses recientes siguen en segmentos,
+# donde se agregan las facturas nuevas.
+#
+# Formato:
+#   HEADER       magic, largo del diccionario
+#   diccionario  muestra de registros del mes (zlib zdict): claves, clientes y
+#                productos que se repiten comprimen bien aun en bloques chicos
+#   bloques      registros JSON del mes en orden de id, como en los segmentos
+#   pie          JSON: manifiesto del mes (mismos campos que el de un segmento),
+#                ultimo id del segmento (lapidas incluidas) e indice de bloques
+#                [primer id, ultimo id, desde, hasta, offset, largo, facturas]
+#   TRAILER      largo del pie, magic
+#
+# Guardar una factura de un mes archivado (edicion, eliminacion, importacion
+# con fecha vieja) lo devuelve a segmentos antes de escribir; ver
+# io_utils._reopen_archived.
+#
+# Archivar y restaurar toman archivo/archivando.lock (io_utils.archive_lock),
+# igual que las escrituras que reabren un mes archivado. Mientras un mes tiene
+# segmento, las lecturas ignoran su archivo; solo este modulo, con el candado,
+# borra un archivo que quedo de mas.
+#
+# Uso: python invoice_archive.py [--meses N | --hasta AAAA-MM]   (archiva)
+#      python invoice_archive.py --restaurar AAAA-MM
+#      python invoice_archive.py --listar
+
+MAGIC = b"FZB1"
+HEADER = struct.Struct("<4sI")   # magic, largo del diccionario
+TRAILER = struct.Struct("<Q4s")  # largo del pie, magic
+
+# Bytes sin comprimir por bloque
+BLOCK_BYTES = 64 * 1024
+
+# Ventana de zlib: un diccionario mas largo no se usa
+DICT_BYTES = 32 * 1024
+
+# Meses recientes que quedan en segmentos (el actual incluido)
+KEEP_MONTHS = 3
+
+def _dictionary(records: List[bytes]) -> bytes:
+    # Registros repartidos por todo el mes; zlib aprovecha mas el final del diccionario
+    step = max(1, sum(len(r) for r in records) // DICT_BYTES)
+    return b"".join(records[::step])[-DICT_BYTES:]
+
+def _blocks(records: List[bytes]) -> Iterator[Tuple[int, int]]:
+    # Rangos [inicio, fin) de registros de unos BLOCK_BYTES
+    start = size = 0
+    for n, raw in enumerate(records):
+        size += len(raw)
+        if size >= BLOCK_BYTES:
+            yield start, n + 1
+            start, size = n + 1, 0
+    if start < len(records):
+        yield start, len(records)
+
+@stats.timed("invoice_archive.write")
+def write(path: str, month: str, invoices: List[Invoice], last_id: Optional[int] = None) -> Dict[str, Any]:
+    """Escribe las facturas del mes en path (reemplazo atomico); devuelve el pie.
+
+    last_id es el ultimo id que uso el mes, aunque la factura ya no exista.
+    """
+    invoices = sorted(invoices, key=lambda inv: inv.id)
+    records = [io_utils._encode_invoice(inv.to_dict()) for inv in invoices]
+    zdict = _dictionary(records)
+    footer = io_utils._empty_manifest(month)
+    del footer["tamano"]
+    footer.update(bloques=[], bytes_originales=sum(len(r) for r in records))
+    if last_id is not None:
+        footer["ultimo_id"] = last_id
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(zdict)) + zdict)
+        offset = f.tell()
+        for start, end in _blocks(records):
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+            data = compressor.compress(b"".join(records[start:end])) + compressor.flush()
+            group = invoices[start:end]
+            fechas = [inv.fecha for inv in group]
+            footer["bloques"].append([group[0].id, group[-1].id, min(fechas), max(fechas), offset, len(data), len(group)])
+            for inv in group:
+                io_utils._manifest_add(footer, inv, 1)
+            f.write(data)
+            offset += len(data)
+        payload = json.dumps(footer, ensure_ascii=False).encode("utf-8")
+        f.write(payload + TRAILER.pack(len(payload), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        if stats.ENABLED:
+            stats.add("bytes_escritos", f.tell())
+    os.replace(tmp, path)
+    io_utils._fsync_dir(path)
+    footer["diccionario"] = zdict
+    return footer
+
+def read_footer(path: str) -> Optional[Dict[str, Any]]:
+    """Pie del archivo con el diccionario en "diccionario", o None si esta danado."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size + TRAILER.size:
+                return None
+            magic, dict_len = HEADER.unpack(f.read(HEADER.size))
+            zdict = f.read(dict_len)
+            f.seek(size - TRAILER.size)
+            length, end_magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC or end_magic != MAGIC or length > size - TRAILER.size - HEADER.size - dict_len:
+                return None
+            f.seek(size - TRAILER.size - length)
+            footer = json.loads(f.read(length))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(footer, dict) or "bloques" not in footer:
+        return None
+    footer["diccionario"] = zdict
+    return footer
+
+def _read_block(f: Any, footer: Dict[str, Any], block: List[Any]) -> List[bytes]:
+    f.seek(block[4])
+    data = f.read(block[5])
+    if stats.ENABLED:
+        stats.add("bytes_leidos", len(data))
+        stats.add("bloques")
+    return zlib.decompressobj(zdict=footer["diccionario"]).decompress(data).splitlines(keepends=True)
+
+def iter_records(path: str, footer: Dict[str, Any], from_id: Optional[int] = None,
+                 desde: str = "", hasta: str = "") -> Iterator[bytes]:
+    """Registros de los bloques que pueden tener facturas desde from_id y del periodo."""
+    with open(path, "rb") as f:
+        for block in footer["bloques"]:
+            # El indice de bloques descarta sin descomprimir
+            if from_id is not None and block[1] < from_id:
+                continue
+            if (desde and block[3][:10] < desde) or (hasta and block[2][:10] > hasta):
+                continue
+            yield from _read_block(f, footer, block)
+
+def find(path: str, footer: Dict[str, Any], iid: int) -> Optional[bytes]:
+    """Registro de la factura iid, descomprimiendo solo el bloque que la contiene."""
+    blocks = footer["bloques"]
+    pos = bisect_right([block[0] for block in blocks], iid) - 1
+    if pos < 0 or blocks[pos][1] < iid:
+        return None
+    # Invoice.to_dict() pone el id primero
+    prefix = b'{"id": %d,' % iid
+    with open(path, "rb") as f:
+        for raw in _read_block(f, footer, blocks[pos]):
+            if raw.startswith(prefix):
+                return raw
+    return None
+
+def _require_files() -> None:
+    if io_utils.STORAGE_BACKEND != "archivos":
+        raise ValueError("El archivo de facturas solo existe con el backend de archivos.")
+
+def closed_months(keep: int = KEEP_MONTHS, hasta: str = "") -> List[str]:
+    """Meses en segmentos que se pueden archivar: hasta el mes indicado o todos menos los keep mas recientes."""
+    if not hasta:
+        now = datetime.now()
+        last = now.year * 12 + now.month - 1 - keep
+        hasta = f"{last // 12:04d}-{last % 12 + 1:02d}"
+    return [month for month in sorted(io_utils._manifests()) if month <= hasta]
+
+def _drop_stale() -> None:
+    # Meses que quedaron en segmento y en archivo (corte entre los dos pasos de
+    # archivar o restaurar): el segmento esta completo, el archivo sobra
+    segments = io_utils._manifests()
+    for name in os.listdir(io_utils.ARCHIVE_DIR):
+        month, ext = os.path.splitext(name)
+        if ext == ".zblk" and month in segments:
+            io_utils._remove_archive(month)
+
+@stats.timed("invoice_archive.archive_month")
+def archive_month(month: str) -> Dict[str, Any]:
+    """Pasa el mes de su segmento al archivo comprimido; devuelve el pie escrito."""
+    _require_files()
+    io_utils.ensure_files_exist()
+    with io_utils.archive_lock():
+        _drop_stale()
+        if month not in io_utils._manifests():
+            raise ValueError(f"No hay segmento del mes {month}.")
+        path = io_utils._segment_path(month)
+        signature = io_utils._file_signature(path)
+        # Solo las versiones vigentes: versiones viejas y lapidas no se archivan
+        invoices = list(io_utils._iter_segment(month, None, False, "", ""))
+        last_id = max((iid for iid, _, _, _ in io_utils._read_index_file(path)), default=None)
+        # Mientras exista el segmento las lecturas lo usan a el e ignoran el archivo
+        footer = io_utils._write_archive(month, invoices, last_id)
+        if io_utils._file_signature(path) != signature:
+            # Llego una factura del mes mientras se archivaba: el archivo no la tiene
+            io_utils._remove_archive(month)
+            raise ValueError(f"El mes {month} cambio mientras se archivaba; reintentar.")
+        # El archivo ya esta completo en disco: el segmento sobra
+        io_utils._remove_segment(month)
+    return footer
+
+def restore_month(month: str) -> int:
+    """Devuelve el mes archivado a segmentos; devuelve cuantas facturas tiene."""
+    _require_files()
+    io_utils.ensure_files_exist()
+    with io_utils.archive_lock():
+        _drop_stale()
+        if month not in io_utils._archive_manifests():
+            raise ValueError(f"El mes {month} no esta archivado.")
+        return io_utils._restore_archive(month)
+
+def list_archives() -> List[Tuple[str, int, int, int, int]]:
+    """Meses archivados: (mes, facturas, bloques, bytes sin comprimir, bytes en disco)."""
+    _require_files()
+    io_utils.ensure_files_exist()
+    return [
+        (month, m["facturas"], len(m["bloques"]), m["bytes_originales"], os.path.getsize(io_utils._archive_path(month)))
+        for month, m in sorted(io_utils._archive_manifests().items())
+    ]
+
+def _print_archives(rows: List[Tuple[str, int, int, int, int]]) -> None:
+    if not rows:
+        print("No hay meses archivados.")
+        return
+    print(f'{"Mes":<8} {"Facturas":>9} {"Bloques":>8} {"Original":>12} {"En disco":>12} {"Ratio":>6}')
+    for month, count, blocks, original, size in rows:
+        print(f'{month:<8} {count:>9} {blocks:>8} {original:>12} {size:>12} {original / max(size, 1):>6.1f}')
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Archiva los meses cerrados en bloques comprimidos.")
+    parser.add_argument("--meses", type=int, default=KEEP_MONTHS, help="meses recientes que quedan sin archivar")
+    parser.add_argument("--hasta", default="", help="archivar los meses hasta AAAA-MM inclusive")
+    parser.add_argument("--restaurar", metavar="AAAA-MM", help="devolver un mes archivado a segmentos")
+    parser.add_argument("--listar", action="store_true", help="mostrar los meses archivados")
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+    start = time.perf_counter()
+    try:
+        if args.listar:
+            _print_archives(list_archives())
+            return
+        if args.restaurar:
+            count = restore_month(args.restaurar)
+            print(f"Mes {args.restaurar} restaurado: {count} facturas de vuelta en segmentos.")
+            return
+        _require_files()
+        io_utils.ensure_files_exist()
+        months = closed_months(max(args.meses, 1), args.hasta)
+        for month in months:
+            before = os.path.getsize(io_utils._segment_path(month))
+            footer = archive_month(month)
+            after = os.path.getsize(io_utils._archive_path(month))
+            print(f'{month}: {footer["facturas"]} facturas, {len(footer["bloques"])} bloques, '
+                  f'{before} -> {after} bytes')
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+    if not months:
+        print("No hay meses para archivar.")
+    print(f"Tiempo: {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from models import Invoice
+from invoice_index import normalize
+import io_utils
+import stats
+
+# Exportacion de lineas de factura a CSV para contabilidad: una fila por item
+# con los datos de su factura. Las facturas se leen de a una desde los
+# segmentos y cada fila se escribe apenas se arma, asi que la memoria no crece
+# con el tamaño del historial.
+#
+# El IVA de cada linea es su parte proporcional del IVA de la factura; el
+# redondeo sobrante va a la ultima linea, de modo que la suma de las lineas da
+# exactamente el IVA facturado.
+#
+# Con --procesos N (solo backend de archivos) cada proceso exporta porciones
+# de los segmentos a un archivo parcial y despues se concatenan en orden. Las
+# filas quedan por mes y en el orden en que se guardaron las facturas; en modo
+# secuencial quedan en orden de id.
+#
+# Uso: python invoice_export.py [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD] [--cliente PREFIJO]
+#                               [--salida lineas_facturas.csv] [--procesos N]
+
+EXPORT_FILE = "lineas_facturas.csv"
+
+COLUMNS = ["factura_id", "fecha", "cliente", "product_id", "producto",
+           "cantidad", "precio_unitario", "total_linea", "iva_linea"]
+
+# Buffer de escritura del CSV y de la concatenacion de partes
+BUFFER_BYTES = 1024 * 1024
+
+# Tamaño de cada porcion de segmento que exporta un proceso
+CHUNK_BYTES = 32 * 1024 * 1024
+
+def _money(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+def _rows(inv: Invoice) -> Iterator[List[Any]]:
+    remaining = inv.iva_cents
+    last = len(inv.items) - 1
+    for n, it in enumerate(inv.items):
+        if n == last:
+            iva = remaining
+        elif inv.subtotal_cents:
+            iva = inv.iva_cents * it.line_total_cents // inv.subtotal_cents
+        else:
+            iva = 0
+        remaining -= iva
+        yield [inv.id, inv.fecha, inv.cliente, it.product_id, it.product_name, it.quantity,
+               _money(it.unit_price_cents), _money(it.line_total_cents), _money(iva)]
+
+def _matches(record: Dict[str, Any], desde: str, hasta: str, cliente: Optional[str]) -> bool:
+    day = record["fecha"][:10]
+    if (desde and day < desde) or (hasta and day > hasta):
+        return False
+    return cliente is None or normalize(record["cliente"]).startswith(cliente)
+
+def _open_csv(path: str) -> Any:
+    return open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_BYTES)
+
+def _export_sequential(f: Any, desde: str, hasta: str, cliente: Optional[str]) -> Tuple[int, int]:
+    writer = csv.writer(f)
+    invoices = lines = 0
+    for inv in io_utils.iter_invoices(desde=desde, hasta=hasta):
+        if cliente is not None and not normalize(inv.cliente).startswith(cliente):
+            continue
+        for row in _rows(inv):
+            writer.writerow(row)
+            lines += 1
+        invoices += 1
+    return invoices, lines
+
+def _export_chunk(path: str, start: int, end: int, part: str,
+                  desde: str, hasta: str, cliente: Optional[str]) -> Tuple[int, int]:
+    """Exporta a part las facturas vigentes que empiezan en [start, end) del segmento."""
+    invoices = lines = 0
+    with _open_csv(part) as out:
+        writer = csv.writer(out)
+        for raw in io_utils.iter_chunk(path, start, end):
+            try:
+                # Filtrar por el encabezado antes de decodificar los items
+                if _matches(io_utils.decode_header(raw), desde, hasta, cliente):
+                    inv = Invoice.from_dict(json.loads(raw))
+                    for row in _rows(inv):
+                        writer.writerow(row)
+                        lines += 1
+                    invoices += 1
+            except (KeyError, TypeError, ValueError):
+                # Ignorar registros corruptos
+                pass
+    return invoices, lines
+
+def _export_archive(month: str, part: str, desde: str, hasta: str, cliente: Optional[str]) -> Tuple[int, int]:
+    """Exporta a part las facturas del mes archivado."""
+    invoices = lines = 0
+    with _open_csv(part) as out:
+        writer = csv.writer(out)
+        for inv in io_utils.iter_archived(month, False, desde, hasta):
+            if cliente is not None and not normalize(inv.cliente).startswith(cliente):
+                continue
+            for row in _rows(inv):
+                writer.writerow(row)
+                lines += 1
+            invoices += 1
+    return invoices, lines
+
+def _export_parallel(f: Any, path: str, desde: str, hasta: str, cliente: Optional[str],
+                     procesos: int, chunk_bytes: int) -> Tuple[int, int]:
+    # Porciones de segmentos y meses archivados enteros, por mes; los
+    # manifiestos descartan los meses fuera del periodo sin abrirlos
+    tasks = [(month, _export_chunk, (seg, start, end))
+             for month, seg, start, end in io_utils.segment_chunks(chunk_bytes, desde, hasta)]
+    tasks += [(month, _export_archive, (month,)) for month in io_utils.archived_months(desde, hasta)]
+    tasks.sort(key=lambda task: task[0])
+    parts = [f"{path}.parte{n}" for n in range(len(tasks))]
+    invoices = lines = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(procesos, len(tasks)))) as pool:
+            jobs = [pool.submit(fn, *args, part, desde, hasta, cliente)
+                    for (_, fn, args), part in zip(tasks, parts)]
+            # Concatenar en orden a medida que terminan
+            for job, part in zip(jobs, parts):
+                part_invoices, part_lines = job.result()
+                invoices += part_invoices
+                lines += part_lines
+                f.flush()
+                with open(part, "rb") as src:
+                    shutil.copyfileobj(src, f.buffer, BUFFER_BYTES)
+                os.remove(part)
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    return invoices, lines
+
+@stats.timed("invoice_export.export_lines")
+def export_lines(path: str = EXPORT_FILE, desde: str = "", hasta: str = "", cliente: str = "",
+                 procesos: int = 1, chunk_bytes: int = CHUNK_BYTES) -> Tuple[int, int]:
+    """Escribe las lineas de las facturas del periodo (y del cliente, por prefijo) en CSV.
+
+    Devuelve cuantas facturas y cuantas lineas se exportaron.
+    """
+    key = normalize(cliente) if cliente else None
+    parallel = procesos > 1 and io_utils.STORAGE_BACKEND == "archivos"
+    if parallel:
+        # Recuperar lo pendiente antes de repartir: los procesos solo leen
+        io_utils.ensure_files_exist()
+    tmp = path + ".tmp"
+    try:
+        with _open_csv(tmp) as f:
+            csv.writer(f).writerow(COLUMNS)
+            if parallel:
+                invoices, lines = _export_parallel(f, path, desde, hasta, key, procesos, chunk_bytes)
+            else:
+                invoices, lines = _export_sequential(f, desde, hasta, key)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if stats.ENABLED:
+        stats.add("registros", lines)
+    return invoices, lines
+
+def export_invoice_lines() -> None:
+    desde = input("Desde (AAAA-MM-DD, ENTER = inicio): ").strip()
+    hasta = input("Hasta (AAAA-MM-DD, ENTER = sin limite): ").strip()
+    cliente = input("Cliente (ENTER = todos): ").strip()
+    path = input(f"Archivo de salida [{EXPORT_FILE}]: ").strip() or EXPORT_FILE
+    invoices, lines = export_lines(path, desde, hasta, cliente)
+    print(f"{lines} lineas de {invoices} facturas exportadas a {path}.")
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporta las lineas de factura a CSV sin cargar el historial.")
+    parser.add_argument("--desde", default="", help="AAAA-MM-DD")
+    parser.add_argument("--hasta", default="", help="AAAA-MM-DD")
+    parser.add_argument("--cliente", default="", help="prefijo del cliente (sin distinguir mayusculas ni tildes)")
+    parser.add_argument("--salida", default=EXPORT_FILE)
+    parser.add_argument("--procesos", type=int, default=1, help="procesos en paralelo (solo backend de archivos)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES // (1024 * 1024), help="MB por porcion")
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+    start = time.perf_counter()
+    try:
+        invoices, lines = export_lines(args.salida, args.desde, args.hasta, args.cliente,
+                                       args.procesos, max(1, args.chunk_mb) * 1024 * 1024)
+    except (OSError, ValueError, ConnectionError) as e:
+        print(e)
+        sys.exit(1)
+    print(f"{lines} lineas de {invoices} facturas exportadas a {args.salida} "
+          f"({time.perf_counter() - start:.2f} s).")
+
+if __name__ == "__main__":
+    main()
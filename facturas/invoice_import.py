@@ -0,0 +1,150 @@
+import os
+import csv
+import json
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Tuple
+from models import Product, InvoiceItem
+from io_utils import read_inventory, commit_invoices, next_id, INVOICE_SEQUENCE
+from invoices import make_item, build_invoice, DATE_FORMAT
+
+# CSV: una fila por item, filas consecutivas con el mismo "pedido" forman una factura
+CSV_COLUMNS = ("pedido", "cliente", "fecha", "product_id", "quantity")
+
+def _read_csv_orders(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in CSV_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Columnas faltantes en CSV: {', '.join(missing)}")
+        ref, order = None, None
+        for row in reader:
+            if row["pedido"] != ref:
+                if order is not None:
+                    yield ref, order
+                ref = row["pedido"]
+                order = {"cliente": row["cliente"], "fecha": row["fecha"], "items": []}
+            order["items"].append({"product_id": row["product_id"], "quantity": row["quantity"]})
+        if order is not None:
+            yield ref, order
+
+def _read_jsonl_orders(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                order = json.loads(line)
+            except ValueError:
+                order = None
+            ref = f"linea {n}"
+            if isinstance(order, dict) and order.get("pedido") is not None:
+                ref = str(order["pedido"])
+            yield ref, order
+
+def read_orders(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Pedidos del archivo, uno a la vez: (referencia, pedido)."""
+    if path.lower().endswith(".csv"):
+        return _read_csv_orders(path)
+    return _read_jsonl_orders(path)
+
+def _validate_order(order: Any, products_by_id: Dict[int, Product], stock: Dict[int, int]) -> Tuple[str, str, List[InvoiceItem]]:
+    if not isinstance(order, dict):
+        raise ValueError("registro invalido")
+    cliente = str(order.get("cliente") or "").strip()
+    if not cliente:
+        raise ValueError("cliente invalido")
+    fecha = str(order.get("fecha") or "").strip()
+    if fecha:
+        try:
+            datetime.strptime(fecha, DATE_FORMAT)
+        except ValueError:
+            raise ValueError(f"fecha invalida: {fecha}")
+    else:
+        fecha = datetime.now().strftime(DATE_FORMAT)
+
+    raw_items = order.get("items")
+    if raw_items is None or raw_items == []:
+        raise ValueError("pedido sin items")
+    if not isinstance(raw_items, list) or not all(isinstance(it, dict) for it in raw_items):
+        raise ValueError("item invalido")
+    items: List[InvoiceItem] = []
+    needed: Dict[int, int] = {}
+    for it in raw_items:
+        try:
+            pid = int(it["product_id"])
+            qty = int(it["quantity"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("item invalido")
+        if pid not in products_by_id:
+            raise ValueError(f"producto {pid} no encontrado")
+        if qty <= 0:
+            raise ValueError(f"cantidad invalida para producto {pid}")
+        needed[pid] = needed.get(pid, 0) + qty
+        items.append(make_item(products_by_id[pid], qty))
+    if not items:
+        raise ValueError("pedido sin items")
+
+    # Validar contra el stock que queda despues de los pedidos ya aceptados
+    for pid, qty in needed.items():
+        if stock[pid] < qty:
+            raise ValueError(f"stock insuficiente para producto {pid}")
+    return cliente, fecha, items
+
+def import_orders(path: str) -> Tuple[int, List[Tuple[str, str]]]:
+    """Importa todos los pedidos validos del archivo en una sola escritura.
+
+    Devuelve la cantidad de facturas creadas y los rechazos (referencia, motivo).
+    """
+    products_by_id = {p.id: p for p in read_inventory()}
+    stock = {pid: p.stock for pid, p in products_by_id.items()}
+    accepted: List[Tuple[str, str, List[InvoiceItem]]] = []
+    rejected: List[Tuple[str, str]] = []
+    try:
+        for ref, order in read_orders(path):
+            try:
+                cliente, fecha, items = _validate_order(order, products_by_id, stock)
+            except ValueError as e:
+                rejected.append((ref, str(e)))
+                continue
+            for it in items:
+                stock[it.product_id] -= it.quantity
+            accepted.append((cliente, fecha, items))
+    except (csv.Error, UnicodeDecodeError) as e:
+        # Archivo que no es CSV/JSON Lines en UTF-8: no se importa nada de el
+        raise ValueError(f"archivo ilegible ({os.path.basename(path)}): {e}")
+
+    if not accepted:
+        return 0, rejected
+
+    # Ids consecutivos reservados de una vez
+    first_id = next_id(INVOICE_SEQUENCE, len(accepted))
+    invoices = [
+        build_invoice(first_id + n, fecha, cliente, items)
+        for n, (cliente, fecha, items) in enumerate(accepted)
+    ]
+    deltas = {pid: stock[pid] - p.stock for pid, p in products_by_id.items() if stock[pid] != p.stock}
+    commit_invoices(deltas, invoices)
+    return len(invoices), rejected
+
+def write_error_report(path: str, rejected: List[Tuple[str, str]]) -> str:
+    report = os.path.splitext(path)[0] + ".errores.txt"
+    with open(report, "w", encoding="utf-8") as f:
+        for ref, reason in rejected:
+            f.write(f"{ref}|{reason}\n")
+    return report
+
+def import_invoices() -> None:
+    path = input("Archivo de pedidos (.csv o .jsonl): ").strip()
+    if not path or not os.path.exists(path):
+        print("Archivo no encontrado.")
+        return
+    try:
+        created, rejected = import_orders(path)
+    except ValueError as e:
+        print(f"Importacion cancelada: {e}")
+        return
+    print(f"Facturas importadas: {created}.")
+    if rejected:
+        report = write_error_report(path, rejected)
+        print(f"Pedidos rechazados: {len(rejected)} (ver {report}).")
@@ -0,0 +1,156 @@
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from models import Invoice
+from io_utils import iter_invoices, get_invoice, on_invoice_change
+from snapshot_store import SnapshotStore
+
+# Indices secundarios de facturas por cliente (normalizado) y por fecha.
+# Se guardan como los reportes (ver snapshot_store.py): un archivo completo
+# mas un journal de cambios, y se mantienen con cada factura guardada (io_utils.on_invoice_change).
+INDEX_FILE = "indices_facturas.json"
+INDEX_JOURNAL_FILE = "indices_facturas.journal"
+
+# Tamaño (bytes) a partir del cual el journal se incorpora al archivo completo
+INDEX_COMPACT_BYTES = 256 * 1024
+
+def normalize(cliente: str) -> str:
+    """Clave de busqueda del cliente: sin tildes, en minusculas y con espacios simples."""
+    if cliente.isascii():
+        return " ".join(cliente.lower().split())
+    decomposed = unicodedata.normalize("NFKD", cliente)
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+def _date_key(fecha: str, fill: str = "0") -> int:
+    # "AAAA-MM-DD HH:MM:SS" -> AAAAMMDDHHMMSS; una fecha sin hora se completa con fill
+    digits = fecha.replace("-", "").replace(" ", "").replace(":", "")
+    if not digits.isdigit():
+        digits = "".join(c for c in digits if c.isdigit())
+    return int((digits + fill * 14)[:14])
+
+def _empty() -> Dict[str, Any]:
+    # clientes: nombre normalizado -> ids en orden; nombres: claves de clientes ordenadas
+    # fechas/ids: claves de fecha ordenadas y el id de cada una (arreglos paralelos)
+    return {"clientes": {}, "nombres": [], "fechas": array("q"), "ids": array("q")}
+
+def _key(inv: Optional[Invoice]) -> Optional[List[Any]]:
+    return None if inv is None else [normalize(inv.cliente), inv.fecha]
+
+def _add(data: Dict[str, Any], iid: int, cliente: str, fecha: str) -> None:
+    ids = data["clientes"].get(cliente)
+    if ids is None:
+        data["clientes"][cliente] = array("q", [iid])
+        insort(data["nombres"], cliente)
+    else:
+        insort(ids, iid)
+    # Entre fechas iguales se mantiene el orden de llegada
+    key = _date_key(fecha)
+    pos = bisect_right(data["fechas"], key)
+    data["fechas"].insert(pos, key)
+    data["ids"].insert(pos, iid)
+
+def _remove(data: Dict[str, Any], iid: int, cliente: str, fecha: str) -> None:
+    ids = data["clientes"].get(cliente)
+    if ids is not None and iid in ids:
+        ids.remove(iid)
+        if not ids:
+            del data["clientes"][cliente]
+            data["nombres"].pop(bisect_left(data["nombres"], cliente))
+    key = _date_key(fecha)
+    fechas = data["fechas"]
+    for pos in range(bisect_left(fechas, key), bisect_right(fechas, key)):
+        if data["ids"][pos] == iid:
+            del fechas[pos]
+            del data["ids"][pos]
+            break
+
+def _apply(data: Dict[str, Any], change: Dict[str, Any]) -> None:
+    iid = change["id"]
+    if change.get("antes"):
+        _remove(data, iid, *change["antes"])
+    if change.get("despues"):
+        _add(data, iid, *change["despues"])
+
+def _decode(saved: Dict[str, Any]) -> Dict[str, Any]:
+    data = _empty()
+    data["clientes"] = {c: array("q", ids) for c, ids in saved["clientes"].items()}
+    data["nombres"] = sorted(data["clientes"])
+    data["fechas"] = array("q", saved["fechas"])
+    data["ids"] = array("q", saved["ids"])
+    return data
+
+def _encode(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "clientes": {c: ids.tolist() for c, ids in data["clientes"].items()},
+        "fechas": data["fechas"].tolist(),
+        "ids": data["ids"].tolist(),
+    }
+
+def _build() -> Tuple[Dict[str, Any], int]:
+    data = _empty()
+    count = 0
+    for inv in iter_invoices(headers_only=True):
+        _add(data, inv.id, normalize(inv.cliente), inv.fecha)
+        count += 1
+    return data, count
+
+_store = SnapshotStore(INDEX_FILE, INDEX_JOURNAL_FILE, INDEX_COMPACT_BYTES, _empty, _decode, _encode, _apply, _build)
+
+def _load() -> Dict[str, Any]:
+    return _store.load()
+
+def apply_change(previous: Optional[Invoice], current: Optional[Invoice]) -> None:
+    """Mueve la factura en los indices si cambio su cliente o su fecha (None = no existe)."""
+    before, after = _key(previous), _key(current)
+    if before == after:
+        # Edicion de items: los indices no cambian
+        return
+    _store.append({"id": (current or previous).id, "antes": before, "despues": after})
+
+def rebuild() -> int:
+    """Reconstruye los indices recorriendo los encabezados de todas las facturas."""
+    return _store.rebuild()
+
+def customers(prefix: str) -> List[str]:
+    """Clientes (normalizados) cuyo nombre empieza con prefix, en orden alfabetico."""
+    names = _load()["nombres"]
+    key = normalize(prefix)
+    result = []
+    pos = bisect_left(names, key)
+    while pos < len(names) and names[pos].startswith(key):
+        result.append(names[pos])
+        pos += 1
+    return result
+
+def customer_ids(prefix: str) -> List[int]:
+    """Ids de las facturas de los clientes que empiezan con prefix, en orden de id."""
+    clientes = _load()["clientes"]
+    ids: List[int] = []
+    for cliente in customers(prefix):
+        ids.extend(clientes[cliente])
+    return sorted(ids)
+
+def date_ids(desde: str = "", hasta: str = "") -> List[int]:
+    """Ids de las facturas entre desde y hasta (AAAA-MM-DD, inclusive), en orden de fecha."""
+    data = _load()
+    fechas = data["fechas"]
+    lo = bisect_left(fechas, _date_key(desde)) if desde else 0
+    hi = bisect_right(fechas, _date_key(hasta, "9")) if hasta else len(fechas)
+    return data["ids"][lo:hi].tolist()
+
+def fetch(ids: List[int], prefix: Optional[str] = None) -> Iterator[Invoice]:
+    """Encabezados de las facturas de la lista de ids, leidos de a uno (sin los items).
+
+    Salta las que el indice tenga desactualizadas: eliminadas o, si se pasa
+    el prefijo buscado, de un cliente que ya no coincide.
+    """
+    key = normalize(prefix) if prefix is not None else None
+    for iid in ids:
+        inv = get_invoice(iid, headers_only=True)
+        if inv is None or (key is not None and not normalize(inv.cliente).startswith(key)):
+            continue
+        yield inv
+
+# Mantener los indices al dia con cada factura guardada
+on_invoice_change(apply_change)
@@ -1,304 +1,358 @@
-from typing import List, Dict, Any
-from datetime import datetime
-from io_utils import read_inventory, write_inventory, read_invoices, write_invoices, append_invoice
-
-IVA_RATE = 0.19
-
-def _next_invoice_id(invoices: List[Dict[str, Any]]) -> int:
-    return (max((i["id"] for i in invoices), default=0) + 1)
-
-def list_invoices() -> None:
-    invoices = read_invoices()
-    if not invoices:
-        print("No hay facturas registradas.")
-        return
-    print("\n=== Facturas ===")
-    print(f'{"ID":<5} {"Fecha":<20} {"Cliente":<25} {"Total":>12}')
-    for inv in invoices:
-        print(f'{inv["id"]:<5} {inv["fecha"]:<20} {inv["cliente"]:<25} {inv["total"]:>12.2f}')
-    print()
-
-def _print_invoice(inv: Dict[str, Any]) -> None:
-    print("\n=== Detalle de Factura ===")
-    print(f'ID: {inv["id"]}')
-    print(f'Fecha: {inv["fecha"]}')
-    print(f'Cliente: {inv["cliente"]}')
-    print("\nItems:")
-    print(f'{"ProdID":<7} {"Nombre":<25} {"Cant":>5} {"P.Unit":>10} {"Total":>12}')
-    for it in inv["items"]:
-        print(f'{it["product_id"]:<7} {it["product_name"]:<25} {it["quantity"]:>5} {it["unit_price"]:>10.2f} {it["line_total"]:>12.2f}')
-    print(f'\nSubtotal: {inv["subtotal"]:.2f}')
-    print(f'IVA (19%): {inv["iva"]:.2f}')
-    print(f'Total: {inv["total"]:.2f}\n')
-
-def show_invoice_detail() -> None:
-    invoices = read_invoices()
-    if not invoices:
-        print("No hay facturas.")
-        return
-    try:
-        iid = int(input("ID de la factura: ").strip())
-    except ValueError:
-        print("ID invalido.")
-        return
-    inv = next((i for i in invoices if i["id"] == iid), None)
-    if not inv:
-        print("Factura no encontrada.")
-        return
-    _print_invoice(inv)
-
-def _calc_totals(items: List[Dict[str, Any]]) -> Dict[str, float]:
-    subtotal = sum(it["line_total"] for it in items)
-    iva = round(subtotal * IVA_RATE, 2)
-    total = round(subtotal + iva, 2)
-    return {"subtotal": round(subtotal, 2), "iva": iva, "total": total}
-
-def create_invoice() -> None:
-    products = read_inventory()
-    if not products:
-        print("No hay productos en inventario para facturar.")
-        return
-    customer = input("Nombre del cliente: ").strip()
-    if not customer:
-        print("Cliente invalido.")
-        return
-
-    # Construcción de items
-    cart: List[Dict[str, Any]] = []
-    products_by_id = {p["id"]: p for p in products}
-
-    while True:
-        code = input("ID de producto (o ENTER para finalizar): ").strip()
-        if code == "":
-            break
-        if not code.isdigit():
-            print("ID invalido.")
-            continue
-        pid = int(code)
-        if pid not in products_by_id:
-            print("Producto no encontrado.")
-            continue
-        prod = products_by_id[pid]
-        print(f'Seleccionado: {prod["nombre"]} | Precio: {prod["precio"]:.2f} | Stock: {prod["stock"]}')
-        try:
-            qty = int(input("Cantidad: ").strip())
-            if qty <= 0:
-                raise ValueError
-        except ValueError:
-            print("Cantidad invalida.")
-            continue
-        if qty > prod["stock"]:
-            print("Stock insuficiente.")
-            continue
-        # Agregar al carrito (snapshot de precio)
-        line_total = round(prod["precio"] * qty, 2)
-        cart.append({
-            "product_id": prod["id"],
-            "product_name": prod["nombre"],
-            "quantity": qty,
-            "unit_price": float(prod["precio"]),
-            "line_total": line_total
-        })
-
-    if not cart:
-        print("Factura vacia, cancelada.")
-        return
-
-    totals = _calc_totals(cart)
-    invoices = read_invoices()
-    iid = _next_invoice_id(invoices)
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    invoice = {
-        "id": iid,
-        "fecha": now,
-        "cliente": customer,
-        "items": cart,
-        "subtotal": totals["subtotal"],
-        "iva": totals["iva"],
-        "total": totals["total"],
-    }
-
-    # Descontar stock
-    stock_changes = {}
-    for it in cart:
-        stock_changes[it["product_id"]] = stock_changes.get(it["product_id"], 0) + it["quantity"]
-
-    # Validar de nuevo y aplicar
-    for pid, delta in stock_changes.items():
-        if products_by_id[pid]["stock"] < delta:
-            print("Error de stock durante la confirmacion. Operacion cancelada.")
-            return
-    for pid, delta in stock_changes.items():
-        products_by_id[pid]["stock"] -= delta
-
-    # Persistir
-    write_inventory(list(products_by_id.values()))
-    append_invoice(invoice)
-    print(f"Factura creada con ID {iid}.")
-    _print_invoice(invoice)
-
-def delete_invoice() -> None:
-    invoices = read_invoices()
-    if not invoices:
-        print("No hay facturas.")
-        return
-    try:
-        iid = int(input("ID de la factura a eliminar: ").strip())
-    except ValueError:
-        print("ID invalido.")
-        return
-    inv = next((i for i in invoices if i["id"] == iid), None)
-    if not inv:
-        print("Factura no encontrada.")
-        return
-    confirm = input("Confirmar eliminacion y reversión de stock (S/N): ").strip().lower()
-    if confirm != "s":
-        print("Operacion cancelada.")
-        return
-
-    # Revertir stock
-    products = read_inventory()
-    by_id = {p["id"]: p for p in products}
-    for it in inv["items"]:
-        pid = it["product_id"]
-        if pid in by_id:
-            by_id[pid]["stock"] += it["quantity"]
-    write_inventory(list(by_id.values()))
-
-    # Remover factura
-    invoices = [i for i in invoices if i["id"] != iid]
-    write_invoices(invoices)
-    print("Factura eliminada y stock revertido.")
-
-def edit_invoice() -> None:
-    invoices = read_invoices()
-    if not invoices:
-        print("No hay facturas.")
-        return
-    try:
-        iid = int(input("ID de la factura a editar: ").strip())
-    except ValueError:
-        print("ID invalido.")
-        return
-    inv = next((i for i in invoices if i["id"] == iid), None)
-    if not inv:
-        print("Factura no encontrada.")
-        return
-
-    print("Editando items. Deje ID vacío para terminar.")
-    products = read_inventory()
-    by_id = {p["id"]: p for p in products}
-
-    # Construir mapa de cantidades originales
-    original_qty = {}
-    for it in inv["items"]:
-        original_qty[it["product_id"]] = original_qty.get(it["product_id"], 0) + it["quantity"]
-
-    # Mostrar items actuales
-    _print_invoice(inv)
-
-    # Nuevo conjunto de items
-    new_items: List[Dict[str, Any]] = []
-
-    while True:
-        code = input("ID de producto a establecer (ENTER para terminar): ").strip()
-        if code == "":
-            break
-        if not code.isdigit():
-            print("ID invalido.")
-            continue
-        pid = int(code)
-        if pid not in by_id:
-            print("Producto no encontrado.")
-            continue
-        prod = by_id[pid]
-        try:
-            qty = int(input("Nueva cantidad (0 para remover): ").strip())
-            if qty < 0:
-                raise ValueError
-        except ValueError:
-            print("Cantidad invalida.")
-            continue
-        if qty == 0:
-            # No lo añadimos
-            print(f'{prod["nombre"]} sera removido.')
-            continue
-        # El precio unitario es el actual del inventario o mantenemos el de la factura?
-        # Mantendremos el precio actual del inventario para cambios nuevos.
-        unit_price = float(prod["precio"])
-        line_total = round(unit_price * qty, 2)
-        new_items.append({
-            "product_id": prod["id"],
-            "product_name": prod["nombre"],
-            "quantity": qty,
-            "unit_price": unit_price,
-            "line_total": line_total
-        })
-
-    if not new_items:
-        print("La factura quedaria vacia. ¿Desea eliminarla? (S/N)")
-        ans = input().strip().lower()
-        if ans == "s":
-            # Delegar a delete_invoice?
-            # Hacemos la eliminación con reversión:
-            # Primero revertimos stock del original y no aplicamos nuevos cambios.
-            # Luego eliminamos la factura.
-            # Revertir stock original:
-            products = read_inventory()
-            by_id = {p["id"]: p for p in products}
-            for it in inv["items"]:
-                pid = it["product_id"]
-                if pid in by_id:
-                    by_id[pid]["stock"] += it["quantity"]
-            write_inventory(list(by_id.values()))
-            # Eliminar factura
-            invoices = [i for i in invoices if i["id"] != iid]
-            write_invoices(invoices)
-            print("Factura eliminada.")
-        else:
-            print("Edicion cancelada. Sin cambios.")
-        return
-
-    # Calcular deltas de stock: new - original
-    new_qty = {}
-    for it in new_items:
-        new_qty[it["product_id"]] = new_qty.get(it["product_id"], 0) + it["quantity"]
-
-    delta = {}
-    all_pids = set(new_qty.keys()).union(set(original_qty.keys()))
-    for pid in all_pids:
-        delta[pid] = new_qty.get(pid, 0) - original_qty.get(pid, 0)
-
-    # Validar stock para deltas positivos
-    products = read_inventory()
-    by_id = {p["id"]: p for p in products}
-    for pid, d in delta.items():
-        if d > 0:
-            if pid not in by_id:
-                print(f"Producto {pid} ya no existe en inventario. Edicion cancelada.")
-                return
-            if by_id[pid]["stock"] < d:
-                print(f"Stock insuficiente para producto {pid}. Edicion cancelada.")
-                return
-
-    # Aplicar deltas
-    for pid, d in delta.items():
-        if pid in by_id:
-            by_id[pid]["stock"] -= d  # si d<0, aumenta stock; si d>0, reduce
-    write_inventory(list(by_id.values()))
-
-    # Recalcular totales
-    totals = _calc_totals(new_items)
-    inv["items"] = new_items
-    inv["subtotal"] = totals["subtotal"]
-    inv["iva"] = totals["iva"]
-    inv["total"] = totals["total"]
-
-    # Persistir facturas
-    for i, f in enumerate(invoices):
-        if f["id"] == inv["id"]:
-            invoices[i] = inv
-            break
-    write_invoices(invoices)
-    print("Factura actualizada.")
-    _print_invoice(inv)
+from typing import List, Dict, Optional, Iterator, Tuple
+from models import Product, Invoice, InvoiceItem
+from datetime import datetime
+import reports  # mantiene los agregados de ventas al dia
+import invoice_index  # mantiene los indices por cliente y por fecha
+import stats
+from io_utils import (
+    read_inventory, commit_invoices,
+    count_invoices, get_invoice, iter_invoices, vacuum_invoices,
+    next_id, INVOICE_SEQUENCE,
+)
+
+IVA_RATE = 0.19
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Facturas por pagina en el listado interactivo
+PAGE_SIZE = 20
+
+def _next_invoice_id() -> int:
+    return next_id(INVOICE_SEQUENCE)
+
+@stats.timed("invoices.list_invoices")
+def list_invoices(from_id: Optional[int] = None, limit: Optional[int] = None, page_size: Optional[int] = PAGE_SIZE,
+                  desde: str = "", hasta: str = "") -> None:
+    # Solo encabezados, leidos de a uno: memoria constante sin importar el historial
+    headers = iter_invoices(from_id=from_id, headers_only=True, desde=desde, hasta=hasta)
+    empty = "No hay facturas en el periodo." if desde or hasta else "No hay facturas registradas."
+    _print_headers(headers, empty, limit, page_size)
+
+def _print_headers(headers: Iterator[Invoice], empty: str, limit: Optional[int] = None,
+                   page_size: Optional[int] = PAGE_SIZE) -> None:
+    inv = next(headers, None)
+    if inv is None:
+        print(empty)
+        return
+    print("\n=== Facturas ===")
+    print(f'{"ID":<5} {"Fecha":<20} {"Cliente":<25} {"Total":>12}')
+    shown = 0
+    while inv is not None:
+        print(f'{inv.id:<5} {inv.fecha:<20} {inv.cliente:<25} {inv.total:>12.2f}')
+        shown += 1
+        if limit is not None and shown >= limit:
+            break
+        inv = next(headers, None)
+        if inv is not None and page_size and shown % page_size == 0:
+            if stats.prompt("ENTER para ver mas, 0 para salir: ").strip() == "0":
+                break
+    headers.close()
+    print()
+
+@stats.timed("invoices.list_invoices_by_date")
+def list_invoices_by_date() -> None:
+    # Indice por fecha: en orden cronologico y leyendo solo las facturas del periodo
+    desde = stats.prompt("Desde (AAAA-MM-DD, ENTER = inicio): ").strip()
+    hasta = stats.prompt("Hasta (AAAA-MM-DD, ENTER = sin limite): ").strip()
+    _print_headers(invoice_index.fetch(invoice_index.date_ids(desde, hasta)), "No hay facturas en el periodo.")
+
+@stats.timed("invoices.search_invoices_by_customer")
+def search_invoices_by_customer() -> None:
+    # Indice por cliente: el nombre se compara sin tildes ni mayusculas
+    prefix = stats.prompt("Cliente (o el comienzo del nombre): ").strip()
+    if not prefix:
+        print("Ingrese al menos una letra.")
+        return
+    names = invoice_index.customers(prefix)
+    if not names:
+        print("No hay facturas de ese cliente.")
+        return
+    if len(names) > 1:
+        shown = ", ".join(names[:10]) + (f" y {len(names) - 10} mas" if len(names) > 10 else "")
+        print(f"{len(names)} clientes coinciden: {shown}")
+    _print_headers(invoice_index.fetch(invoice_index.customer_ids(prefix), prefix), "No hay facturas de ese cliente.")
+
+def _print_invoice(inv: Invoice) -> None:
+    print("\n=== Detalle de Factura ===")
+    print(f'ID: {inv.id}')
+    print(f'Fecha: {inv.fecha}')
+    print(f'Cliente: {inv.cliente}')
+    print("\nItems:")
+    print(f'{"ProdID":<7} {"Nombre":<25} {"Cant":>5} {"P.Unit":>10} {"Total":>12}')
+    for it in inv.items:
+        print(f'{it.product_id:<7} {it.product_name:<25} {it.quantity:>5} {it.unit_price:>10.2f} {it.line_total:>12.2f}')
+    print(f'\nSubtotal: {inv.subtotal:.2f}')
+    print(f'IVA (19%): {inv.iva:.2f}')
+    print(f'Total: {inv.total:.2f}\n')
+
+@stats.timed("invoices.show_invoice_detail")
+def show_invoice_detail() -> None:
+    if not count_invoices():
+        print("No hay facturas.")
+        return
+    try:
+        iid = int(stats.prompt("ID de la factura: ").strip())
+    except ValueError:
+        print("ID invalido.")
+        return
+    inv = get_invoice(iid)
+    if not inv:
+        print("Factura no encontrada.")
+        return
+    _print_invoice(inv)
+
+def _calc_totals(items: List[InvoiceItem]) -> Dict[str, int]:
+    # Montos en centavos: la suma es exacta y solo el IVA se redondea
+    subtotal = sum(it.line_total_cents for it in items)
+    iva = round(subtotal * IVA_RATE)
+    return {"subtotal": subtotal, "iva": iva, "total": subtotal + iva}
+
+def make_item(prod: Product, qty: int) -> InvoiceItem:
+    """Linea de factura con el nombre y el precio actuales del producto."""
+    return InvoiceItem(prod.id, prod.nombre, qty, prod.precio_cents)
+
+def build_invoice(iid: int, fecha: str, cliente: str, items: List[InvoiceItem]) -> Invoice:
+    """Factura con subtotal, IVA y total calculados a partir de los items (no la guarda)."""
+    totals = _calc_totals(items)
+    return Invoice(iid, fecha, cliente, items, totals["subtotal"], totals["iva"], totals["total"])
+
+def _returned_stock(items: List[InvoiceItem]) -> Dict[int, int]:
+    # Stock a devolver al inventario por cada producto de la factura
+    returned: Dict[int, int] = {}
+    for it in items:
+        returned[it.product_id] = returned.get(it.product_id, 0) + it.quantity
+    return returned
+
+@stats.timed("invoices.create_invoice")
+def create_invoice() -> None:
+    products = read_inventory()
+    if not products:
+        print("No hay productos en inventario para facturar.")
+        return
+    customer = stats.prompt("Nombre del cliente: ").strip()
+    if not customer:
+        print("Cliente invalido.")
+        return
+
+    # Construcción de items
+    cart: List[InvoiceItem] = []
+    products_by_id = {p.id: p for p in products}
+
+    while True:
+        code = stats.prompt("ID de producto (o ENTER para finalizar): ").strip()
+        if code == "":
+            break
+        if not code.isdigit():
+            print("ID invalido.")
+            continue
+        pid = int(code)
+        if pid not in products_by_id:
+            print("Producto no encontrado.")
+            continue
+        prod = products_by_id[pid]
+        print(f'Seleccionado: {prod.nombre} | Precio: {prod.precio:.2f} | Stock: {prod.stock}')
+        try:
+            qty = int(stats.prompt("Cantidad: ").strip())
+            if qty <= 0:
+                raise ValueError
+        except ValueError:
+            print("Cantidad invalida.")
+            continue
+        if qty > prod.stock:
+            print("Stock insuficiente.")
+            continue
+        # Agregar al carrito (snapshot de precio)
+        cart.append(make_item(prod, qty))
+
+    if not cart:
+        print("Factura vacia, cancelada.")
+        return
+
+    try:
+        invoice = _save_new_invoice(customer, cart, products_by_id)
+    except ValueError as e:
+        # Otra caja vendio el stock mientras tanto (el servidor vuelve a validar)
+        print(f"{e} Operacion cancelada.")
+        return
+    print(f"Factura creada con ID {invoice.id}.")
+    _print_invoice(invoice)
+
+def _save_new_invoice(customer: str, cart: List[InvoiceItem], products_by_id: Dict[int, Product]) -> Invoice:
+    # Descontar stock
+    stock_changes: Dict[int, int] = {}
+    for it in cart:
+        stock_changes[it.product_id] = stock_changes.get(it.product_id, 0) + it.quantity
+
+    # Validar de nuevo y aplicar
+    for pid, delta in stock_changes.items():
+        if products_by_id[pid].stock < delta:
+            raise ValueError("Error de stock durante la confirmacion.")
+
+    # El id se reserva solo cuando la factura se va a guardar
+    iid = _next_invoice_id()
+    now = datetime.now().strftime(DATE_FORMAT)
+    invoice = build_invoice(iid, now, customer, cart)
+
+    # Persistir stock y factura juntos (solo los productos del carrito se tocan)
+    commit_invoices({pid: -delta for pid, delta in stock_changes.items()}, [invoice])
+    return invoice
+
+def issue_invoice(customer: str, lines: List[Tuple[int, int]]) -> Invoice:
+    """Crea y guarda una factura con (id de producto, cantidad) por linea, sin preguntar nada."""
+    customer = customer.strip()
+    if not customer:
+        raise ValueError("Cliente invalido.")
+    products_by_id = {p.id: p for p in read_inventory()}
+    cart: List[InvoiceItem] = []
+    for pid, qty in lines:
+        if pid not in products_by_id:
+            raise ValueError(f"Producto {pid} no encontrado.")
+        if qty <= 0:
+            raise ValueError(f"Cantidad invalida para producto {pid}.")
+        cart.append(make_item(products_by_id[pid], qty))
+    if not cart:
+        raise ValueError("Factura vacia.")
+    for pid, qty in _returned_stock(cart).items():
+        if qty > products_by_id[pid].stock:
+            raise ValueError(f"Stock insuficiente para producto {pid} (disponible: {products_by_id[pid].stock}).")
+    return _save_new_invoice(customer, cart, products_by_id)
+
+@stats.timed("invoices.delete_invoice")
+def delete_invoice() -> None:
+    if not count_invoices():
+        print("No hay facturas.")
+        return
+    try:
+        iid = int(stats.prompt("ID de la factura a eliminar: ").strip())
+    except ValueError:
+        print("ID invalido.")
+        return
+    inv = get_invoice(iid)
+    if not inv:
+        print("Factura no encontrada.")
+        return
+    confirm = stats.prompt("Confirmar eliminacion y reversión de stock (S/N): ").strip().lower()
+    if confirm != "s":
+        print("Operacion cancelada.")
+        return
+
+    cancel_invoice(inv)
+    print("Factura eliminada y stock revertido.")
+
+def cancel_invoice(inv: Invoice) -> None:
+    """Elimina la factura y devuelve su stock al inventario."""
+    commit_invoices(_returned_stock(inv.items), removed_ids=[inv.id])
+
+@stats.timed("invoices.edit_invoice")
+def edit_invoice() -> None:
+    if not count_invoices():
+        print("No hay facturas.")
+        return
+    try:
+        iid = int(stats.prompt("ID de la factura a editar: ").strip())
+    except ValueError:
+        print("ID invalido.")
+        return
+    inv = get_invoice(iid)
+    if not inv:
+        print("Factura no encontrada.")
+        return
+
+    print("Editando items. Deje ID vacío para terminar.")
+    products = read_inventory()
+    by_id = {p.id: p for p in products}
+
+    # Construir mapa de cantidades originales
+    original_qty = {}
+    for it in inv.items:
+        original_qty[it.product_id] = original_qty.get(it.product_id, 0) + it.quantity
+
+    # Mostrar items actuales
+    _print_invoice(inv)
+
+    # Nuevo conjunto de items
+    new_items: List[InvoiceItem] = []
+
+    while True:
+        code = stats.prompt("ID de producto a establecer (ENTER para terminar): ").strip()
+        if code == "":
+            break
+        if not code.isdigit():
+            print("ID invalido.")
+            continue
+        pid = int(code)
+        if pid not in by_id:
+            print("Producto no encontrado.")
+            continue
+        prod = by_id[pid]
+        try:
+            qty = int(stats.prompt("Nueva cantidad (0 para remover): ").strip())
+            if qty < 0:
+                raise ValueError
+        except ValueError:
+            print("Cantidad invalida.")
+            continue
+        if qty == 0:
+            # No lo añadimos
+            print(f'{prod.nombre} sera removido.')
+            continue
+        # El precio unitario es el actual del inventario o mantenemos el de la factura?
+        # Mantendremos el precio actual del inventario para cambios nuevos.
+        new_items.append(make_item(prod, qty))
+
+    if not new_items:
+        print("La factura quedaria vacia. ¿Desea eliminarla? (S/N)")
+        ans = stats.prompt().strip().lower()
+        if ans == "s":
+            # Delegar a delete_invoice?
+            # Hacemos la eliminación con reversión:
+            # Primero revertimos stock del original y no aplicamos nuevos cambios.
+            # Luego eliminamos la factura.
+            # Revertir stock original y eliminar factura:
+            cancel_invoice(inv)
+            print("Factura eliminada.")
+        else:
+            print("Edicion cancelada. Sin cambios.")
+        return
+
+    # Calcular deltas de stock: new - original
+    new_qty = {}
+    for it in new_items:
+        new_qty[it.product_id] = new_qty.get(it.product_id, 0) + it.quantity
+
+    delta = {}
+    all_pids = set(new_qty.keys()).union(set(original_qty.keys()))
+    for pid in all_pids:
+        delta[pid] = new_qty.get(pid, 0) - original_qty.get(pid, 0)
+
+    # Validar stock para deltas positivos
+    products = read_inventory()
+    by_id = {p.id: p for p in products}
+    for pid, d in delta.items():
+        if d > 0:
+            if pid not in by_id:
+                print(f"Producto {pid} ya no existe en inventario. Edicion cancelada.")
+                return
+            if by_id[pid].stock < d:
+                print(f"Stock insuficiente para producto {pid}. Edicion cancelada.")
+                return
+
+    # Recalcular totales
+    totals = _calc_totals(new_items)
+    inv.items = new_items
+    inv.subtotal_cents = totals["subtotal"]
+    inv.iva_cents = totals["iva"]
+    inv.total_cents = totals["total"]
+
+    # Persistir deltas (si d<0, aumenta stock; si d>0, reduce) y la nueva version
+    try:
+        commit_invoices({pid: -d for pid, d in delta.items() if pid in by_id and d != 0}, [inv])
+    except ValueError as e:
+        print(f"{e} Edicion cancelada.")
+        return
+    print("Factura actualizada.")
+    _print_invoice(inv)
+
+@stats.timed("invoices.compact_invoice_file")
+def compact_invoice_file() -> None:
+    before, after = vacuum_invoices()
+    print(f"Archivo de facturas compactado: {before} -> {after} bytes.")
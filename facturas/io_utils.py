@@ -1,95 +1,1705 @@
-import os
-import json
-from typing import List, Dict, Any
-
-INVENTORY_FILE = "inventario.txt"
-INVOICES_FILE = "facturas.txt"
-
-INVENTORY_HEADER = "id|nombre|precio|stock"
-
-def ensure_files_exist() -> None:
-    
-    # Inventario con encabezado
-    if not os.path.exists(INVENTORY_FILE):
-        with open(INVENTORY_FILE, "w", encoding="utf-8") as f:
-            f.write(INVENTORY_HEADER + "\n")
-    else:
-        # Garantizar que tenga encabezado
-        with open(INVENTORY_FILE, "r+", encoding="utf-8") as f:
-            content = f.read()
-            if not content.strip():
-                f.seek(0)
-                f.write(INVENTORY_HEADER + "\n")
-            elif not content.splitlines()[0].strip().lower().startswith("id|nombre|precio|stock"):
-                f.seek(0, 0)
-                f.write(INVENTORY_HEADER + "\n" + content)
-
-    # Facturas como JSON Lines
-    if not os.path.exists(INVOICES_FILE):
-        with open(INVOICES_FILE, "w", encoding="utf-8") as f:
-            f.write("")
-
-def _parse_inventory_line(line: str) -> Dict[str, Any]:
-    parts = [p.strip() for p in line.split("|")]
-    if len(parts) != 4:
-        raise ValueError("Linea de inventario invalida")
-    pid, nombre, precio, stock = parts
-    return {
-        "id": int(pid),
-        "nombre": nombre,
-        "precio": float(precio),
-        "stock": int(stock),
-    }
-
-def read_inventory() -> List[Dict[str, Any]]:
-    ensure_files_exist()
-    products: List[Dict[str, Any]] = []
-    with open(INVENTORY_FILE, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            line = line.strip()
-            if not line:
-                continue
-            if i == 0 and line.lower().startswith("id|nombre|precio|stock"):
-                continue
-            try:
-                products.append(_parse_inventory_line(line))
-            except Exception:
-
-                # Ignorar líneas corruptas
-                continue
-    return products
-
-def write_inventory(products: List[Dict[str, Any]]) -> None:
-    ensure_files_exist()
-    lines = [INVENTORY_HEADER]
-    for p in products:
-        lines.append(f'{p["id"]}|{p["nombre"]}|{p["precio"]}|{p["stock"]}')
-    with open(INVENTORY_FILE, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines) + "\n")
-
-def read_invoices() -> List[Dict[str, Any]]:
-    ensure_files_exist()
-    invoices: List[Dict[str, Any]] = []
-    with open(INVOICES_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                invoices.append(json.loads(line))
-            except Exception:
-                
-                # Ignorar líneas corruptas
-                continue
-    return invoices
-
-def write_invoices(invoices: List[Dict[str, Any]]) -> None:
-    ensure_files_exist()
-    with open(INVOICES_FILE, "w", encoding="utf-8") as f:
-        for inv in invoices:
-            f.write(json.dumps(inv, ensure_ascii=False) + "\n")
-
-def append_invoice(invoice: Dict[str, Any]) -> None:
-    ensure_files_exist()
-    with open(INVOICES_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(invoice, ensure_ascii=False) + "\n")
+import os
+import json
+import time
+import zlib
+import heapq
+import atexit
+import contextlib
+from bisect import bisect_left
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
+from models import Product, Invoice, to_cents, from_cents
+import stats
+
+# Backend de almacenamiento: "archivos" (texto), "sqlite" o "servidor" (ver server.py)
+STORAGE_BACKEND = os.environ.get("FACTURAS_BACKEND", "archivos")
+
+INVENTORY_FILE = "inventario.txt"
+INVOICES_FILE = "facturas.txt"
+
+# Formato del inventario con el backend de archivos: "texto" (inventario.txt) o
+# "binario" (inventario.bin, registros de ancho fijo; ver binary_inventory.py).
+# Al cambiar de formato, el archivo del otro se convierte al iniciar.
+INVENTORY_FORMAT = os.environ.get("FACTURAS_INVENTARIO", "texto")
+INVENTORY_BINARY_FILE = "inventario.bin"
+
+# Facturas particionadas por mes: segmentos/AAAA-MM.txt (JSON Lines, mismo
+# formato que facturas.txt), con su indice AAAA-MM.idx y su manifiesto
+# AAAA-MM.json. facturas.txt es el formato anterior y se migra al iniciar.
+SEGMENTS_DIR = "segmentos"
+
+# Huella (tamaño y crc32) del facturas.txt del que salieron los segmentos
+MIGRATION_MARKER = "migracion.json"
+
+# Meses cerrados archivados: archivo/AAAA-MM.zblk, bloques comprimidos por
+# separado con su indice (ver invoice_archive.py). Un mes esta en segmentos o
+# en el archivo; si quedo en ambos (corte a mitad de un cambio, o un archivado
+# en curso), manda el segmento. Las lecturas nunca borran: el archivo sobrante
+# lo limpia invoice_archive.py con su candado tomado.
+ARCHIVE_DIR = "archivo"
+
+# Candado de archivar y restaurar meses, dentro de ARCHIVE_DIR (contiene el pid).
+# Lo toman invoice_archive.py y cualquier escritura que reabre un mes archivado.
+ARCHIVE_LOCK_FILE = "archivando.lock"
+
+# Log de transacciones (write-ahead): una linea "crc32|json" por transaccion con
+# {"lsn", "stock", "precios", "facturas", "eliminadas"}. Se escribe antes de tocar
+# inventario.txt o los segmentos de facturas. El inventario vigente es inventario.txt mas el
+# stock y los precios del log; las facturas del log se reaplican al iniciar.
+INVENTORY_JOURNAL_FILE = "inventario.journal"
+
+# Tamaño (bytes) a partir del cual se hace un checkpoint del log
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# fsync del log: "siempre" (cada transaccion), "intervalo" (a lo sumo uno cada
+# FSYNC_INTERVAL segundos; el resto queda para la siguiente o para la salida)
+# o "nunca" (lo decide el sistema operativo)
+FSYNC_POLICY = os.environ.get("FACTURAS_FSYNC", "siempre")
+FSYNC_INTERVAL = 0.05
+
+# Linea de inventario.txt con la ultima transaccion ya incorporada al archivo
+LSN_MARKER = "#lsn|"
+
+# Ultimo id entregado por secuencia: nombre|ultimo_id
+SEQUENCES_FILE = "secuencias.txt"
+PRODUCT_SEQUENCE = "productos"
+INVOICE_SEQUENCE = "facturas"
+
+INVENTORY_HEADER = "id|nombre|precio|stock"
+
+# Cache en memoria: ruta -> (firma del archivo, registros ya parseados)
+_cache: Dict[str, Tuple[Any, List[Any]]] = {}
+
+# Se incrementa cada vez que cambia el inventario en cache
+_inventory_version = 0
+
+# Funciones avisadas en cada cambio de factura: listener(anterior, nueva)
+_invoice_listeners: List[Callable[[Optional[Invoice], Optional[Invoice]], None]] = []
+
+# Funciones avisadas en cada cambio de stock: listener(deltas, version del inventario antes del cambio)
+_stock_listeners: List[Callable[[Dict[int, int], Any], None]] = []
+
+# Indices de facturas: ruta -> (firma del archivo, id -> (offset, largo))
+_index_cache: Dict[str, Tuple[Any, Dict[int, Tuple[int, int]]]] = {}
+
+# Manifiestos de los segmentos: firma del directorio + mes -> manifiesto
+_segments: Dict[str, Any] = {"signature": None, "manifests": {}}
+
+# Pies de los meses archivados: firmas de ambos directorios + mes -> pie
+_archives: Dict[str, Any] = {"signature": None, "manifests": {}, "lock_depth": 0}
+
+# Estado del log: ultimo lsn asignado, ultimo fsync y si ya se hizo la recuperacion
+_journal: Dict[str, Any] = {"lsn": None, "fsync": 0.0, "pending": False, "recovered": False}
+
+def _backend() -> Any:
+    # Importacion diferida: cada modulo solo se carga si esta configurado
+    if STORAGE_BACKEND == "sqlite":
+        import sqlite_backend
+        return sqlite_backend
+    if STORAGE_BACKEND == "servidor":
+        import remote_backend
+        return remote_backend
+    return None
+
+def use_backend(name: str) -> None:
+    global STORAGE_BACKEND
+    if name not in ("archivos", "sqlite", "servidor"):
+        raise ValueError(f"Backend desconocido: {name}")
+    STORAGE_BACKEND = name
+    clear_cache()
+
+def use_inventory_format(name: str) -> None:
+    global INVENTORY_FORMAT
+    if name not in ("texto", "binario"):
+        raise ValueError(f"Formato de inventario desconocido: {name}")
+    INVENTORY_FORMAT = name
+    clear_cache()
+
+def _inventory_path() -> str:
+    return INVENTORY_BINARY_FILE if INVENTORY_FORMAT == "binario" else INVENTORY_FILE
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _signature(path: str) -> Any:
+    # El inventario depende tambien de su journal de cambios
+    if path == INVENTORY_FILE:
+        base = _file_signature(_inventory_path())
+        if base is None:
+            return None
+        return (base, _file_signature(INVENTORY_JOURNAL_FILE))
+    # Cada escritura de facturas renueva un manifiesto: cambia el directorio
+    if path == INVOICES_FILE:
+        return (_file_signature(SEGMENTS_DIR), _file_signature(ARCHIVE_DIR))
+    return _file_signature(path)
+
+def _cache_get(path: str) -> Optional[List[Any]]:
+    # Solo es valida si el archivo no cambio (mtime, tamaño e inodo)
+    entry = _cache.get(path)
+    if entry is None or _signature(path) != entry[0]:
+        if entry is not None:
+            del _cache[path]
+        if stats.ENABLED:
+            stats.add("cache_misses")
+        return None
+    if stats.ENABLED:
+        stats.add("cache_hits")
+    return entry[1]
+
+def _bump_version(path: str) -> None:
+    global _inventory_version
+    if path == INVENTORY_FILE:
+        _inventory_version += 1
+
+def _cache_put(path: str, records: List[Any]) -> None:
+    _bump_version(path)
+    sig = _signature(path)
+    if sig is None:
+        _cache.pop(path, None)
+        return
+    _cache[path] = (sig, [r.copy() for r in records])
+
+def _cache_refresh(path: str, records: List[Any]) -> None:
+    # Los datos en cache ya fueron actualizados en sitio; solo renovar la firma
+    _bump_version(path)
+    sig = _signature(path)
+    if sig is None:
+        _cache.pop(path, None)
+        return
+    _cache[path] = (sig, records)
+
+def inventory_version() -> int:
+    """Cambia cada vez que el inventario en cache se recarga o se modifica."""
+    db = _backend()
+    if db is not None:
+        return db.inventory_version()
+    # Otro proceso cambio el inventario: la cache ya no vale, cuenta como version nueva
+    entry = _cache.get(INVENTORY_FILE)
+    if entry is not None and entry[0] != _signature(INVENTORY_FILE):
+        del _cache[INVENTORY_FILE]
+        _bump_version(INVENTORY_FILE)
+    return _inventory_version
+
+def clear_cache() -> None:
+    _bump_version(INVENTORY_FILE)
+    _cache.clear()
+    _index_cache.clear()
+    _segments.update(signature=None, manifests={})
+    _journal.update(lsn=None, recovered=False)
+    db = _backend()
+    if db is not None:
+        db.clear_cache()
+
+@stats.timed("io_utils.ensure_files_exist")
+def ensure_files_exist() -> None:
+    db = _backend()
+    if db is not None:
+        return db.ensure_files_exist()
+    
+    # Inventario con encabezado
+    if INVENTORY_FORMAT == "binario":
+        pass
+    elif not os.path.exists(INVENTORY_FILE):
+        if not os.path.exists(INVENTORY_BINARY_FILE):
+            _atomic_write(INVENTORY_FILE, (INVENTORY_HEADER + "\n").encode("utf-8"))
+    else:
+        # Garantizar que tenga encabezado (basta con leer la primera linea)
+        with open(INVENTORY_FILE, "r", encoding="utf-8") as f:
+            first = f.readline()
+            content = None
+            if not first.strip().lower().startswith("id|nombre|precio|stock"):
+                content = first + f.read()
+        if content is not None:
+            _atomic_write(INVENTORY_FILE, (INVENTORY_HEADER + "\n" + content).encode("utf-8"))
+
+    # Facturas como JSON Lines, un segmento por mes
+    if os.path.exists(INVOICES_FILE):
+        _migrate_single_file()
+    if not os.path.isdir(SEGMENTS_DIR):
+        os.makedirs(SEGMENTS_DIR)
+
+    if not _journal["recovered"]:
+        _journal["recovered"] = True
+        _recover()
+
+    # Despues de recuperar: la conversion incorpora y descarta el log
+    if not os.path.exists(_inventory_path()):
+        _convert_inventory()
+
+def _convert_inventory() -> None:
+    """Pasa el inventario del otro formato al configurado (o crea uno vacio).
+
+    El archivo anterior queda como respaldo en <archivo>.migrado.
+    """
+    global INVENTORY_FORMAT
+    source = INVENTORY_FILE if INVENTORY_FORMAT == "binario" else INVENTORY_BINARY_FILE
+    if not os.path.exists(source):
+        _store_inventory([])
+        return
+    target = INVENTORY_FORMAT
+    INVENTORY_FORMAT = "texto" if target == "binario" else "binario"
+    try:
+        products = _load_inventory()
+        # El lsn del archivo anterior sigue valiendo para el nuevo
+        _journal["lsn"] = None
+        _last_lsn()
+    finally:
+        INVENTORY_FORMAT = target
+    _store_inventory(products)
+    os.replace(source, source + ".migrado")
+
+def _fsync_dir(path: str) -> None:
+    # Persistir la entrada del directorio tras crear o renombrar (no existe en Windows)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _fsync_file(path: str) -> None:
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Reemplaza el archivo completo sin dejarlo a medias: temporal + fsync + rename."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path)
+    if stats.ENABLED:
+        stats.add("bytes_escritos", len(data))
+
+def _parse_inventory_line(line: str) -> Product:
+    parts = [p.strip() for p in line.split("|")]
+    if len(parts) != 4:
+        raise ValueError("Linea de inventario invalida")
+    pid, nombre, precio, stock = parts
+    return Product(int(pid), nombre, to_cents(precio), int(stock))
+
+def _format_inventory_line(p: Product) -> str:
+    return f"{p.id}|{p.nombre}|{p.precio}|{p.stock}"
+
+def _parse_journal_line(line: str) -> Tuple[int, int, Optional[int]]:
+    # Formato anterior del journal: id|delta_stock|precio_nuevo
+    parts = [p.strip() for p in line.split("|")]
+    if len(parts) != 3:
+        raise ValueError("Linea de journal invalida")
+    pid, delta, precio = parts
+    return int(pid), int(delta), (to_cents(precio) if precio else None)
+
+def _encode_journal_record(record: Dict[str, Any]) -> bytes:
+    body = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"%08x|" % zlib.crc32(body) + body + b"\n"
+
+def _decode_journal_line(raw: bytes) -> Optional[Dict[str, Any]]:
+    """Transaccion de una linea del log ({} si esta vacia); None si esta danada o incompleta."""
+    if not raw.endswith(b"\n"):
+        return None
+    line = raw.strip()
+    if not line:
+        return {}
+    if line[8:10] == b"|{":
+        body = line[9:]
+        if b"%08x" % zlib.crc32(body) != line[:8]:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+    # Formato anterior: sin lsn, vale hasta el proximo checkpoint
+    try:
+        pid, delta, precio_cents = _parse_journal_line(line.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    record: Dict[str, Any] = {"lsn": 0, "stock": {str(pid): delta}}
+    if precio_cents is not None:
+        record["precios"] = {str(pid): from_cents(precio_cents)}
+    return record
+
+@stats.timed("io_utils._read_journal")
+def _read_journal() -> Tuple[List[Dict[str, Any]], int]:
+    """Transacciones confirmadas del log y cuantos bytes ocupan.
+
+    La lectura se detiene en la primera linea danada: es una escritura
+    interrumpida y nada de lo que sigue llego a confirmarse.
+    """
+    records: List[Dict[str, Any]] = []
+    valid = 0
+    if not os.path.exists(INVENTORY_JOURNAL_FILE):
+        return records, valid
+    with open(INVENTORY_JOURNAL_FILE, "rb") as f:
+        for raw in f:
+            record = _decode_journal_line(raw)
+            if record is None:
+                break
+            if record:
+                records.append(record)
+            valid += len(raw)
+    if stats.ENABLED:
+        stats.add("bytes_leidos", valid)
+        stats.add("registros", len(records))
+    return records, valid
+
+def _apply_journal(products: List[Product], records: List[Dict[str, Any]],
+                   applied: Optional[Dict[int, int]] = None) -> None:
+    # applied: id -> ultimo lsn ya incorporado a ese producto (inventario.bin)
+    by_id = {p.id: p for p in products}
+    for record in records:
+        lsn = record.get("lsn", 0)
+        for pid, delta in record.get("stock", {}).items():
+            p = by_id.get(int(pid))
+            # Producto eliminado despues del cambio
+            if p is not None and (applied is None or applied.get(p.id, -1) < lsn):
+                p.stock += delta
+        for pid, precio in record.get("precios", {}).items():
+            p = by_id.get(int(pid))
+            if p is not None and (applied is None or applied.get(p.id, -1) < lsn):
+                p.precio_cents = to_cents(precio)
+
+def _parse_marker(line: str) -> int:
+    try:
+        return int(line[len(LSN_MARKER):])
+    except ValueError:
+        return -1
+
+def _read_marker() -> int:
+    # -1: inventario.txt no incorpora ninguna transaccion del log
+    if not os.path.exists(_inventory_path()):
+        return -1
+    if INVENTORY_FORMAT == "binario":
+        import binary_inventory
+        return binary_inventory.read_lsn(INVENTORY_BINARY_FILE)
+    with open(INVENTORY_FILE, "r", encoding="utf-8") as f:
+        for _ in range(2):
+            line = f.readline()
+            if line.startswith(LSN_MARKER):
+                return _parse_marker(line.strip())
+    return -1
+
+def _last_lsn() -> int:
+    if _journal["lsn"] is None:
+        records, _ = _read_journal()
+        _journal["lsn"] = max([0, _read_marker()] + [r.get("lsn", 0) for r in records])
+    return _journal["lsn"]
+
+def _sync_journal() -> None:
+    # fsync que quedo pendiente con la politica "intervalo"
+    if _journal["pending"]:
+        _journal["pending"] = False
+        _fsync_file(INVENTORY_JOURNAL_FILE)
+
+atexit.register(_sync_journal)
+
+@stats.timed("io_utils._journal_append")
+def _journal_append(record: Dict[str, Any]) -> None:
+    """Confirma una transaccion: desde aqui sobrevive a una caida (segun FSYNC_POLICY)."""
+    lsn = _last_lsn() + 1
+    data = _encode_journal_record(dict({"lsn": lsn}, **record))
+    created = not os.path.exists(INVENTORY_JOURNAL_FILE)
+    with open(INVENTORY_JOURNAL_FILE, "ab") as f:
+        f.write(data)
+        f.flush()
+        now = time.monotonic()
+        if FSYNC_POLICY == "siempre" or (FSYNC_POLICY == "intervalo" and now - _journal["fsync"] >= FSYNC_INTERVAL):
+            os.fsync(f.fileno())
+            _journal.update(fsync=now, pending=False)
+        else:
+            _journal["pending"] = FSYNC_POLICY == "intervalo"
+    if created:
+        _fsync_dir(INVENTORY_JOURNAL_FILE)
+    _journal["lsn"] = lsn
+    if stats.ENABLED:
+        stats.add("bytes_escritos", len(data))
+
+def _log_transaction(stock_deltas: Dict[int, int], price_changes: Dict[int, int],
+                     invoices: List[Invoice], removed_ids: List[int]) -> None:
+    # Stock, precios y facturas van en una sola linea del log: o se confirma todo o nada
+    record: Dict[str, Any] = {}
+    stock = {str(pid): delta for pid, delta in stock_deltas.items() if delta}
+    if stock:
+        record["stock"] = stock
+    if price_changes:
+        record["precios"] = {str(pid): from_cents(cents) for pid, cents in price_changes.items()}
+    if invoices:
+        record["facturas"] = [inv.to_dict() for inv in invoices]
+    if removed_ids:
+        record["eliminadas"] = list(removed_ids)
+    if not record:
+        return
+    ensure_files_exist()
+    if invoices or removed_ids:
+        # Antes de confirmar: si otro proceso esta archivando o restaurando el
+        # mes, la transaccion se rechaza sin llegar al log
+        _reopen_archived(invoices, removed_ids)
+    cached = _cache_get(INVENTORY_FILE)
+    _journal_append(record)
+
+    # Aplicar la transaccion ya confirmada (si se corta aqui, _recover la completa)
+    if cached is not None:
+        _apply_journal(cached, [record])
+        _cache_refresh(INVENTORY_FILE, cached)
+    if invoices or removed_ids:
+        _store_invoices(list(invoices), list(removed_ids))
+
+    if os.path.getsize(INVENTORY_JOURNAL_FILE) > JOURNAL_COMPACT_BYTES:
+        _checkpoint()
+
+def _invoices_applied(record: Dict[str, Any]) -> bool:
+    for d in record.get("facturas", []):
+        current = get_invoice(int(d["id"]))
+        if current is None or current != Invoice.from_dict(d):
+            return False
+    return all(get_invoice(iid) is None for iid in record.get("eliminadas", []))
+
+@stats.timed("io_utils._recover")
+def _recover() -> None:
+    """Al iniciar: descarta una transaccion a medio escribir y completa las que no llegaron a los segmentos."""
+    if not os.path.exists(INVENTORY_JOURNAL_FILE):
+        return
+    records, valid = _read_journal()
+    if valid < os.path.getsize(INVENTORY_JOURNAL_FILE):
+        with open(INVENTORY_JOURNAL_FILE, "r+b") as f:
+            f.truncate(valid)
+            os.fsync(f.fileno())
+
+    # Las facturas se aplican en orden de lsn: solo falta lo posterior a la
+    # ultima transaccion que ya se ve en los segmentos
+    pending = []
+    for record in reversed([r for r in records if "facturas" in r or "eliminadas" in r]):
+        if _invoices_applied(record):
+            break
+        pending.append(record)
+    for record in reversed(pending):
+        invoices = [Invoice.from_dict(d) for d in record.get("facturas", [])]
+        removed_ids = record.get("eliminadas", [])
+        # Los listeners no llegaron a enterarse de estas facturas
+        previous = _previous_versions(invoices, removed_ids)
+        _store_invoices(invoices, removed_ids)
+        _notify(previous, invoices, removed_ids)
+
+@stats.timed("io_utils._checkpoint")
+def _checkpoint(rewrite_inventory: bool = False) -> None:
+    """Vacia el log.
+
+    Las facturas ya estan en los segmentos; el stock y los precios pendientes se
+    resumen en una sola transaccion, o se incorporan a inventario.txt cuando
+    reescribirlo sale mas barato que arrastrar el resumen. En inventario.bin
+    se escriben siempre en el registro de cada producto.
+    """
+    marker = _read_marker()
+    records, _ = _read_journal()
+    # Las facturas del log tienen que estar en disco antes de descartarlo
+    _fsync_segments(records)
+    if INVENTORY_FORMAT == "binario":
+        _checkpoint_binary(marker, records)
+        return
+    stock: Dict[str, int] = {}
+    prices: Dict[str, float] = {}
+    for r in records:
+        if r.get("lsn", 0) <= marker:
+            continue
+        for pid, delta in r.get("stock", {}).items():
+            stock[pid] = stock.get(pid, 0) + delta
+        prices.update(r.get("precios", {}))
+    summary: Dict[str, Any] = {"lsn": _last_lsn()}
+    stock = {pid: delta for pid, delta in stock.items() if delta}
+    if stock:
+        summary["stock"] = stock
+    if prices:
+        summary["precios"] = prices
+    data = _encode_journal_record(summary)
+    if rewrite_inventory or len(data) * 4 > os.path.getsize(INVENTORY_FILE):
+        write_inventory(read_inventory())
+        return
+    cached = _cache_get(INVENTORY_FILE)
+    _atomic_write(INVENTORY_JOURNAL_FILE, data)
+    _journal["pending"] = False
+    if cached is not None:
+        _cache_refresh(INVENTORY_FILE, cached)
+
+def _checkpoint_binary(marker: int, records: List[Dict[str, Any]]) -> None:
+    # inventario.bin: el stock y los precios se escriben en el registro de cada producto
+    import binary_inventory
+    cached = _cache_get(INVENTORY_FILE)
+    binary_inventory.apply(INVENTORY_BINARY_FILE, [r for r in records if r.get("lsn", 0) > marker], _last_lsn())
+    # Las escrituras por mmap no siempre cambian el mtime: forzarlo para las demas cajas
+    st = os.stat(INVENTORY_BINARY_FILE)
+    os.utime(INVENTORY_BINARY_FILE, ns=(st.st_atime_ns, max(time.time_ns(), st.st_mtime_ns + 1)))
+    if os.path.exists(INVENTORY_JOURNAL_FILE):
+        os.remove(INVENTORY_JOURNAL_FILE)
+    _journal["pending"] = False
+    if cached is not None:
+        _cache_refresh(INVENTORY_FILE, cached)
+
+def _load_inventory() -> List[Product]:
+    # Inventario del formato configurado mas las transacciones del log que no incorpora
+    records, _ = _read_journal()
+    if INVENTORY_FORMAT == "binario":
+        import binary_inventory
+        products, applied, marker = binary_inventory.read(INVENTORY_BINARY_FILE)
+        _apply_journal(products, [r for r in records if r.get("lsn", 0) > marker], applied)
+        return products
+
+    products: List[Product] = []
+    marker = -1
+    with open(INVENTORY_FILE, "r", encoding="utf-8") as f:
+        if stats.ENABLED:
+            stats.add("bytes_leidos", os.fstat(f.fileno()).st_size)
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            if i == 0 and line.lower().startswith("id|nombre|precio|stock"):
+                continue
+            if line.startswith(LSN_MARKER):
+                marker = _parse_marker(line)
+                continue
+            try:
+                products.append(_parse_inventory_line(line))
+            except Exception:
+
+                # Ignorar líneas corruptas
+                continue
+    if stats.ENABLED:
+        stats.add("registros", len(products))
+
+    # Transacciones del log que inventario.txt todavia no incorpora
+    _apply_journal(products, [r for r in records if r.get("lsn", 0) > marker])
+    return products
+
+@stats.timed("io_utils.read_inventory")
+def read_inventory() -> List[Product]:
+    db = _backend()
+    if db is not None:
+        return db.read_inventory()
+    cached = _cache_get(INVENTORY_FILE)
+    if cached is not None:
+        return [p.copy() for p in cached]
+    ensure_files_exist()
+    products = _load_inventory()
+    _cache_put(INVENTORY_FILE, products)
+    return products
+
+@stats.timed("io_utils.find_product")
+def find_product(pid: int) -> Optional[Product]:
+    """Producto con ese id, o None si no existe.
+
+    Con inventario.bin y el inventario fuera de cache se lee solo el registro
+    del producto y el log, sin decodificar el resto del archivo.
+    """
+    db = _backend()
+    if db is not None:
+        return next((p for p in db.read_inventory() if p.id == pid), None)
+    cached = _cache_get(INVENTORY_FILE)
+    if cached is not None:
+        return next((p.copy() for p in cached if p.id == pid), None)
+    ensure_files_exist()
+    if INVENTORY_FORMAT == "binario":
+        import binary_inventory
+        found = binary_inventory.read_product(INVENTORY_BINARY_FILE, pid)
+        if found is None:
+            return None
+        p, applied, marker = found
+        records, _ = _read_journal()
+        _apply_journal([p], [r for r in records if r.get("lsn", 0) > marker], {pid: applied})
+        return p
+    return next((p for p in read_inventory() if p.id == pid), None)
+
+def _store_inventory(products: List[Product]) -> None:
+    journal = os.path.exists(INVENTORY_JOURNAL_FILE)
+    if journal:
+        # Las facturas del log tienen que estar en disco antes de descartarlo
+        _fsync_segments(_read_journal()[0])
+    if INVENTORY_FORMAT == "binario":
+        import binary_inventory
+        _atomic_write(INVENTORY_BINARY_FILE, binary_inventory.encode(products, _last_lsn()))
+    else:
+        lines = [INVENTORY_HEADER, f"{LSN_MARKER}{_last_lsn()}"]
+        for p in products:
+            lines.append(_format_inventory_line(p))
+        _atomic_write(INVENTORY_FILE, ("\n".join(lines) + "\n").encode("utf-8"))
+
+    # El archivo ya incluye todas las transacciones del log (ver LSN_MARKER):
+    # si se corta antes de borrarlo, read_inventory las salta igual
+    if journal:
+        os.remove(INVENTORY_JOURNAL_FILE)
+        _journal["pending"] = False
+    _cache_put(INVENTORY_FILE, products)
+
+@stats.timed("io_utils.write_inventory")
+def write_inventory(products: List[Product]) -> None:
+    db = _backend()
+    if db is not None:
+        return db.write_inventory(products)
+    ensure_files_exist()
+    _store_inventory(products)
+
+@stats.timed("io_utils.apply_inventory_changes")
+def apply_inventory_changes(stock_deltas: Dict[int, int], price_changes: Optional[Dict[int, int]] = None) -> None:
+    """Registra cambios de stock/precio (en centavos) en el log sin reescribir el inventario."""
+    if STORAGE_BACKEND == "servidor":
+        return _backend().apply_inventory_changes(stock_deltas, price_changes)
+    before = inventory_version() if _stock_listeners else None
+    db = _backend()
+    if db is not None:
+        db.apply_inventory_changes(stock_deltas, price_changes)
+    else:
+        _log_transaction(stock_deltas, price_changes or {}, [], [])
+    _notify_stock(stock_deltas, before)
+
+@stats.timed("io_utils.compact_inventory")
+def compact_inventory() -> None:
+    db = _backend()
+    if db is not None:
+        return db.compact_inventory()
+    # Incorporar el log a inventario.txt y vaciarlo
+    ensure_files_exist()
+    _checkpoint(rewrite_inventory=True)
+
+def _index_path(path: str) -> str:
+    # Indice lateral: id|offset|largo|eliminada (una linea por registro del archivo)
+    return os.path.splitext(path)[0] + ".idx"
+
+def _is_tombstone(record: Dict[str, Any]) -> bool:
+    return record.get("eliminada") is True
+
+def _encode_invoice(invoice: Dict[str, Any]) -> bytes:
+    # Invoice.to_dict() deja los items al final: el encabezado se decodifica sin ellos
+    return (json.dumps(invoice, ensure_ascii=False) + "\n").encode("utf-8")
+
+# Separador del arreglo de items tal como lo escribe json.dumps
+_ITEMS_KEY = b', "items": '
+
+def decode_header(raw: bytes) -> Dict[str, Any]:
+    """Encabezado de un registro de factura (todo menos los items) sin decodificar los items."""
+    # Una comilla dentro de un string siempre va escapada, asi que la primera
+    # aparicion de _ITEMS_KEY es la clave real de nivel superior
+    pos = raw.find(_ITEMS_KEY)
+    if pos >= 0:
+        try:
+            header = json.loads(raw[:pos] + b"}")
+        except ValueError:
+            header = None
+        if header is not None and "total" in header:
+            return header
+
+    # Registro con items antes de los totales (formato anterior): decodificar completo
+    header = json.loads(raw)
+    header.pop("items", None)
+    return header
+
+_json_decoder = json.JSONDecoder()
+
+def decode_items(raw: bytes) -> List[Dict[str, Any]]:
+    """Solo el arreglo de items de un registro de factura, sin decodificar el encabezado."""
+    pos = raw.find(_ITEMS_KEY)
+    if pos >= 0:
+        try:
+            return _json_decoder.raw_decode(raw[pos + len(_ITEMS_KEY):].decode("utf-8"))[0]
+        except ValueError:
+            pass
+    return json.loads(raw)["items"]
+
+def _scan_invoice_lines(path: str, start: int) -> List[Tuple[int, int, int, bool]]:
+    entries: List[Tuple[int, int, int, bool]] = []
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                # Linea incompleta al final del archivo
+                break
+            line = raw.strip()
+            if line:
+                try:
+                    record = json.loads(line)
+                    entries.append((int(record["id"]), offset, len(raw), _is_tombstone(record)))
+                except Exception:
+                    # Ignorar líneas corruptas
+                    pass
+            offset += len(raw)
+    if stats.ENABLED:
+        stats.add("bytes_leidos", offset - start)
+        stats.add("registros", len(entries))
+    return entries
+
+def _write_index_entries(path: str, entries: List[Tuple[int, int, int, bool]], mode: str = "a") -> None:
+    with open(_index_path(path), mode, encoding="utf-8") as f:
+        f.write("".join(f"{iid}|{off}|{length}|{int(dead)}\n" for iid, off, length, dead in entries))
+
+def _fold_index(index: Dict[int, Tuple[int, int]], entries: List[Tuple[int, int, int, bool]]) -> None:
+    # La ultima version de cada factura gana; una lapida la elimina
+    for iid, off, length, dead in entries:
+        if dead:
+            index.pop(iid, None)
+        else:
+            index[iid] = (off, length)
+
+def _read_index_file(path: str) -> List[Tuple[int, int, int, bool]]:
+    entries: List[Tuple[int, int, int, bool]] = []
+    ipath = _index_path(path)
+    if not os.path.exists(ipath):
+        return entries
+    with open(ipath, "r", encoding="utf-8") as f:
+        if stats.ENABLED:
+            stats.add("bytes_leidos", os.fstat(f.fileno()).st_size)
+        for line in f:
+            parts = line.strip().split("|")
+            if len(parts) != 4:
+                continue
+            try:
+                entries.append((int(parts[0]), int(parts[1]), int(parts[2]), parts[3] == "1"))
+            except ValueError:
+                continue
+    return entries
+
+@stats.timed("io_utils._load_index")
+def _load_index(path: str) -> Dict[int, Tuple[int, int]]:
+    sig = _file_signature(path)
+    entry = _index_cache.get(path)
+    if entry is not None and entry[0] == sig:
+        if stats.ENABLED:
+            stats.add("cache_hits")
+        return entry[1]
+    if stats.ENABLED:
+        stats.add("cache_misses")
+    index: Dict[int, Tuple[int, int]] = {}
+    if sig is None:
+        return index
+    size = sig[1]
+    entries = _read_index_file(path)
+    covered = max((off + length for _, off, length, _ in entries), default=0)
+    if covered > size:
+        # El indice no corresponde al archivo: reconstruirlo desde cero
+        entries, covered = [], 0
+        _write_index_entries(path, [], "w")
+    if covered < size:
+        # Indexar registros escritos despues de la ultima actualizacion del indice
+        tail = _scan_invoice_lines(path, covered)
+        _write_index_entries(path, tail)
+        entries.extend(tail)
+    _fold_index(index, entries)
+    _index_cache[path] = (sig, index)
+    return index
+
+def _rebuild_index(path: str) -> None:
+    _index_cache.pop(path, None)
+    if os.path.exists(_index_path(path)):
+        os.remove(_index_path(path))
+
+def _read_record(path: str, offset: int, length: int, headers_only: bool = False) -> Optional[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        raw = f.read(length)
+    if stats.ENABLED:
+        stats.add("bytes_leidos", len(raw))
+        stats.add("registros")
+    try:
+        return decode_header(raw) if headers_only else json.loads(raw)
+    except Exception:
+        return None
+
+@stats.timed("io_utils._append_records")
+def _append_records(path: str, records: List[Dict[str, Any]]) -> None:
+    index = _load_index(path)
+    entries: List[Tuple[int, int, int, bool]] = []
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        offset = f.tell()
+        chunks = []
+
+        # No pegar el registro a una linea final sin salto de linea
+        if offset > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                chunks.append(b"\n")
+                offset += 1
+        with stats.span("io_utils.json_encode"):
+            for r in records:
+                data = _encode_invoice(r)
+                entries.append((int(r["id"]), offset, len(data), _is_tombstone(r)))
+                chunks.append(data)
+                offset += len(data)
+        payload = b"".join(chunks)
+        with stats.span("io_utils.disk_write"):
+            f.write(payload)
+        if stats.ENABLED:
+            stats.add("bytes_escritos", len(payload))
+    _write_index_entries(path, entries)
+    _fold_index(index, entries)
+    _index_cache[path] = (_file_signature(path), index)
+
+def _month(fecha: str) -> str:
+    # Segmento de una factura: AAAA-MM de su fecha
+    return fecha[:7]
+
+def _segment_path(month: str, directory: str = SEGMENTS_DIR) -> str:
+    return os.path.join(directory, month + ".txt")
+
+def _manifest_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+def _empty_manifest(month: str) -> Dict[str, Any]:
+    # tamano: bytes del segmento que resume; si no coincide, se recalcula
+    return {"mes": month, "tamano": 0, "min_id": None, "max_id": None, "desde": None, "hasta": None,
+            "facturas": 0, "subtotal_cents": 0, "iva_cents": 0, "total_cents": 0}
+
+def _manifest_add(manifest: Dict[str, Any], inv: Invoice, sign: int) -> None:
+    if sign > 0:
+        # Ids y fechas son cotas: no se achican al eliminar (vacuum_invoices las ajusta)
+        if manifest["min_id"] is None:
+            manifest.update(min_id=inv.id, max_id=inv.id, desde=inv.fecha, hasta=inv.fecha)
+        else:
+            manifest["min_id"] = min(manifest["min_id"], inv.id)
+            manifest["max_id"] = max(manifest["max_id"], inv.id)
+            manifest["desde"] = min(manifest["desde"], inv.fecha)
+            manifest["hasta"] = max(manifest["hasta"], inv.fecha)
+    manifest["facturas"] += sign
+    manifest["subtotal_cents"] += sign * inv.subtotal_cents
+    manifest["iva_cents"] += sign * inv.iva_cents
+    manifest["total_cents"] += sign * inv.total_cents
+
+def _write_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    # Sin fsync: es derivado del segmento y se recalcula si falta o quedo viejo
+    manifest["tamano"] = os.path.getsize(path)
+    tmp = _manifest_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, _manifest_path(path))
+
+def _read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_manifest_path(path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("tamano") != os.path.getsize(path):
+        return None
+    return manifest
+
+def _read_header(path: str, offset: int, length: int) -> Optional[Invoice]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        raw = f.read(length)
+    if stats.ENABLED:
+        stats.add("bytes_leidos", len(raw))
+        stats.add("registros")
+    try:
+        return Invoice.from_dict(decode_header(raw))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+@stats.timed("io_utils._build_manifest")
+def _build_manifest(path: str, month: str) -> Dict[str, Any]:
+    """Recalcula el manifiesto leyendo los encabezados vigentes del segmento."""
+    manifest = _empty_manifest(month)
+    index = _load_index(path)
+    with open(path, "rb") as f:
+        for iid in sorted(index):
+            offset, length = index[iid]
+            f.seek(offset)
+            raw = f.read(length)
+            try:
+                inv = Invoice.from_dict(decode_header(raw))
+            except (KeyError, TypeError, ValueError):
+                # Ignorar registros corruptos
+                continue
+            _manifest_add(manifest, inv, 1)
+    _write_manifest(path, manifest)
+    return manifest
+
+def _manifests() -> Dict[str, Dict[str, Any]]:
+    """Manifiestos de todos los segmentos (mes AAAA-MM -> manifiesto)."""
+    sig = _file_signature(SEGMENTS_DIR)
+    if sig is not None and _segments["signature"] == sig:
+        return _segments["manifests"]
+    manifests: Dict[str, Dict[str, Any]] = {}
+    if sig is not None:
+        for name in sorted(os.listdir(SEGMENTS_DIR)):
+            month, ext = os.path.splitext(name)
+            if ext != ".txt":
+                continue
+            path = _segment_path(month)
+            manifest = _read_manifest(path)
+            if manifest is None:
+                # Falta o es de antes de la ultima escritura (corte entre ambas)
+                manifest = _build_manifest(path, month)
+            manifests[month] = manifest
+    _segments.update(signature=_file_signature(SEGMENTS_DIR), manifests=manifests)
+    return manifests
+
+def _candidate_segments(iid: int) -> List[str]:
+    # Segmentos cuyo rango de ids incluye iid (normalmente uno solo)
+    return [month for month, m in sorted(_manifests().items())
+            if m["min_id"] is not None and m["min_id"] <= iid <= m["max_id"]]
+
+def _find_segment(iid: int) -> Optional[str]:
+    for month in _candidate_segments(iid):
+        if iid in _load_index(_segment_path(month)):
+            return month
+    return None
+
+def _archive_path(month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, month + ".zblk")
+
+def _archive_manifests() -> Dict[str, Dict[str, Any]]:
+    """Pies de los meses archivados (mes AAAA-MM -> manifiesto con el indice de bloques)."""
+    sig = (_file_signature(ARCHIVE_DIR), _file_signature(SEGMENTS_DIR))
+    if sig[0] is None:
+        return {}
+    if _archives["signature"] == sig:
+        return _archives["manifests"]
+    import invoice_archive
+    segments = _manifests()
+    manifests: Dict[str, Dict[str, Any]] = {}
+    for name in sorted(os.listdir(ARCHIVE_DIR)):
+        month, ext = os.path.splitext(name)
+        if ext != ".zblk":
+            continue
+        path = _archive_path(month)
+        if month in segments:
+            # El segmento manda (ver ARCHIVE_DIR)
+            continue
+        footer = invoice_archive.read_footer(path)
+        if footer is None:
+            # Ignorar archivos danados
+            continue
+        manifests[month] = footer
+    _archives.update(signature=(_file_signature(ARCHIVE_DIR), _file_signature(SEGMENTS_DIR)), manifests=manifests)
+    return manifests
+
+def _all_manifests() -> Dict[str, Dict[str, Any]]:
+    # Segmentos y meses archivados
+    return {**_archive_manifests(), **_manifests()}
+
+def _find_archived(iid: int) -> Optional[Tuple[str, bytes]]:
+    """Mes archivado y registro de la factura, o None si no esta archivada."""
+    archived = _archive_manifests()
+    if not archived:
+        return None
+    import invoice_archive
+    for month, m in sorted(archived.items()):
+        if m["min_id"] is not None and m["min_id"] <= iid <= m["max_id"]:
+            raw = invoice_archive.find(_archive_path(month), m, iid)
+            if raw is not None:
+                return month, raw
+    return None
+
+def _write_archive(month: str, invoices: List[Invoice], last_id: Optional[int] = None) -> Dict[str, Any]:
+    import invoice_archive
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    footer = invoice_archive.write(_archive_path(month), month, invoices, last_id)
+    _archives["signature"] = None
+    return footer
+
+def _remove_archive(month: str) -> None:
+    path = _archive_path(month)
+    if os.path.exists(path):
+        os.remove(path)
+    _archives["signature"] = None
+
+@contextlib.contextmanager
+def archive_lock() -> Iterator[None]:
+    """Un solo proceso a la vez archiva o restaura meses; dentro del proceso se puede anidar."""
+    if _archives["lock_depth"]:
+        _archives["lock_depth"] += 1
+        try:
+            yield
+        finally:
+            _archives["lock_depth"] -= 1
+        return
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, ARCHIVE_LOCK_FILE)
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise ValueError(f"Otro proceso esta archivando ({path}); si no hay ninguno, borrar ese archivo.")
+    try:
+        os.write(fd, str(os.getpid()).encode("ascii"))
+    finally:
+        os.close(fd)
+    _archives["lock_depth"] = 1
+    try:
+        yield
+    finally:
+        _archives["lock_depth"] = 0
+        os.remove(path)
+
+def _restore_archive(month: str) -> int:
+    with archive_lock():
+        if month not in _archive_manifests():
+            # Ya lo restauro otro proceso antes de que tomaramos el candado
+            return 0
+        invoices = list(_iter_archive(month, None, False, "", ""))
+        # Primero el segmento: si se corta antes de borrar el archivo, manda el segmento
+        _write_segment(_segment_path(month), month, invoices)
+        _remove_archive(month)
+    return len(invoices)
+
+def _reopen_archived(invoices: List[Invoice], removed_ids: List[int]) -> None:
+    """Devuelve a segmentos los meses archivados que van a recibir cambios."""
+    archived = _archive_manifests()
+    if not archived:
+        return
+    months = {_month(inv.fecha) for inv in invoices}
+    for iid in [inv.id for inv in invoices] + list(removed_ids):
+        found = _find_archived(iid)
+        if found is not None:
+            months.add(found[0])
+    for month in sorted(months & set(archived)):
+        _restore_archive(month)
+
+def _segments_size() -> int:
+    return (sum(os.path.getsize(_segment_path(month)) for month in _manifests())
+            + sum(os.path.getsize(_archive_path(month)) for month in _archive_manifests()))
+
+def _fsync_segments(records: List[Dict[str, Any]]) -> None:
+    # Segmentos que recibieron facturas o lapidas de estas transacciones del log
+    months = set()
+    for r in records:
+        for d in r.get("facturas", []):
+            months.add(_month(d["fecha"]))
+            months.update(_candidate_segments(int(d["id"])))
+        for iid in r.get("eliminadas", []):
+            months.update(_candidate_segments(iid))
+    for month in months:
+        _fsync_file(_segment_path(month))
+    if months:
+        # Entradas de segmentos creados desde el ultimo checkpoint
+        _fsync_dir(_segment_path(min(months)))
+
+def _fingerprint(path: str) -> Dict[str, int]:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return {"tamano": os.path.getsize(path), "crc32": crc}
+
+def _read_migration_marker() -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(SEGMENTS_DIR, MIGRATION_MARKER), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _merge_single_file() -> None:
+    """Agrega a los segmentos existentes las facturas de facturas.txt que no tienen.
+
+    Un id que ya esta con otro contenido no se pisa: se cancela sin tocar nada
+    para que se revise a mano. Repetirla despues de un corte es seguro: las
+    facturas ya agregadas se encuentran iguales y se saltan.
+    """
+    index = _load_index(INVOICES_FILE)
+    new_by_month: Dict[str, List[Invoice]] = {}
+    conflicts = []
+    with open(INVOICES_FILE, "rb") as src:
+        for iid in sorted(index):
+            offset, length = index[iid]
+            src.seek(offset)
+            try:
+                inv = Invoice.from_dict(json.loads(src.read(length)))
+            except (KeyError, TypeError, ValueError):
+                # Ignorar registros corruptos
+                continue
+            current = None
+            month = _find_segment(iid)
+            if month is not None:
+                path = _segment_path(month)
+                record = _read_record(path, *_load_index(path)[iid])
+                current = Invoice.from_dict(record) if record is not None else None
+            else:
+                found = _find_archived(iid)
+                if found is not None:
+                    current = Invoice.from_dict(json.loads(found[1]))
+            if current is None:
+                new_by_month.setdefault(_month(inv.fecha), []).append(inv)
+            elif current != inv:
+                conflicts.append(iid)
+    if conflicts:
+        shown = ", ".join(str(iid) for iid in conflicts[:10])
+        raise ValueError(f"{INVOICES_FILE} tiene facturas con ids ya usados por otras en {SEGMENTS_DIR}/ "
+                         f"({shown}{'...' if len(conflicts) > 10 else ''}); revisarlo y moverlo antes de iniciar.")
+
+    archived = _archive_manifests()
+    for month, group in sorted(new_by_month.items()):
+        if month in archived:
+            _restore_archive(month)
+        _append_segment(month, group, [])
+    values = _read_sequences()
+    last = max((inv.id for group in new_by_month.values() for inv in group), default=0)
+    if INVOICE_SEQUENCE in values and values[INVOICE_SEQUENCE] < last:
+        values[INVOICE_SEQUENCE] = last
+        _write_sequences(values)
+    # Los listeners no se enteraron de estas facturas
+    merged = [inv for group in new_by_month.values() for inv in group]
+    _notify({inv.id: None for inv in merged}, merged, [])
+
+@stats.timed("io_utils._migrate_single_file")
+def _migrate_single_file() -> None:
+    """Reparte facturas.txt (formato anterior, un solo archivo) en segmentos por mes.
+
+    Los segmentos se arman en un directorio temporal que se renombra al final:
+    si se corta a mitad, el siguiente inicio empieza de nuevo. Si segmentos/
+    ya existe y no salio de este mismo archivo (segun migracion.json), sus
+    facturas se agregan a los segmentos. facturas.txt queda como respaldo en
+    facturas.txt.migrado.
+    """
+    fingerprint = _fingerprint(INVOICES_FILE)
+    if os.path.isdir(SEGMENTS_DIR):
+        if _read_migration_marker() != fingerprint:
+            # Por ejemplo, una caja con la version anterior volvio a crear facturas.txt
+            _merge_single_file()
+    else:
+        index = _load_index(INVOICES_FILE)
+
+        # Las facturas eliminadas no pasan a los segmentos: sus ids no se reutilizan
+        values = _read_sequences()
+        if INVOICE_SEQUENCE not in values:
+            values[INVOICE_SEQUENCE] = max((iid for iid, _, _, _ in _read_index_file(INVOICES_FILE)), default=0)
+            _write_sequences(values)
+
+        tmp_dir = SEGMENTS_DIR + ".tmp"
+        import shutil
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        segments: Dict[str, Tuple[Any, List[Tuple[int, int, int, bool]], Dict[str, Any]]] = {}
+        try:
+            with open(INVOICES_FILE, "rb") as src:
+                for iid in sorted(index):
+                    offset, length = index[iid]
+                    src.seek(offset)
+                    raw = src.read(length)
+                    try:
+                        inv = Invoice.from_dict(decode_header(raw))
+                    except (KeyError, TypeError, ValueError):
+                        # Ignorar registros corruptos
+                        continue
+                    month = _month(inv.fecha)
+                    if month not in segments:
+                        segments[month] = (open(_segment_path(month, tmp_dir), "wb"), [], _empty_manifest(month))
+                    f, entries, manifest = segments[month]
+                    entries.append((iid, f.tell(), len(raw), False))
+                    f.write(raw)
+                    _manifest_add(manifest, inv, 1)
+            for f, _, _ in segments.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f, _, _ in segments.values():
+                f.close()
+        for month, (_, entries, manifest) in segments.items():
+            path = _segment_path(month, tmp_dir)
+            _write_index_entries(path, entries, "w")
+            _write_manifest(path, manifest)
+        with open(os.path.join(tmp_dir, MIGRATION_MARKER), "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f)
+        os.replace(tmp_dir, SEGMENTS_DIR)
+        _fsync_dir(SEGMENTS_DIR)
+
+    # Segmentos completos: el archivo anterior queda como respaldo, sin pisar uno previo
+    backup = INVOICES_FILE + ".migrado"
+    n = 1
+    while os.path.exists(backup):
+        backup = f"{INVOICES_FILE}.migrado.{n}"
+        n += 1
+    os.replace(INVOICES_FILE, backup)
+    _rebuild_index(INVOICES_FILE)
+    _segments.update(signature=None, manifests={})
+
+@stats.timed("io_utils.read_invoices")
+def read_invoices() -> List[Invoice]:
+    db = _backend()
+    if db is not None:
+        return db.read_invoices()
+    cached = _cache_get(INVOICES_FILE)
+    if cached is not None:
+        return [i.copy() for i in cached]
+    ensure_files_exist()
+    invoices = list(_iter_segments())
+    if stats.ENABLED:
+        stats.add("registros", len(invoices))
+    _cache_put(INVOICES_FILE, invoices)
+    return invoices
+
+def _write_segment(path: str, month: str, invoices: Iterable[Invoice]) -> None:
+    manifests = _manifests()
+    entries: List[Tuple[int, int, int, bool]] = []
+    manifest = _empty_manifest(month)
+    offset = 0
+
+    # Archivo nuevo completo al lado y rename: nunca queda truncado a medias
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for inv in invoices:
+            data = _encode_invoice(inv.to_dict())
+            f.write(data)
+            entries.append((inv.id, offset, len(data), False))
+            _manifest_add(manifest, inv, 1)
+            offset += len(data)
+        f.flush()
+        os.fsync(f.fileno())
+    if stats.ENABLED:
+        stats.add("bytes_escritos", offset)
+
+    # Sin indice entre el rename y la escritura del nuevo: si se corta, se reconstruye
+    _rebuild_index(path)
+    os.replace(tmp, path)
+    _fsync_dir(path)
+    _write_index_entries(path, entries, "w")
+    index: Dict[int, Tuple[int, int]] = {}
+    _fold_index(index, entries)
+    _index_cache[path] = (_file_signature(path), index)
+    _write_manifest(path, manifest)
+    manifests[month] = manifest
+    # Cambios propios: no hace falta releer los manifiestos
+    _segments["signature"] = _file_signature(SEGMENTS_DIR)
+
+def _remove_segment(month: str) -> None:
+    manifests = _manifests()
+    path = _segment_path(month)
+    _rebuild_index(path)
+    for p in (path, _manifest_path(path)):
+        if os.path.exists(p):
+            os.remove(p)
+    manifests.pop(month, None)
+    _segments["signature"] = _file_signature(SEGMENTS_DIR)
+
+@stats.timed("io_utils.write_invoices")
+def write_invoices(invoices: List[Invoice]) -> None:
+    db = _backend()
+    if db is not None:
+        return db.write_invoices(invoices)
+    ensure_files_exist()
+    by_month: Dict[str, List[Invoice]] = {}
+    for inv in sorted(invoices, key=lambda inv: inv.id):
+        by_month.setdefault(_month(inv.fecha), []).append(inv)
+    # Los meses archivados siguen archivados, con el ultimo id que usaron
+    archived = _archive_manifests().copy()
+    with archive_lock() if archived else contextlib.nullcontext():
+        for month in list(_manifests()):
+            if month not in by_month:
+                _remove_segment(month)
+        for month in set(archived) - set(by_month):
+            _remove_archive(month)
+        for month, group in by_month.items():
+            if month in archived:
+                m = archived[month]
+                _write_archive(month, group, max(m.get("ultimo_id") or 0, m["max_id"] or 0, group[-1].id))
+            else:
+                _write_segment(_segment_path(month), month, group)
+    _cache_put(INVOICES_FILE, invoices)
+
+@stats.timed("io_utils.write_month")
+def write_month(month: str, invoices: Iterable[Invoice]) -> None:
+    """Reescribe el segmento del mes (AAAA-MM) con esas facturas, en orden de id, con indice y manifiesto.
+
+    Para cargas masivas (gen_data.py): las facturas se escriben a medida que
+    llegan, sin pasar por el log ni avisar a los listeners.
+    """
+    if _backend() is not None:
+        raise ValueError("Los segmentos solo existen con el backend de archivos.")
+    ensure_files_exist()
+    _write_segment(_segment_path(month), month, invoices)
+    _cache.pop(INVOICES_FILE, None)
+
+@stats.timed("io_utils.vacuum_invoices")
+def vacuum_invoices() -> Tuple[int, int]:
+    """Reescribe los segmentos sin versiones viejas ni lapidas y reconstruye indices y manifiestos."""
+    db = _backend()
+    if db is not None:
+        return db.vacuum_invoices()
+    ensure_files_exist()
+    before = _segments_size()
+    write_invoices(read_invoices())
+    return before, _segments_size()
+
+def _decode_invoices(raws: Iterator[bytes], from_id: Optional[int], headers_only: bool,
+                     desde: str, hasta: str) -> Iterator[Invoice]:
+    for raw in raws:
+        try:
+            record = decode_header(raw) if headers_only else json.loads(raw)
+            inv = Invoice.from_dict(record)
+        except (KeyError, TypeError, ValueError):
+            # Ignorar registros corruptos
+            continue
+        if from_id is not None and inv.id < from_id:
+            continue
+        day = inv.fecha[:10]
+        if (desde and day < desde) or (hasta and day > hasta):
+            continue
+        yield inv
+
+def _segment_records(path: str, from_id: Optional[int]) -> Iterator[bytes]:
+    index = _load_index(path)
+    ids = sorted(index)
+    start = bisect_left(ids, from_id) if from_id is not None else 0
+    with open(path, "rb") as f:
+        for iid in ids[start:]:
+            pos = index.get(iid)
+            if pos is None:
+                continue
+            f.seek(pos[0])
+            raw = f.read(pos[1])
+            if stats.ENABLED:
+                stats.add("bytes_leidos", len(raw))
+                stats.add("registros")
+            yield raw
+
+def _iter_segment(month: str, from_id: Optional[int], headers_only: bool, desde: str, hasta: str) -> Iterator[Invoice]:
+    return _decode_invoices(_segment_records(_segment_path(month), from_id), from_id, headers_only, desde, hasta)
+
+def _iter_archive(month: str, from_id: Optional[int], headers_only: bool, desde: str, hasta: str) -> Iterator[Invoice]:
+    import invoice_archive
+    raws = invoice_archive.iter_records(_archive_path(month), _archive_manifests()[month], from_id, desde, hasta)
+    return _decode_invoices(raws, from_id, headers_only, desde, hasta)
+
+def _skip_month(m: Dict[str, Any], from_id: Optional[int], desde: str, hasta: str) -> bool:
+    # El manifiesto descarta meses sin abrirlos
+    if m["max_id"] is None or (from_id is not None and m["max_id"] < from_id):
+        return True
+    return bool((desde and m["hasta"][:10] < desde) or (hasta and m["desde"][:10] > hasta))
+
+def _iter_segments(from_id: Optional[int] = None, headers_only: bool = False,
+                   desde: str = "", hasta: str = "") -> Iterator[Invoice]:
+    streams = []
+    for month, m in sorted(_manifests().items()):
+        if not _skip_month(m, from_id, desde, hasta):
+            streams.append(_iter_segment(month, from_id, headers_only, desde, hasta))
+    for month, m in sorted(_archive_manifests().items()):
+        if not _skip_month(m, from_id, desde, hasta):
+            streams.append(_iter_archive(month, from_id, headers_only, desde, hasta))
+
+    # Los ids crecen con la fecha salvo en facturas importadas: mezclar por id
+    yield from heapq.merge(*streams, key=lambda inv: inv.id)
+
+@stats.timed("io_utils.iter_invoices")
+def iter_invoices(from_id: Optional[int] = None, headers_only: bool = False,
+                  desde: str = "", hasta: str = "") -> Iterator[Invoice]:
+    """Facturas vigentes en orden de id, leidas de a una desde los segmentos.
+
+    Con headers_only=True no se decodifican los items (quedan en None).
+    desde/hasta (AAAA-MM-DD, inclusive) limitan por fecha y solo se abren
+    los segmentos de los meses que se cruzan con el periodo.
+    """
+    db = _backend()
+    if db is not None:
+        yield from db.iter_invoices(from_id, headers_only, desde, hasta)
+        return
+    ensure_files_exist()
+    yield from _iter_segments(from_id, headers_only, desde, hasta)
+
+# Lectura en paralelo del backend de archivos (reconcile.py, invoice_export.py):
+# el proceso principal reparte los segmentos en porciones con segment_chunks()
+# y los meses archivados enteros con archived_months(); cada proceso lee lo
+# suyo con iter_chunk() o iter_archived(). Los procesos solo leen: los indices
+# quedan al dia al repartir.
+
+# Segmento -> (firma del indice, offsets de las versiones vigentes)
+_live_offsets: Dict[str, Tuple[Any, set]] = {}
+
+def segment_chunks(chunk_bytes: int, desde: str = "", hasta: str = "") -> List[Tuple[str, str, int, int]]:
+    """Porciones (mes, segmento, inicio, fin) de unos chunk_bytes, cortadas en fin de linea.
+
+    Solo de los segmentos de los meses que se cruzan con desde/hasta (AAAA-MM-DD).
+    """
+    chunks = []
+    for month, m in sorted(_manifests().items()):
+        if _skip_month(m, None, desde, hasta):
+            continue
+        path = _segment_path(month)
+        # Indexar lo pendiente antes de repartir: los procesos solo leen el indice
+        _load_index(path)
+        size = os.path.getsize(path)
+        start = 0
+        with open(path, "rb") as f:
+            while start < size:
+                end = start + chunk_bytes
+                if end >= size:
+                    end = size
+                else:
+                    # Avanzar hasta el final de la linea en curso
+                    f.seek(end - 1)
+                    f.readline()
+                    end = f.tell()
+                chunks.append((month, path, start, end))
+                start = end
+    return chunks
+
+def archived_months(desde: str = "", hasta: str = "") -> List[str]:
+    """Meses archivados (AAAA-MM) que se cruzan con desde/hasta."""
+    return [month for month, m in sorted(_archive_manifests().items()) if not _skip_month(m, None, desde, hasta)]
+
+def _chunk_live(path: str) -> set:
+    # Sin _load_index: no escribe el indice, lo dejo al dia segment_chunks()
+    sig = _file_signature(_index_path(path))
+    entry = _live_offsets.get(path)
+    if entry is None or entry[0] != sig:
+        index: Dict[int, Tuple[int, int]] = {}
+        _fold_index(index, _read_index_file(path))
+        entry = _live_offsets[path] = (sig, {offset for offset, _ in index.values()})
+    return entry[1]
+
+def iter_chunk(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Registros vigentes que empiezan en [start, end) del segmento, en el orden del archivo.
+
+    Las versiones reemplazadas y las lapidas no estan en el indice y se saltan.
+    """
+    live = _chunk_live(path)
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        while offset < end:
+            raw = f.readline()
+            if not raw:
+                break
+            if offset in live:
+                yield raw
+            offset += len(raw)
+
+def iter_archived(month: str, headers_only: bool = False, desde: str = "", hasta: str = "") -> Iterator[Invoice]:
+    """Facturas vigentes del mes archivado; solo se descomprimen los bloques del periodo."""
+    return _iter_archive(month, None, headers_only, desde, hasta)
+
+@stats.timed("io_utils.count_invoices")
+def count_invoices() -> int:
+    db = _backend()
+    if db is not None:
+        return db.count_invoices()
+    ensure_files_exist()
+    return sum(m["facturas"] for m in _all_manifests().values())
+
+@stats.timed("io_utils.month_summaries")
+def month_summaries() -> List[Dict[str, Any]]:
+    """Resumen de cada mes con facturas: cantidad, totales y rango de ids y fechas.
+
+    En archivos sale de los manifiestos y de los pies de los meses archivados,
+    sin abrir ningun segmento ni descomprimir bloques.
+    """
+    db = _backend()
+    if db is not None:
+        return db.month_summaries()
+    ensure_files_exist()
+    summaries = []
+    for month, m in sorted(_all_manifests().items()):
+        if not m["facturas"]:
+            continue
+        summaries.append({
+            "mes": month,
+            "facturas": m["facturas"],
+            "subtotal": from_cents(m["subtotal_cents"]),
+            "iva": from_cents(m["iva_cents"]),
+            "total": from_cents(m["total_cents"]),
+            "min_id": m["min_id"],
+            "max_id": m["max_id"],
+            "desde": m["desde"],
+            "hasta": m["hasta"],
+        })
+    return summaries
+
+@stats.timed("io_utils.get_invoice")
+def get_invoice(iid: int, headers_only: bool = False) -> Optional[Invoice]:
+    """Factura con ese id, o None. Con headers_only=True no se decodifican los items (quedan en None)."""
+    db = _backend()
+    if db is not None:
+        return db.get_invoice(iid, headers_only)
+    ensure_files_exist()
+    for month in _candidate_segments(iid):
+        path = _segment_path(month)
+        for _ in range(2):
+            pos = _load_index(path).get(iid)
+            if pos is None:
+                break
+            record = _read_record(path, *pos, headers_only)
+            if record is not None and record.get("id") == iid and not _is_tombstone(record):
+                return Invoice.from_dict(record)
+
+            # El indice quedo desfasado (archivo modificado por fuera): reconstruir
+            _rebuild_index(path)
+    found = _find_archived(iid)
+    if found is not None:
+        try:
+            return Invoice.from_dict(decode_header(found[1]) if headers_only else json.loads(found[1]))
+        except (KeyError, TypeError, ValueError):
+            return None
+    return None
+
+def _append_segment(month: str, invoices: List[Invoice], removed_ids: List[int]) -> None:
+    path = _segment_path(month)
+    manifests = _manifests()
+    manifest = manifests.get(month) or _empty_manifest(month)
+    index = _load_index(path)
+
+    # Restar la version vigente de cada factura reemplazada o eliminada
+    for iid in [inv.id for inv in invoices] + removed_ids:
+        pos = index.get(iid)
+        if pos is not None:
+            old = _read_header(path, *pos)
+            if old is not None:
+                _manifest_add(manifest, old, -1)
+    for inv in invoices:
+        _manifest_add(manifest, inv, 1)
+    _append_records(path, [inv.to_dict() for inv in invoices] + [{"id": iid, "eliminada": True} for iid in removed_ids])
+    _write_manifest(path, manifest)
+    manifests[month] = manifest
+    _segments["signature"] = _file_signature(SEGMENTS_DIR)
+
+def _store_invoices(invoices: List[Invoice], removed_ids: List[int]) -> None:
+    ensure_files_exist()
+    _reopen_archived(invoices, removed_ids)
+    cached = _cache_get(INVOICES_FILE)
+    replaces = bool(removed_ids)
+    new_by_month: Dict[str, List[Invoice]] = {}
+    removed_by_month: Dict[str, List[int]] = {}
+    for inv in invoices:
+        month = _month(inv.fecha)
+        current = _find_segment(inv.id)
+        if current is not None:
+            replaces = True
+            if current != month:
+                # Otra fecha, otro mes: la version anterior queda con lapida en su segmento
+                removed_by_month.setdefault(current, []).append(inv.id)
+        new_by_month.setdefault(month, []).append(inv)
+    for iid in removed_ids:
+        current = _find_segment(iid)
+        if current is not None:
+            removed_by_month.setdefault(current, []).append(iid)
+    for month in sorted(set(new_by_month) | set(removed_by_month)):
+        _append_segment(month, new_by_month.get(month, []), removed_by_month.get(month, []))
+
+    # Actualizar la cache solo si reflejaba el archivo antes de escribir
+    if cached is None:
+        return
+    if replaces:
+        by_id = {inv.id: inv for inv in cached}
+        for inv in invoices:
+            by_id[inv.id] = inv.copy()
+        for iid in removed_ids:
+            by_id.pop(iid, None)
+        cached[:] = list(by_id.values())
+    else:
+        cached.extend(inv.copy() for inv in invoices)
+    _cache_refresh(INVOICES_FILE, cached)
+
+@stats.timed("io_utils.commit_invoices")
+def commit_invoices(stock_deltas: Dict[int, int], invoices: List[Invoice] = (), removed_ids: List[int] = ()) -> None:
+    """Guarda juntos los cambios de stock y las facturas nuevas, editadas o eliminadas.
+
+    Una factura con id existente reemplaza a la anterior. En archivos todo va en
+    una sola linea del log de transacciones; en SQLite, en una transaccion.
+    """
+    if STORAGE_BACKEND == "servidor":
+        # El servidor valida el stock, guarda y avisa a sus propios listeners
+        return _backend().commit_invoices(stock_deltas, invoices, removed_ids)
+
+    previous = _previous_versions(invoices, removed_ids)
+    before = inventory_version() if _stock_listeners else None
+    db = _backend()
+    if db is not None:
+        db.commit_invoices(stock_deltas, invoices, removed_ids)
+    else:
+        _log_transaction(stock_deltas, {}, list(invoices), list(removed_ids))
+    _notify(previous, invoices, removed_ids)
+    _notify_stock(stock_deltas, before)
+
+def _previous_versions(invoices: List[Invoice], removed_ids: List[int]) -> Dict[int, Optional[Invoice]]:
+    # Versiones anteriores, solo si alguien necesita los cambios
+    previous: Dict[int, Optional[Invoice]] = {}
+    if _invoice_listeners:
+        for iid in [inv.id for inv in invoices] + list(removed_ids):
+            previous[iid] = get_invoice(iid)
+    return previous
+
+def _notify(previous: Dict[int, Optional[Invoice]], invoices: List[Invoice], removed_ids: List[int]) -> None:
+    for listener in _invoice_listeners:
+        for inv in invoices:
+            listener(previous[inv.id], inv)
+        for iid in removed_ids:
+            if previous[iid] is not None:
+                listener(previous[iid], None)
+
+def on_invoice_change(listener: Callable[[Optional[Invoice], Optional[Invoice]], None]) -> None:
+    """Registra una funcion que recibe (version anterior, version nueva) de cada factura guardada."""
+    if listener not in _invoice_listeners:
+        _invoice_listeners.append(listener)
+
+def _notify_stock(stock_deltas: Dict[int, int], before: Any) -> None:
+    # Sin deltas tambien se avisa: la version del inventario puede haber cambiado igual
+    deltas = {pid: delta for pid, delta in stock_deltas.items() if delta}
+    for listener in _stock_listeners:
+        listener(deltas, before)
+
+def on_stock_change(listener: Callable[[Dict[int, int], Any], None]) -> None:
+    """Registra una funcion que recibe los deltas de stock guardados y la version del inventario previa.
+
+    Con FACTURAS_BACKEND=servidor los cambios se avisan en el proceso del servidor.
+    """
+    if listener not in _stock_listeners:
+        _stock_listeners.append(listener)
+
+def append_invoice(invoice: Invoice) -> None:
+    commit_invoices({}, [invoice])
+
+def _read_sequences() -> Dict[str, int]:
+    values: Dict[str, int] = {}
+    if not os.path.exists(SEQUENCES_FILE):
+        return values
+    with open(SEQUENCES_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split("|")
+            if len(parts) != 2:
+                continue
+            try:
+                values[parts[0]] = int(parts[1])
+            except ValueError:
+                # Ignorar líneas corruptas (la secuencia se recupera escaneando)
+                continue
+    return values
+
+@stats.timed("io_utils._write_sequences")
+def _write_sequences(values: Dict[str, int]) -> None:
+    _atomic_write(SEQUENCES_FILE, "".join(f"{name}|{last}\n" for name, last in values.items()).encode("utf-8"))
+
+def _recover_sequence(sequence: str) -> int:
+    # Solo se llega aqui si el almacen de secuencias falta o esta corrupto
+    if sequence == PRODUCT_SEQUENCE:
+        return max((p.id for p in read_inventory()), default=0)
+    if sequence == INVOICE_SEQUENCE:
+        # Incluye facturas eliminadas para no reutilizar sus ids
+        last = 0
+        for month in _manifests():
+            path = _segment_path(month)
+            _load_index(path)
+            last = max([last] + [iid for iid, _, _, _ in _read_index_file(path)])
+        # Los meses archivados guardan el ultimo id de su segmento, lapidas incluidas
+        for m in _archive_manifests().values():
+            last = max(last, m.get("ultimo_id") or 0, m["max_id"] or 0)
+        return last
+    return 0
+
+@stats.timed("io_utils.next_id")
+def next_id(sequence: str, count: int = 1) -> int:
+    """Reserva `count` ids consecutivos de la secuencia y devuelve el primero."""
+    db = _backend()
+    if db is not None:
+        return db.next_id(sequence, count)
+    ensure_files_exist()
+    values = _read_sequences()
+    last = values.get(sequence)
+    if last is None:
+        last = _recover_sequence(sequence)
+    values[sequence] = last + count
+    _write_sequences(values)
+    return last + 1
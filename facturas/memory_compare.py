@@ -0,0 +1,50 @@
+import sys
+import tracemalloc
+from typing import Any, Callable, List
+from models import Product, Invoice, InvoiceItem
+
+# Compara la memoria de productos y facturas como dict (formato anterior)
+# contra los registros con __slots__ de models.py.
+# Uso: python memory_compare.py [cantidad]
+
+def _dict_product(i: int) -> dict:
+    return {"id": i, "nombre": f"producto {i}", "precio": 1000.0 + i, "stock": i % 100}
+
+def _slots_product(i: int) -> Product:
+    return Product(i, f"producto {i}", 100000 + i * 100, i % 100)
+
+def _dict_invoice(i: int) -> dict:
+    items = [
+        {"product_id": n, "product_name": f"producto {n}", "quantity": 2, "unit_price": 1000.0 + n, "line_total": 2000.0 + 2 * n}
+        for n in range(3)
+    ]
+    return {"id": i, "fecha": "2025-01-01 10:00:00", "cliente": f"cliente {i % 500}",
+            "items": items, "subtotal": 6006.0, "iva": 1141.14, "total": 7147.14}
+
+def _slots_invoice(i: int) -> Invoice:
+    items = [InvoiceItem(n, f"producto {n}", 2, 100000 + n * 100) for n in range(3)]
+    return Invoice(i, "2025-01-01 10:00:00", f"cliente {i % 500}", items, 600600, 114114, 714714)
+
+def measure(build: Callable[[int], Any], count: int) -> int:
+    """Bytes asignados para construir count registros."""
+    tracemalloc.start()
+    records: List[Any] = [build(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{count} registros")
+    print(f'{"Tipo":<10} {"dict (KB)":>12} {"slots (KB)":>12} {"Ahorro":>8}')
+    for name, as_dict, as_slots in (
+        ("producto", _dict_product, _slots_product),
+        ("factura", _dict_invoice, _slots_invoice),
+    ):
+        before = measure(as_dict, count)
+        after = measure(as_slots, count)
+        print(f'{name:<10} {before // 1024:>12} {after // 1024:>12} {1 - after / before:>8.0%}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+from typing import Optional
+import io_utils
+import sqlite_backend
+
+# Facturas insertadas por transaccion durante la migracion
+BATCH_SIZE = 1000
+
+def migrate(db_path: Optional[str] = None) -> None:
+    """Copia inventario.txt, facturas.txt y las secuencias a una base SQLite nueva."""
+    db_path = db_path or sqlite_backend.DB_FILE
+    if os.path.exists(db_path):
+        raise ValueError(f"La base {db_path} ya existe; no se sobrescribe.")
+
+    # Leer siempre desde los archivos de texto
+    previous = io_utils.STORAGE_BACKEND
+    io_utils.use_backend("archivos")
+    try:
+        con = sqlite_backend.connect(db_path)
+        products = io_utils.read_inventory()
+        sqlite_backend.write_inventory(products)
+
+        batch = []
+        invoices = 0
+        last_invoice = 0
+        for inv in io_utils.iter_invoices():
+            batch.append(inv)
+            last_invoice = max(last_invoice, inv.id)
+            if len(batch) >= BATCH_SIZE:
+                sqlite_backend.commit_invoices({}, batch)
+                invoices += len(batch)
+                batch = []
+        if batch:
+            sqlite_backend.commit_invoices({}, batch)
+            invoices += len(batch)
+
+        # Conservar las secuencias para no reutilizar ids eliminados
+        sequences = io_utils._read_sequences()
+        with con:
+            for name, fallback in ((io_utils.PRODUCT_SEQUENCE, max((p.id for p in products), default=0)),
+                                   (io_utils.INVOICE_SEQUENCE, last_invoice)):
+                con.execute(
+                    "INSERT OR REPLACE INTO secuencias (nombre, ultimo) VALUES (?, ?)",
+                    (name, max(sequences.get(name, 0), fallback)),
+                )
+    finally:
+        io_utils.use_backend(previous)
+    print(f"Migrados {len(products)} productos y {invoices} facturas a {db_path}.")
+
+if __name__ == "__main__":
+    try:
+        migrate(sys.argv[1] if len(sys.argv) > 1 else None)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
@@ -0,0 +1,140 @@
+from typing import List, Dict, Any, Optional
+
+# Registros compactos: __slots__ en lugar de dict y dinero en centavos enteros.
+# Los archivos siguen guardando el dinero como decimal (9500.0); la conversion
+# ocurre solo al leer y escribir.
+
+def to_cents(value: Any) -> int:
+    return int(round(float(value) * 100))
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+class Product:
+    __slots__ = ("id", "nombre", "precio_cents", "stock")
+
+    def __init__(self, id: int, nombre: str, precio_cents: int, stock: int) -> None:
+        self.id = id
+        self.nombre = nombre
+        self.precio_cents = precio_cents
+        self.stock = stock
+
+    @property
+    def precio(self) -> float:
+        return from_cents(self.precio_cents)
+
+    def copy(self) -> "Product":
+        return Product(self.id, self.nombre, self.precio_cents, self.stock)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "nombre": self.nombre, "precio": self.precio, "stock": self.stock}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Product":
+        return cls(int(d["id"]), d["nombre"], to_cents(d["precio"]), int(d["stock"]))
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Product) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Product(id={self.id}, nombre={self.nombre!r}, precio={self.precio}, stock={self.stock})"
+
+class InvoiceItem:
+    __slots__ = ("product_id", "product_name", "quantity", "unit_price_cents", "line_total_cents")
+
+    def __init__(self, product_id: int, product_name: str, quantity: int, unit_price_cents: int, line_total_cents: Optional[int] = None) -> None:
+        self.product_id = product_id
+        self.product_name = product_name
+        self.quantity = quantity
+        self.unit_price_cents = unit_price_cents
+        self.line_total_cents = unit_price_cents * quantity if line_total_cents is None else line_total_cents
+
+    @property
+    def unit_price(self) -> float:
+        return from_cents(self.unit_price_cents)
+
+    @property
+    def line_total(self) -> float:
+        return from_cents(self.line_total_cents)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "product_id": self.product_id,
+            "product_name": self.product_name,
+            "quantity": self.quantity,
+            "unit_price": self.unit_price,
+            "line_total": self.line_total,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "InvoiceItem":
+        return cls(int(d["product_id"]), d["product_name"], int(d["quantity"]), to_cents(d["unit_price"]), to_cents(d["line_total"]))
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, InvoiceItem) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"InvoiceItem(product_id={self.product_id}, quantity={self.quantity}, unit_price={self.unit_price})"
+
+class Invoice:
+    # items es None cuando solo se decodifico el encabezado
+    __slots__ = ("id", "fecha", "cliente", "items", "subtotal_cents", "iva_cents", "total_cents")
+
+    def __init__(self, id: int, fecha: str, cliente: str, items: Optional[List[InvoiceItem]],
+                 subtotal_cents: int, iva_cents: int, total_cents: int) -> None:
+        self.id = id
+        self.fecha = fecha
+        self.cliente = cliente
+        self.items = items
+        self.subtotal_cents = subtotal_cents
+        self.iva_cents = iva_cents
+        self.total_cents = total_cents
+
+    @property
+    def subtotal(self) -> float:
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def iva(self) -> float:
+        return from_cents(self.iva_cents)
+
+    @property
+    def total(self) -> float:
+        return from_cents(self.total_cents)
+
+    def copy(self) -> "Invoice":
+        items = None if self.items is None else list(self.items)
+        return Invoice(self.id, self.fecha, self.cliente, items, self.subtotal_cents, self.iva_cents, self.total_cents)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Items al final: el encabezado se puede decodificar sin ellos
+        d = {
+            "id": self.id,
+            "fecha": self.fecha,
+            "cliente": self.cliente,
+            "subtotal": self.subtotal,
+            "iva": self.iva,
+            "total": self.total,
+        }
+        if self.items is not None:
+            d["items"] = [it.to_dict() for it in self.items]
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Invoice":
+        items = d.get("items")
+        return cls(
+            int(d["id"]),
+            d["fecha"],
+            d["cliente"],
+            None if items is None else [InvoiceItem.from_dict(it) for it in items],
+            to_cents(d["subtotal"]),
+            to_cents(d["iva"]),
+            to_cents(d["total"]),
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Invoice) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Invoice(id={self.id}, fecha={self.fecha!r}, cliente={self.cliente!r}, total={self.total})"
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import io_utils
+import stats
+
+# Conciliacion del stock contra el historial de facturas.
+# La base guarda, por producto, el stock que habria sin ninguna venta (stock +
+# unidades en facturas vigentes al tomarla). Crear, editar o eliminar facturas
+# no la altera: el stock esperado es siempre base - unidades vendidas, y toda
+# diferencia es un desvio. Un movimiento fuera de facturas (reposicion, conteo
+# fisico) tambien aparece como diferencia: despues de uno, tomar una base nueva.
+#
+# Uso: python reconcile.py --base                  (toma la base)
+#      python reconcile.py [--procesos N]          (compara)
+
+BASELINE_FILE = "stock_base.json"
+
+# Tamaño de cada porcion de segmento que procesa un proceso
+CHUNK_BYTES = 32 * 1024 * 1024
+
+def _sum_chunk(path: str, start: int, end: int) -> Tuple[Dict[int, int], int]:
+    """Unidades por producto de las facturas vigentes que empiezan en [start, end)."""
+    sold: Dict[int, int] = {}
+    count = 0
+    for raw in io_utils.iter_chunk(path, start, end):
+        try:
+            for it in io_utils.decode_items(raw):
+                pid = int(it["product_id"])
+                sold[pid] = sold.get(pid, 0) + int(it["quantity"])
+            count += 1
+        except (ValueError, KeyError, TypeError):
+            # Ignorar registros corruptos
+            pass
+    return sold, count
+
+def _sum_archive(month: str) -> Tuple[Dict[int, int], int]:
+    """Unidades por producto de las facturas de un mes archivado."""
+    sold: Dict[int, int] = {}
+    count = 0
+    for inv in io_utils.iter_archived(month):
+        for it in inv.items:
+            sold[it.product_id] = sold.get(it.product_id, 0) + it.quantity
+        count += 1
+    return sold, count
+
+@stats.timed("reconcile.sold_units")
+def sold_units(procesos: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> Tuple[Dict[int, int], int]:
+    """Unidades vendidas por producto en las facturas vigentes y cuantas facturas son."""
+    sold: Dict[int, int] = {}
+    count = 0
+    if io_utils.STORAGE_BACKEND != "archivos":
+        # SQLite o servidor: no hay archivos que repartir, recorrido secuencial
+        for inv in io_utils.iter_invoices():
+            for it in inv.items:
+                sold[it.product_id] = sold.get(it.product_id, 0) + it.quantity
+            count += 1
+        return sold, count
+
+    io_utils.ensure_files_exist()
+    chunks = [chunk[1:] for chunk in io_utils.segment_chunks(chunk_bytes)]
+    # Los meses archivados van enteros: sus bloques se descomprimen en el proceso
+    archived = io_utils.archived_months()
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(chunks) + len(archived) <= 1:
+        results = [_sum_chunk(*chunk) for chunk in chunks] + [_sum_archive(month) for month in archived]
+    else:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(chunks) + len(archived))) as pool:
+            jobs = [pool.submit(_sum_chunk, *chunk) for chunk in chunks]
+            jobs += [pool.submit(_sum_archive, month) for month in archived]
+            results = [job.result() for job in jobs]
+    for chunk_sold, chunk_count in results:
+        for pid, qty in chunk_sold.items():
+            sold[pid] = sold.get(pid, 0) + qty
+        count += chunk_count
+    return sold, count
+
+def take_baseline(procesos: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> int:
+    """Guarda la base de conciliacion con el inventario y las facturas actuales."""
+    sold, count = sold_units(procesos, chunk_bytes)
+    base = {str(p.id): p.stock + sold.get(p.id, 0) for p in io_utils.read_inventory()}
+    data = {"fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "facturas": count, "base": base}
+    io_utils._atomic_write(BASELINE_FILE, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    return len(base)
+
+def _read_baseline() -> Dict[str, Any]:
+    if not os.path.exists(BASELINE_FILE):
+        raise ValueError("No hay base de conciliacion: tomarla con --base.")
+    with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            raise ValueError(f"{BASELINE_FILE} esta danado: tomar una base nueva con --base.")
+
+def reconcile(procesos: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> Dict[str, Any]:
+    """Compara el stock actual con base - unidades vendidas, producto por producto."""
+    baseline = _read_baseline()
+    base = {int(pid): stock for pid, stock in baseline["base"].items()}
+    sold, count = sold_units(procesos, chunk_bytes)
+    differences = []
+    without_base = []
+    for p in io_utils.read_inventory():
+        if p.id not in base:
+            # Producto agregado despues de la base
+            without_base.append(p.id)
+            continue
+        expected = base[p.id] - sold.get(p.id, 0)
+        if p.stock != expected:
+            differences.append((p.id, p.nombre, base[p.id], sold.get(p.id, 0), expected, p.stock))
+    return {"base": baseline["fecha"], "facturas": count, "diferencias": differences, "sin_base": without_base}
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f'Base del {result["base"]}; {result["facturas"]} facturas vigentes.')
+    if result["sin_base"]:
+        print(f'{len(result["sin_base"])} productos agregados despues de la base (no se concilian).')
+    if not result["diferencias"]:
+        print("Stock conciliado: sin diferencias.")
+        return
+    print("\n=== Diferencias de stock ===")
+    print(f'{"ProdID":<7} {"Nombre":<25} {"Base":>9} {"Vendidas":>9} {"Esperado":>9} {"Actual":>9} {"Dif":>7}')
+    for pid, nombre, base, sold, expected, actual in result["diferencias"]:
+        print(f'{pid:<7} {nombre:<25} {base:>9} {sold:>9} {expected:>9} {actual:>9} {actual - expected:>+7}')
+    print()
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Concilia el stock con las unidades vendidas en facturas.")
+    parser.add_argument("--base", action="store_true", help="tomar una base nueva en lugar de comparar")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos en paralelo (por defecto, uno por nucleo)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES // (1024 * 1024), help="MB por porcion")
+    parser.add_argument("--dir", default=".", help="directorio de los datos")
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+    chunk_bytes = max(1, args.chunk_mb) * 1024 * 1024
+    start = time.perf_counter()
+    try:
+        if args.base:
+            count = take_baseline(args.procesos, chunk_bytes)
+            print(f"Base de conciliacion guardada para {count} productos en {BASELINE_FILE}.")
+        else:
+            print_report(reconcile(args.procesos, chunk_bytes))
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Tiempo: {time.perf_counter() - start:.2f} s")
+
+if __name__ == "__main__":
+    main()
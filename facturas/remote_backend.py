@@ -0,0 +1,129 @@
+import os
+import json
+import socket
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from models import Product, Invoice
+
+# Cliente del servidor de facturacion (FACTURAS_BACKEND=servidor).
+# Cada llamada es una linea JSON {"op", "args"} y la respuesta otra linea
+# {"ok": resultado} o {"error", "tipo"}. Ver server.py.
+
+SERVER_ADDRESS = os.environ.get("FACTURAS_SERVIDOR", "127.0.0.1:8765")
+
+# Facturas por pedido al recorrer el historial con iter_invoices
+PAGE_SIZE = 500
+
+_conn: Optional[Tuple[socket.socket, Any]] = None
+
+# Cache del inventario: (version del servidor, productos)
+_inventory_cache: Optional[Tuple[Any, List[Product]]] = None
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise ValueError(f"Direccion de servidor invalida: {address}")
+
+def _connection() -> Any:
+    global _conn
+    if _conn is None:
+        address = parse_address(SERVER_ADDRESS)
+        try:
+            sock = socket.create_connection(address)
+        except OSError as e:
+            raise ConnectionError(f"No se pudo conectar al servidor {SERVER_ADDRESS}: {e}")
+        _conn = (sock, sock.makefile("rwb"))
+    return _conn[1]
+
+def close() -> None:
+    global _conn
+    if _conn is not None:
+        _conn[1].close()
+        _conn[0].close()
+        _conn = None
+
+def _call(op: str, *args: Any) -> Any:
+    f = _connection()
+    try:
+        f.write(json.dumps({"op": op, "args": args}, ensure_ascii=False).encode("utf-8") + b"\n")
+        f.flush()
+        line = f.readline()
+    except OSError as e:
+        close()
+        raise ConnectionError(f"Se perdio la conexion con el servidor: {e}")
+    if not line:
+        close()
+        raise ConnectionError("El servidor cerro la conexion.")
+    reply = json.loads(line)
+    if "error" in reply:
+        # Los errores de validacion llegan como ValueError, igual que en local
+        if reply.get("tipo") == "ValueError":
+            raise ValueError(reply["error"])
+        raise RuntimeError(f'Error del servidor: {reply["error"]}')
+    return reply["ok"]
+
+def ensure_files_exist() -> None:
+    _call("ensure_files_exist")
+
+def clear_cache() -> None:
+    global _inventory_cache
+    _inventory_cache = None
+
+def inventory_version() -> Any:
+    return _call("inventory_version")
+
+def read_inventory() -> List[Product]:
+    # Solo se transfiere el inventario completo cuando cambio en el servidor
+    global _inventory_cache
+    version = inventory_version()
+    if _inventory_cache is None or _inventory_cache[0] != version:
+        reply = _call("read_inventory")
+        _inventory_cache = (reply["version"], [Product.from_dict(d) for d in reply["productos"]])
+    return [p.copy() for p in _inventory_cache[1]]
+
+def write_inventory(products: List[Product]) -> None:
+    _call("write_inventory", [p.to_dict() for p in products])
+
+def apply_inventory_changes(stock_deltas: Dict[int, int], price_changes: Optional[Dict[int, int]] = None) -> None:
+    _call("apply_inventory_changes", stock_deltas, price_changes or {})
+
+def compact_inventory() -> None:
+    _call("compact_inventory")
+
+def read_invoices() -> List[Invoice]:
+    return [Invoice.from_dict(d) for d in _call("read_invoices")]
+
+def write_invoices(invoices: List[Invoice]) -> None:
+    _call("write_invoices", [inv.to_dict() for inv in invoices])
+
+def vacuum_invoices() -> Tuple[int, int]:
+    before, after = _call("vacuum_invoices")
+    return before, after
+
+def iter_invoices(from_id: Optional[int] = None, headers_only: bool = False,
+                  desde: str = "", hasta: str = "") -> Iterator[Invoice]:
+    # Paginas de PAGE_SIZE: el cliente no carga el historial completo
+    while True:
+        page = _call("iter_invoices", from_id, headers_only, PAGE_SIZE, desde, hasta)
+        for d in page:
+            yield Invoice.from_dict(d)
+        if len(page) < PAGE_SIZE:
+            return
+        from_id = page[-1]["id"] + 1
+
+def count_invoices() -> int:
+    return _call("count_invoices")
+
+def month_summaries() -> List[Dict[str, Any]]:
+    return _call("month_summaries")
+
+def get_invoice(iid: int, headers_only: bool = False) -> Optional[Invoice]:
+    d = _call("get_invoice", iid, headers_only)
+    return Invoice.from_dict(d) if d is not None else None
+
+def commit_invoices(stock_deltas: Dict[int, int], invoices: List[Invoice] = (), removed_ids: List[int] = ()) -> None:
+    _call("commit_invoices", stock_deltas, [inv.to_dict() for inv in invoices], list(removed_ids))
+
+def next_id(sequence: str, count: int = 1) -> int:
+    return _call("next_id", sequence, count)
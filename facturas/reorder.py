@@ -0,0 +1,162 @@
+import os
+import csv
+from typing import List, Dict, Any, Tuple
+from io_utils import read_inventory, inventory_version, on_stock_change, _file_signature, _atomic_write
+import stats
+
+# Cola de reposicion: productos con stock bajo su umbral, el mas urgente primero.
+# Los umbrales se guardan junto al inventario en umbrales.txt (id|umbral); un
+# producto sin umbral no se sigue. La cola se arma una vez por version del
+# inventario y despues se mantiene con cada cambio de stock guardado
+# (io_utils.on_stock_change), en O(1) por producto tocado; el orden por
+# urgencia se arma al listarla.
+THRESHOLDS_FILE = "umbrales.txt"
+THRESHOLDS_HEADER = "id|umbral"
+
+EXPORT_FILE = "reposicion.csv"
+
+# Estado en memoria: version del inventario y firma de umbrales.txt con los que
+# se armo, y la urgencia de cada producto en la cola
+_queue: Dict[str, Any] = {
+    "version": None,
+    "signature": None,
+    "stock": {},       # id -> stock
+    "names": {},       # id -> nombre
+    "thresholds": {},  # id -> umbral
+    "entries": {},     # id -> urgencia de los productos en la cola
+}
+
+def _urgency(stock: int, threshold: int) -> int:
+    # Milesimas del umbral que quedan en stock: 0 es agotado
+    return max(stock, 0) * 1000 // threshold
+
+def _read_thresholds() -> Dict[int, int]:
+    thresholds: Dict[int, int] = {}
+    if not os.path.exists(THRESHOLDS_FILE):
+        return thresholds
+    with open(THRESHOLDS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.lower() == THRESHOLDS_HEADER:
+                continue
+            try:
+                pid, umbral = line.split("|")
+                thresholds[int(pid)] = int(umbral)
+            except ValueError:
+                # Ignorar líneas corruptas
+                continue
+    return thresholds
+
+def _write_thresholds(thresholds: Dict[int, int]) -> None:
+    lines = [THRESHOLDS_HEADER] + [f"{pid}|{umbral}" for pid, umbral in sorted(thresholds.items()) if umbral > 0]
+    _atomic_write(THRESHOLDS_FILE, ("\n".join(lines) + "\n").encode("utf-8"))
+
+def _update(pid: int) -> None:
+    """Pone, mueve o saca al producto de la cola segun su stock y su umbral."""
+    entries = _queue["entries"]
+    threshold = _queue["thresholds"].get(pid, 0)
+    stock = _queue["stock"].get(pid)
+    if stock is None or threshold <= 0 or stock >= threshold:
+        entries.pop(pid, None)
+    else:
+        entries[pid] = _urgency(stock, threshold)
+
+@stats.timed("reorder.build")
+def build() -> int:
+    """Arma la cola recorriendo el inventario una vez; devuelve cuantos productos tiene."""
+    products = read_inventory()
+    _queue["version"] = inventory_version()
+    _queue["signature"] = _file_signature(THRESHOLDS_FILE)
+    _queue["stock"] = {p.id: p.stock for p in products}
+    _queue["names"] = {p.id: p.nombre for p in products}
+    _queue["thresholds"] = _read_thresholds()
+    _queue["entries"] = {}
+    for pid in _queue["thresholds"]:
+        _update(pid)
+    return len(_queue["entries"])
+
+def _ensure() -> None:
+    if _queue["version"] != inventory_version() or _queue["signature"] != _file_signature(THRESHOLDS_FILE):
+        build()
+
+def apply_stock_change(deltas: Dict[int, int], before: Any) -> None:
+    """Mueve en la cola solo los productos cuyo stock cambio."""
+    if _queue["version"] is None:
+        # Todavia no se armo: se arma al consultarla
+        return
+    if _queue["version"] != before:
+        # La cola ya estaba desactualizada antes del cambio: se rearma al consultarla
+        _queue["version"] = None
+        return
+    stock = _queue["stock"]
+    for pid, delta in deltas.items():
+        if pid in stock:
+            stock[pid] += delta
+            _update(pid)
+    _queue["version"] = inventory_version()
+
+def set_threshold(pid: int, umbral: int) -> None:
+    """Guarda el umbral del producto (0 deja de seguirlo)."""
+    _ensure()
+    if pid not in _queue["stock"]:
+        raise ValueError(f"Producto {pid} no existe en inventario.")
+    if umbral < 0:
+        raise ValueError("Umbral invalido.")
+    thresholds = _read_thresholds()
+    thresholds[pid] = umbral
+    _write_thresholds(thresholds)
+    _queue["thresholds"] = {p: u for p, u in thresholds.items() if u > 0}
+    _queue["signature"] = _file_signature(THRESHOLDS_FILE)
+    _update(pid)
+
+def pending() -> List[Tuple[int, str, int, int, int]]:
+    """Productos a reponer, el mas urgente primero: (id, nombre, stock, umbral, faltante)."""
+    _ensure()
+    rows = []
+    for key, pid in sorted((key, pid) for pid, key in _queue["entries"].items()):
+        stock = _queue["stock"][pid]
+        threshold = _queue["thresholds"][pid]
+        rows.append((pid, _queue["names"].get(pid, ""), stock, threshold, threshold - stock))
+    return rows
+
+def export_reorder(path: str = EXPORT_FILE) -> int:
+    """Escribe la lista de reposicion en CSV; devuelve cuantos productos tiene."""
+    rows = pending()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "nombre", "stock", "umbral", "faltante"])
+        writer.writerows(rows)
+    return len(rows)
+
+def show_reorder() -> None:
+    rows = pending()
+    if not rows:
+        print("No hay productos bajo su umbral de reposicion.")
+        return
+    print("\n=== Productos para reponer ===")
+    print(f'{"ID":<5} {"Nombre":<25} {"Stock":>8} {"Umbral":>8} {"Faltante":>9}')
+    for pid, nombre, stock, threshold, missing in rows:
+        print(f'{pid:<5} {nombre:<25} {stock:>8} {threshold:>8} {missing:>9}')
+    print()
+
+def define_threshold() -> None:
+    try:
+        pid = int(input("ID del producto: ").strip())
+        umbral = int(input("Umbral de reposicion (0 para no seguirlo): ").strip())
+    except ValueError:
+        print("Valor invalido.")
+        return
+    try:
+        set_threshold(pid, umbral)
+    except ValueError as e:
+        print(e)
+        return
+    print("Umbral guardado.")
+
+def export_reorder_list() -> None:
+    path = input(f"Archivo de salida [{EXPORT_FILE}]: ").strip() or EXPORT_FILE
+    count = export_reorder(path)
+    print(f"{count} productos exportados a {path}.")
+
+# Mantener la cola al dia con cada cambio de stock
+on_stock_change(apply_stock_change)
@@ -0,0 +1,219 @@
+import heapq
+from typing import List, Dict, Any, Optional, Tuple
+from models import Invoice, to_cents, from_cents
+from io_utils import iter_invoices, month_summaries, on_invoice_change
+from snapshot_store import SnapshotStore
+
+# Agregados materializados de ventas y su journal de cambios (una linea JSON por cambio).
+# Los importes se acumulan en centavos enteros, como en las facturas: sumar y
+# restar cambios no acumula redondeo y el resultado coincide con rebuild().
+# Pasan a pesos recien al mostrarlos.
+REPORTS_FILE = "reportes.json"
+REPORTS_JOURNAL_FILE = "reportes.journal"
+
+# Tamaño (bytes) a partir del cual el journal se incorpora a reportes.json
+REPORTS_COMPACT_BYTES = 256 * 1024
+
+# Marca de reportes.json con importes en centavos; sin ella son pesos con decimales
+CENTS_KEY = "centavos"
+
+def _empty() -> Dict[str, Dict[str, List[Any]]]:
+    # productos: id -> [nombre, unidades, ingresos]
+    # dias: AAAA-MM-DD -> [facturas, unidades, subtotal, total]
+    # clientes: nombre -> [facturas, total]
+    return {"productos": {}, "dias": {}, "clientes": {}}
+
+def _invoice_delta(inv: Invoice, sign: int) -> Dict[str, Dict[str, List[Any]]]:
+    delta = _empty()
+    units = 0
+    for it in inv.items:
+        entry = delta["productos"].setdefault(str(it.product_id), [it.product_name, 0, 0])
+        entry[1] += sign * it.quantity
+        entry[2] += sign * it.line_total_cents
+        units += it.quantity
+    delta["dias"][inv.fecha[:10]] = [sign, sign * units, sign * inv.subtotal_cents, sign * inv.total_cents]
+    delta["clientes"][inv.cliente] = [sign, sign * inv.total_cents]
+    return delta
+
+def _merge(data: Dict[str, Dict[str, List[Any]]], delta: Dict[str, Dict[str, List[Any]]]) -> None:
+    for section, rows in delta.items():
+        target = data[section]
+        for key, values in rows.items():
+            current = target.get(key)
+            if current is None:
+                # Un cambio anotado en pesos por una version anterior trae floats
+                target[key] = [to_cents(v) if isinstance(v, float) else v for v in values]
+                continue
+            for i, v in enumerate(values):
+                if isinstance(v, str):
+                    # Nombre del producto: conservar el mas reciente
+                    current[i] = v
+                elif isinstance(v, float):
+                    # Cambio anotado en pesos por una version anterior
+                    current[i] += to_cents(v)
+                else:
+                    current[i] += v
+
+            # Quitar filas que quedaron en cero (facturas eliminadas)
+            if all(v == 0 for v in current if not isinstance(v, str)):
+                del target[key]
+
+def _decode(saved: Dict[str, Any]) -> Dict[str, Dict[str, List[Any]]]:
+    data = _empty()
+    for section in data:
+        data[section] = saved[section]
+    if not saved.get(CENTS_KEY):
+        # reportes.json anterior, en pesos: pasar los importes a centavos
+        for rows in data.values():
+            for values in rows.values():
+                values[:] = [to_cents(v) if isinstance(v, float) else v for v in values]
+    return data
+
+def _encode(data: Dict[str, Dict[str, List[Any]]]) -> Dict[str, Any]:
+    return dict(data, **{CENTS_KEY: True})
+
+def _build() -> Tuple[Dict[str, Dict[str, List[Any]]], int]:
+    data = _empty()
+    count = 0
+    for inv in iter_invoices():
+        _merge(data, _invoice_delta(inv, 1))
+        count += 1
+    return data, count
+
+_store = SnapshotStore(REPORTS_FILE, REPORTS_JOURNAL_FILE, REPORTS_COMPACT_BYTES,
+                       _empty, _decode, _encode, _merge, _build)
+
+def _load() -> Dict[str, Dict[str, List[Any]]]:
+    return _store.load()
+
+def apply_change(previous: Optional[Invoice], current: Optional[Invoice]) -> None:
+    """Resta la version anterior de una factura y suma la nueva (None = no existe)."""
+    delta = _empty()
+    if previous is not None:
+        _merge(delta, _invoice_delta(previous, -1))
+    if current is not None:
+        _merge(delta, _invoice_delta(current, 1))
+    if not any(delta.values()):
+        return
+    _store.append(delta)
+
+def rebuild() -> int:
+    """Recalcula todos los agregados desde el historial de facturas."""
+    return _store.rebuild()
+
+def _top_products(rows: Dict[str, List[Any]], limit: int) -> List[Tuple[int, str, int, int]]:
+    top = heapq.nlargest(limit, rows.items(), key=lambda kv: kv[1][2])
+    return [(int(pid), nombre, units, revenue) for pid, (nombre, units, revenue) in top]
+
+def top_products(limit: int = 10) -> List[Tuple[int, str, int, int]]:
+    """(id, nombre, unidades, ingresos en centavos) de los productos que mas facturaron."""
+    return _top_products(_load()["productos"], limit)
+
+def sales_by_day(desde: str = "", hasta: str = "") -> List[Tuple[str, int, int, int, int]]:
+    """(dia, facturas, unidades, subtotal, total) por dia del periodo; importes en centavos."""
+    rows = _load()["dias"]
+    days = sorted(d for d in rows if (not desde or d >= desde) and (not hasta or d <= hasta))
+    return [(d, *rows[d]) for d in days]
+
+def _top_customers(rows: Dict[str, List[Any]], limit: int) -> List[Tuple[str, int, int]]:
+    top = heapq.nlargest(limit, rows.items(), key=lambda kv: kv[1][1])
+    return [(cliente, count, total) for cliente, (count, total) in top]
+
+def top_customers(limit: int = 10) -> List[Tuple[str, int, int]]:
+    """(cliente, facturas, total en centavos) de los clientes que mas compraron."""
+    return _top_customers(_load()["clientes"], limit)
+
+def period_aggregates(desde: str, hasta: str) -> Dict[str, Dict[str, List[Any]]]:
+    """Agregados (productos, dias, clientes) de las facturas entre desde y hasta (AAAA-MM-DD).
+
+    Solo se leen los segmentos de los meses del periodo.
+    """
+    data = _empty()
+    for inv in iter_invoices(desde=desde, hasta=hasta):
+        _merge(data, _invoice_delta(inv, 1))
+    return data
+
+def month_closing(mes: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Dict[str, List[Any]]]]]:
+    """Totales del mes (AAAA-MM) segun su manifiesto y el detalle leido de su segmento."""
+    summary = next((m for m in month_summaries() if m["mes"] == mes), None)
+    if summary is None:
+        return None
+    return summary, period_aggregates(mes + "-01", mes + "-31")
+
+def report_products() -> None:
+    rows = top_products(20)
+    if not rows:
+        print("Sin ventas registradas.")
+        return
+    print("\n=== Productos mas vendidos ===")
+    print(f'{"ProdID":<7} {"Nombre":<25} {"Unidades":>9} {"Ingresos":>14}')
+    for pid, nombre, units, revenue in rows:
+        print(f'{pid:<7} {nombre:<25} {units:>9} {from_cents(revenue):>14.2f}')
+    print()
+
+def report_days() -> None:
+    desde = input("Desde (AAAA-MM-DD, ENTER = inicio): ").strip()
+    hasta = input("Hasta (AAAA-MM-DD, ENTER = sin limite): ").strip()
+    rows = sales_by_day(desde, hasta)
+    if not rows:
+        print("Sin ventas en el periodo.")
+        return
+    print("\n=== Ventas por dia ===")
+    print(f'{"Dia":<12} {"Facturas":>9} {"Unidades":>9} {"Subtotal":>14} {"Total":>14}')
+    for day, count, units, subtotal, total in rows:
+        print(f'{day:<12} {count:>9} {units:>9} {from_cents(subtotal):>14.2f} {from_cents(total):>14.2f}')
+    print()
+
+def report_customers() -> None:
+    rows = top_customers(20)
+    if not rows:
+        print("Sin ventas registradas.")
+        return
+    print("\n=== Ventas por cliente ===")
+    print(f'{"Cliente":<25} {"Facturas":>9} {"Total":>14}')
+    for cliente, count, total in rows:
+        print(f'{cliente:<25} {count:>9} {from_cents(total):>14.2f}')
+    print()
+
+def report_months() -> None:
+    rows = month_summaries()
+    if not rows:
+        print("Sin ventas registradas.")
+        return
+    print("\n=== Resumen por mes ===")
+    print(f'{"Mes":<8} {"Facturas":>9} {"Subtotal":>14} {"IVA":>12} {"Total":>14} {"IDs":>15}')
+    for m in rows:
+        ids = f'{m["min_id"]}-{m["max_id"]}'
+        print(f'{m["mes"]:<8} {m["facturas"]:>9} {m["subtotal"]:>14.2f} {m["iva"]:>12.2f} {m["total"]:>14.2f} {ids:>15}')
+    print()
+
+def report_month_closing() -> None:
+    mes = input("Mes a cerrar (AAAA-MM): ").strip()
+    closing = month_closing(mes)
+    if closing is None:
+        print("Sin ventas en ese mes.")
+        return
+    summary, data = closing
+    print(f"\n=== Cierre de {mes} ===")
+    print(f'Facturas: {summary["facturas"]} (ids {summary["min_id"]} a {summary["max_id"]})')
+    print(f'Subtotal: {summary["subtotal"]:.2f}')
+    print(f'IVA: {summary["iva"]:.2f}')
+    print(f'Total: {summary["total"]:.2f}')
+    print(f'\n{"Dia":<12} {"Facturas":>9} {"Unidades":>9} {"Total":>14}')
+    for day in sorted(data["dias"]):
+        count, units, _, total = data["dias"][day]
+        print(f'{day:<12} {count:>9} {units:>9} {from_cents(total):>14.2f}')
+    print(f'\n{"ProdID":<7} {"Nombre":<25} {"Unidades":>9} {"Ingresos":>14}')
+    for pid, nombre, units, revenue in _top_products(data["productos"], 5):
+        print(f'{pid:<7} {nombre:<25} {units:>9} {from_cents(revenue):>14.2f}')
+    print(f'\n{"Cliente":<25} {"Facturas":>9} {"Total":>14}')
+    for cliente, count, total in _top_customers(data["clientes"], 5):
+        print(f'{cliente:<25} {count:>9} {from_cents(total):>14.2f}')
+    print()
+
+def rebuild_reports() -> None:
+    count = rebuild()
+    print(f"Agregados reconstruidos a partir de {count} facturas.")
+
+# Mantener los agregados al dia con cada factura guardada
+on_invoice_change(apply_change)
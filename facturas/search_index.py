@@ -0,0 +1,135 @@
+from typing import List, Dict, Any, Optional
+from models import Product
+
+# Indice de trigramas sobre nombres de productos.
+# Se construye una vez por version del inventario en cache (io_utils.inventory_version)
+# y se mantiene al agregar o eliminar productos.
+_index: Dict[str, Any] = {
+    "version": None,
+    "positions": {},  # id -> posicion en la lista de read_inventory()
+    "names": {},      # id -> nombre en minusculas
+    "grams": {},      # trigrama -> ids que lo contienen
+}
+
+MODES = ("contains", "prefix", "ranked")
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _add_entry(pid: int, nombre: str, pos: int) -> None:
+    name = nombre.lower()
+    _index["positions"][pid] = pos
+    _index["names"][pid] = name
+    grams = _index["grams"]
+    for g in _trigrams(name):
+        grams.setdefault(g, []).append(pid)
+
+def build(products: List[Product], version: Any) -> None:
+    _index["positions"] = {}
+    _index["names"] = {}
+    _index["grams"] = {}
+    for pos, p in enumerate(products):
+        _add_entry(p.id, p.nombre, pos)
+    _index["version"] = version
+
+def ensure(products: List[Product], version: Any) -> None:
+    if _index["version"] != version or len(products) != len(_index["positions"]):
+        build(products, version)
+
+def sync(version: Any) -> None:
+    # El indice ya refleja los cambios escritos; adoptar la nueva version
+    _index["version"] = version
+
+def add(product: Product, pos: int) -> None:
+    _add_entry(product.id, product.nombre, pos)
+
+def remove(pid: int) -> None:
+    pos = _index["positions"].pop(pid, None)
+    name = _index["names"].pop(pid, None)
+    if pos is None:
+        return
+    grams = _index["grams"]
+    for g in _trigrams(name):
+        ids = grams.get(g)
+        if ids is None:
+            continue
+        ids.remove(pid)
+        if not ids:
+            del grams[g]
+
+    # Los productos posteriores se corren una posicion
+    positions = _index["positions"]
+    for other, other_pos in positions.items():
+        if other_pos > pos:
+            positions[other] = other_pos - 1
+
+def _resolve(products: List[Product], pids: List[int]) -> Optional[List[Product]]:
+    positions = _index["positions"]
+    result = []
+    for pid in pids:
+        pos = positions[pid]
+        # Verificar que la lista corresponde al indice
+        if pos >= len(products) or products[pos].id != pid:
+            return None
+        result.append(products[pos])
+    return result
+
+def lookup_id(products: List[Product], pid: int) -> Optional[Product]:
+    pos = _index["positions"].get(pid)
+    if pos is None or pos >= len(products) or products[pos].id != pid:
+        return None
+    return products[pos]
+
+def _candidates(term_lower: str) -> List[int]:
+    names = _index["names"]
+    grams = _index["grams"]
+    if len(term_lower) < 3:
+        # Sin trigramas: recorrer nombres ya normalizados
+        return list(names.keys())
+
+    # Basta la lista de ids mas corta entre los trigramas del termino
+    shortest: Optional[List[int]] = None
+    for g in _trigrams(term_lower):
+        ids = grams.get(g)
+        if ids is None:
+            return []
+        if shortest is None or len(ids) < len(shortest):
+            shortest = ids
+    return list(shortest or [])
+
+def search_ids(term: str, mode: str = "contains") -> List[int]:
+    if mode not in MODES:
+        raise ValueError(f"Modo de busqueda invalido: {mode}")
+    term_lower = term.lower()
+    names = _index["names"]
+    positions = _index["positions"]
+    candidates = _candidates(term_lower)
+    if mode == "prefix":
+        pids = [pid for pid in candidates if names[pid].startswith(term_lower)]
+    else:
+        pids = [pid for pid in candidates if term_lower in names[pid]]
+    if mode == "ranked":
+        # Primero donde el termino aparece antes, luego nombres mas cortos
+        pids.sort(key=lambda pid: (names[pid].find(term_lower), len(names[pid]), positions[pid]))
+    else:
+        # Mismo orden que el inventario
+        pids.sort(key=positions.__getitem__)
+    return pids
+
+def find_id(products: List[Product], pid: int, version: Any) -> Optional[Product]:
+    ensure(products, version)
+    product = lookup_id(products, pid)
+    if product is None and pid in _index["positions"]:
+        # La lista no corresponde al indice: reconstruir y reintentar
+        build(products, version)
+        product = lookup_id(products, pid)
+    return product
+
+def search(products: List[Product], term: str, version: Any, mode: str = "contains") -> List[Product]:
+    """Productos cuyo nombre contiene (o empieza con) el termino, en el orden del modo."""
+    ensure(products, version)
+    result = _resolve(products, search_ids(term, mode))
+    if result is None:
+        build(products, version)
+        result = _resolve(products, search_ids(term, mode)) or []
+    return result
@@ -0,0 +1,257 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple
+from models import Product, Invoice
+import io_utils
+import reports  # los agregados se mantienen en el proceso del servidor
+import invoice_index  # igual que los indices por cliente y por fecha
+import reorder  # y la cola de reposicion, con cada cambio de stock
+from remote_backend import SERVER_ADDRESS, parse_address
+
+# Servidor local para varias cajas: es el unico proceso que toca los archivos.
+# Las lecturas se responden desde la cache en memoria de io_utils; las
+# escrituras pasan por una sola cola y un solo escritor, que agrupa las
+# facturas que llegan juntas en una escritura y valida el stock antes de guardar.
+# Con el backend de archivos cada lote se escribe en un hilo aparte, de a un
+# lote por vez: las lecturas siguen respondiendose mientras el lote espera el
+# fsync. Con SQLite el lote corre en el loop, porque la conexion es una sola y
+# una lectura en medio de la transaccion del escritor entraria en ella.
+#
+# Uso: python server.py [--direccion 127.0.0.1:8765] [--backend archivos|sqlite]
+# Las cajas se inician con FACTURAS_BACKEND=servidor python app.py
+
+# Maximo de pedidos de escritura que se agrupan en un lote
+BATCH_MAX = 256
+
+# Tamaño maximo de una linea del protocolo (inventarios o lotes grandes)
+MAX_MESSAGE = 1 << 30
+
+def _int_keys(d: Optional[Dict[Any, Any]]) -> Dict[int, Any]:
+    # JSON convierte las claves enteras en texto
+    return {int(k): v for k, v in (d or {}).items()}
+
+def _read_inventory() -> Dict[str, Any]:
+    # La version se toma despues de leer: corresponde a los productos enviados
+    products = [p.to_dict() for p in io_utils.read_inventory()]
+    return {"version": io_utils.inventory_version(), "productos": products}
+
+def _iter_invoices(from_id: Optional[int], headers_only: bool, limit: int,
+                   desde: str = "", hasta: str = "") -> List[Dict[str, Any]]:
+    invoices = io_utils.iter_invoices(from_id, headers_only, desde, hasta)
+    page = [inv.to_dict() for inv in islice(invoices, limit)]
+    invoices.close()
+    return page
+
+def _get_invoice(iid: int, headers_only: bool = False) -> Optional[Dict[str, Any]]:
+    inv = io_utils.get_invoice(iid, headers_only)
+    return inv.to_dict() if inv is not None else None
+
+# Operaciones que se responden en cuanto llegan
+READ_OPS = {
+    "ensure_files_exist": io_utils.ensure_files_exist,
+    "read_invoices": lambda: [inv.to_dict() for inv in io_utils.read_invoices()],
+    "iter_invoices": _iter_invoices,
+    "count_invoices": io_utils.count_invoices,
+    "month_summaries": io_utils.month_summaries,
+    "get_invoice": _get_invoice,
+    # El servidor es el unico que reserva ids: no hace falta pasar por la cola
+    "next_id": io_utils.next_id,
+}
+
+# Operaciones que pasan por el escritor (commit_invoices se agrupa aparte)
+WRITE_OPS = {
+    "write_inventory": lambda products: io_utils.write_inventory([Product.from_dict(d) for d in products]),
+    "apply_inventory_changes": lambda deltas, prices: io_utils.apply_inventory_changes(_int_keys(deltas), _int_keys(prices)),
+    "compact_inventory": io_utils.compact_inventory,
+    "write_invoices": lambda invoices: io_utils.write_invoices([Invoice.from_dict(d) for d in invoices]),
+    "vacuum_invoices": io_utils.vacuum_invoices,
+}
+
+class _Commit:
+    __slots__ = ("deltas", "invoices", "removed_ids", "future")
+
+    def __init__(self, args: List[Any], future: asyncio.Future) -> None:
+        deltas, invoices, removed_ids = args
+        self.deltas = _int_keys(deltas)
+        self.invoices = [Invoice.from_dict(d) for d in invoices]
+        self.removed_ids = [int(iid) for iid in removed_ids]
+        self.future = future
+
+    def ids(self) -> set:
+        return {inv.id for inv in self.invoices} | set(self.removed_ids)
+
+def _check_stock(stock: Dict[int, int], deltas: Dict[int, int]) -> None:
+    for pid, delta in deltas.items():
+        if delta >= 0:
+            continue
+        if pid not in stock:
+            raise ValueError(f"Producto {pid} no existe en inventario.")
+        if stock[pid] + delta < 0:
+            raise ValueError(f"Stock insuficiente para producto {pid} (disponible: {stock[pid]}).")
+
+def _complete(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    # El cliente pudo haberse desconectado mientras esperaba
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    # El lote puede correr en el hilo del escritor: el futuro se completa en el loop
+    future.get_loop().call_soon_threadsafe(_complete, future, result, error)
+
+def _flush_commits(commits: List[_Commit]) -> None:
+    """Valida cada pedido contra el stock actual y guarda los aceptados en una sola escritura."""
+    if not commits:
+        return
+    stock = {p.id: p.stock for p in io_utils.read_inventory()}
+    accepted: List[_Commit] = []
+    for c in commits:
+        try:
+            _check_stock(stock, c.deltas)
+        except ValueError as e:
+            _resolve(c.future, error=e)
+            continue
+        for pid, delta in c.deltas.items():
+            if pid in stock:
+                stock[pid] += delta
+        accepted.append(c)
+    if not accepted:
+        return
+
+    deltas: Dict[int, int] = {}
+    invoices: List[Invoice] = []
+    removed_ids: List[int] = []
+    for c in accepted:
+        for pid, delta in c.deltas.items():
+            deltas[pid] = deltas.get(pid, 0) + delta
+        invoices.extend(c.invoices)
+        removed_ids.extend(c.removed_ids)
+    try:
+        io_utils.commit_invoices({pid: d for pid, d in deltas.items() if d}, invoices, removed_ids)
+    except Exception as e:
+        for c in accepted:
+            _resolve(c.future, error=e)
+        return
+    for c in accepted:
+        _resolve(c.future)
+
+def run_batch(batch: List[Tuple[str, List[Any], asyncio.Future]]) -> None:
+    """Aplica un lote de escrituras en orden de llegada."""
+    pending: List[_Commit] = []
+    pending_ids: set = set()
+    for op, args, future in batch:
+        if op == "commit_invoices":
+            try:
+                commit = _Commit(args, future)
+            except (KeyError, TypeError, ValueError) as e:
+                _resolve(future, error=ValueError(f"Pedido invalido: {e}"))
+                continue
+            # Dos cambios a la misma factura no van en la misma escritura (los
+            # listeners necesitan la version anterior de cada uno)
+            if commit.ids() & pending_ids:
+                _flush_commits(pending)
+                pending, pending_ids = [], set()
+            pending.append(commit)
+            pending_ids |= commit.ids()
+            continue
+        _flush_commits(pending)
+        pending, pending_ids = [], set()
+        try:
+            _resolve(future, WRITE_OPS[op](*args))
+        except Exception as e:
+            _resolve(future, error=e)
+    _flush_commits(pending)
+
+class Server:
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # Identifica esta ejecucion: un cliente no reutiliza la cache de un servidor anterior
+        self.instance = int(time.time() * 1000)
+        self.batches = 0
+        self.writes = 0
+
+    async def writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < BATCH_MAX and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            if io_utils.STORAGE_BACKEND == "archivos":
+                # Un lote a la vez: el orden de las escrituras no cambia
+                await loop.run_in_executor(None, run_batch, batch)
+            else:
+                run_batch(batch)
+            self.batches += 1
+            self.writes += len(batch)
+
+    async def dispatch(self, op: str, args: List[Any]) -> Any:
+        if op == "inventory_version":
+            return [self.instance, io_utils.inventory_version()]
+        if op == "read_inventory":
+            reply = _read_inventory()
+            reply["version"] = [self.instance, reply["version"]]
+            return reply
+        if op in READ_OPS:
+            return READ_OPS[op](*args)
+        if op in WRITE_OPS or op == "commit_invoices":
+            future = asyncio.get_running_loop().create_future()
+            await self.queue.put((op, args, future))
+            return await future
+        raise ValueError(f"Operacion desconocida: {op}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    result = await self.dispatch(request["op"], request.get("args") or [])
+                    reply = {"ok": result}
+                except Exception as e:
+                    reply = {"error": str(e), "tipo": type(e).__name__}
+                writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(address: str = SERVER_ADDRESS) -> None:
+    host, port = parse_address(address)
+    io_utils.ensure_files_exist()
+    server = Server()
+    writer_task = asyncio.create_task(server.writer())
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_MESSAGE)
+    print(f"Servidor de facturacion escuchando en {host}:{port} (backend: {io_utils.STORAGE_BACKEND}).")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        writer_task.cancel()
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor local de inventario y facturas.")
+    parser.add_argument("--direccion", default=SERVER_ADDRESS, help="host:puerto")
+    parser.add_argument("--backend", choices=("archivos", "sqlite"),
+                        default=io_utils.STORAGE_BACKEND if io_utils.STORAGE_BACKEND != "servidor" else "archivos")
+    args = parser.parse_args(argv)
+    io_utils.use_backend(args.backend)
+    try:
+        asyncio.run(serve(args.direccion))
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import json
+from typing import Any, Callable, Tuple
+from io_utils import _file_signature
+
+# Estado derivado de las facturas (agregados de reportes, indices): un archivo
+# JSON completo mas un journal de cambios, una linea JSON por cambio. Cuando el
+# journal pasa de compact_bytes se incorpora al archivo completo.
+#
+# Si no hay ni archivo ni journal, load() lo arma desde el historial con
+# build(). Los cambios que llegan antes no se anotan: el historial ya los tiene.
+
+class SnapshotStore:
+    def __init__(self, path: str, journal_path: str, compact_bytes: int,
+                 empty: Callable[[], Any], decode: Callable[[Any], Any], encode: Callable[[Any], Any],
+                 apply: Callable[[Any, Any], None], build: Callable[[], Tuple[Any, int]]) -> None:
+        self.path = path
+        self.journal_path = journal_path
+        self.compact_bytes = compact_bytes
+        self.empty = empty
+        self.decode = decode    # JSON del archivo completo -> estado
+        self.encode = encode    # estado -> JSON del archivo completo
+        self.apply = apply      # aplica un cambio del journal al estado
+        self.build = build      # (estado, registros) recorriendo el historial
+        # Estado en memoria y firma de los archivos con la que se leyo
+        self.signature = None
+        self.data = None
+
+    def _signature(self) -> Any:
+        return (_file_signature(self.path), _file_signature(self.journal_path))
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def load(self) -> Any:
+        sig = self._signature()
+        if self.data is not None and self.signature == sig:
+            return self.data
+        if not self.exists():
+            # Primera vez: construir desde el historial existente
+            self.rebuild()
+            return self.data
+        data = self.empty()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                try:
+                    data = self.decode(json.load(f))
+                except (ValueError, KeyError, TypeError):
+                    # Archivo corrupto: se puede recuperar con rebuild()
+                    data = self.empty()
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.apply(data, json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # Ignorar líneas corruptas
+                        continue
+        self.signature = sig
+        self.data = data
+        return data
+
+    def save(self, data: Any) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.encode(data), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.signature = self._signature()
+        self.data = data
+
+    def append(self, change: Any) -> None:
+        """Anota el cambio en el journal y lo aplica al estado en memoria."""
+        if not self.exists():
+            # Sin estado todavia: load() lo arma desde el historial, que ya tiene
+            # este cambio y el resto de su transaccion
+            return
+        data = self.load()
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(change, ensure_ascii=False) + "\n")
+        self.apply(data, change)
+        self.signature = self._signature()
+        if os.path.getsize(self.journal_path) > self.compact_bytes:
+            self.save(data)
+
+    def rebuild(self) -> int:
+        """Recalcula el estado desde el historial; devuelve cuantos registros leyo."""
+        data, count = self.build()
+        self.save(data)
+        return count
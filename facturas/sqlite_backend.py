@@ -0,0 +1,235 @@
+import os
+import sqlite3
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from models import Product, Invoice, InvoiceItem, to_cents, from_cents
+
+# Base de datos local usada cuando FACTURAS_BACKEND=sqlite
+DB_FILE = os.environ.get("FACTURAS_DB", "facturacion.db")
+
+# Misma politica de fsync que el log de archivos (ver io_utils.FSYNC_POLICY)
+FSYNC_POLICY = os.environ.get("FACTURAS_FSYNC", "siempre")
+SYNCHRONOUS = {"siempre": "FULL", "intervalo": "NORMAL", "nunca": "OFF"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    precio REAL NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos (nombre COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS facturas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    cliente TEXT NOT NULL,
+    subtotal REAL NOT NULL,
+    iva REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_facturas_fecha ON facturas (fecha);
+CREATE INDEX IF NOT EXISTS idx_facturas_cliente ON facturas (cliente COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS factura_items (
+    factura_id INTEGER NOT NULL REFERENCES facturas (id) ON DELETE CASCADE,
+    linea INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    product_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    line_total REAL NOT NULL,
+    PRIMARY KEY (factura_id, linea)
+);
+CREATE INDEX IF NOT EXISTS idx_items_producto ON factura_items (product_id);
+
+CREATE TABLE IF NOT EXISTS secuencias (
+    nombre TEXT PRIMARY KEY,
+    ultimo INTEGER NOT NULL
+);
+"""
+
+HEADER_COLUMNS = "id, fecha, cliente, subtotal, iva, total"
+
+_conn: Optional[sqlite3.Connection] = None
+_conn_path = DB_FILE
+
+# Cache del inventario: (version, productos)
+_inventory_cache: Optional[Tuple[Any, List[Product]]] = None
+
+# Escrituras hechas por esta conexion (data_version solo cambia con otras conexiones)
+_local_writes = 0
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    global _conn, _conn_path
+    if _conn is None or path is not None:
+        if _conn is not None:
+            _conn.close()
+        _conn_path = path or DB_FILE
+        _conn = sqlite3.connect(_conn_path)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(f"PRAGMA synchronous={SYNCHRONOUS.get(FSYNC_POLICY, 'FULL')}")
+        _conn.execute("PRAGMA foreign_keys=ON")
+        _conn.executescript(SCHEMA)
+    return _conn
+
+def _touch() -> None:
+    global _local_writes
+    _local_writes += 1
+
+def inventory_version() -> Any:
+    con = connect()
+    return (con.execute("PRAGMA data_version").fetchone()[0], _local_writes)
+
+def clear_cache() -> None:
+    global _inventory_cache
+    _inventory_cache = None
+
+def ensure_files_exist() -> None:
+    connect()
+
+# El dinero se guarda como REAL (igual que en los archivos); en memoria va en centavos
+
+def _product(row: Tuple) -> Product:
+    return Product(row[0], row[1], to_cents(row[2]), row[3])
+
+def read_inventory() -> List[Product]:
+    global _inventory_cache
+    version = inventory_version()
+    if _inventory_cache is None or _inventory_cache[0] != version:
+        rows = connect().execute("SELECT id, nombre, precio, stock FROM productos ORDER BY id")
+        _inventory_cache = (version, [_product(r) for r in rows])
+    return [p.copy() for p in _inventory_cache[1]]
+
+def write_inventory(products: List[Product]) -> None:
+    con = connect()
+    with con:
+        con.execute("DELETE FROM productos")
+        con.executemany(
+            "INSERT INTO productos (id, nombre, precio, stock) VALUES (?, ?, ?, ?)",
+            [(p.id, p.nombre, p.precio, p.stock) for p in products],
+        )
+    _touch()
+
+def _apply_inventory_changes(con: sqlite3.Connection, stock_deltas: Dict[int, int], price_changes: Dict[int, int]) -> None:
+    con.executemany(
+        "UPDATE productos SET stock = stock + ? WHERE id = ?",
+        [(delta, pid) for pid, delta in stock_deltas.items() if delta],
+    )
+    con.executemany(
+        "UPDATE productos SET precio = ? WHERE id = ?",
+        [(from_cents(precio_cents), pid) for pid, precio_cents in price_changes.items()],
+    )
+
+def apply_inventory_changes(stock_deltas: Dict[int, int], price_changes: Optional[Dict[int, int]] = None) -> None:
+    con = connect()
+    with con:
+        _apply_inventory_changes(con, stock_deltas, price_changes or {})
+    _touch()
+
+def compact_inventory() -> None:
+    # Los cambios ya se aplican en sitio
+    pass
+
+def _header(row: Tuple) -> Invoice:
+    return Invoice(row[0], row[1], row[2], None, to_cents(row[3]), to_cents(row[4]), to_cents(row[5]))
+
+def _items(con: sqlite3.Connection, iid: int) -> List[InvoiceItem]:
+    rows = con.execute(
+        "SELECT product_id, product_name, quantity, unit_price, line_total FROM factura_items "
+        "WHERE factura_id = ? ORDER BY linea",
+        (iid,),
+    )
+    return [InvoiceItem(r[0], r[1], r[2], to_cents(r[3]), to_cents(r[4])) for r in rows]
+
+def _invoice(con: sqlite3.Connection, row: Tuple) -> Invoice:
+    inv = _header(row)
+    inv.items = _items(con, inv.id)
+    return inv
+
+def _insert_invoice(con: sqlite3.Connection, inv: Invoice) -> None:
+    con.execute(
+        f"INSERT OR REPLACE INTO facturas ({HEADER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+        (inv.id, inv.fecha, inv.cliente, inv.subtotal, inv.iva, inv.total),
+    )
+    con.execute("DELETE FROM factura_items WHERE factura_id = ?", (inv.id,))
+    con.executemany(
+        "INSERT INTO factura_items (factura_id, linea, product_id, product_name, quantity, unit_price, line_total) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (inv.id, n, it.product_id, it.product_name, it.quantity, it.unit_price, it.line_total)
+            for n, it in enumerate(inv.items)
+        ],
+    )
+
+def read_invoices() -> List[Invoice]:
+    return list(iter_invoices())
+
+def write_invoices(invoices: List[Invoice]) -> None:
+    con = connect()
+    with con:
+        con.execute("DELETE FROM factura_items")
+        con.execute("DELETE FROM facturas")
+        for inv in invoices:
+            _insert_invoice(con, inv)
+
+def vacuum_invoices() -> Tuple[int, int]:
+    con = connect()
+    before = os.path.getsize(_conn_path)
+    con.execute("VACUUM")
+    return before, os.path.getsize(_conn_path)
+
+def iter_invoices(from_id: Optional[int] = None, headers_only: bool = False,
+                  desde: str = "", hasta: str = "") -> Iterator[Invoice]:
+    con = connect()
+    # "~" ordena despues de cualquier hora: hasta incluye el dia completo
+    rows = con.execute(
+        f"SELECT {HEADER_COLUMNS} FROM facturas WHERE id >= ? AND fecha >= ? AND fecha <= ? ORDER BY id",
+        (from_id if from_id is not None else -(2 ** 63), desde, (hasta or "9999") + "~"),
+    )
+    for row in rows:
+        yield _header(row) if headers_only else _invoice(con, row)
+
+def count_invoices() -> int:
+    return connect().execute("SELECT COUNT(*) FROM facturas").fetchone()[0]
+
+def month_summaries() -> List[Dict[str, Any]]:
+    rows = connect().execute(
+        "SELECT substr(fecha, 1, 7) AS mes, COUNT(*), SUM(subtotal), SUM(iva), SUM(total),"
+        " MIN(id), MAX(id), MIN(fecha), MAX(fecha) FROM facturas GROUP BY mes ORDER BY mes"
+    )
+    return [
+        {"mes": mes, "facturas": count, "subtotal": round(subtotal, 2), "iva": round(iva, 2),
+         "total": round(total, 2), "min_id": min_id, "max_id": max_id, "desde": desde, "hasta": hasta}
+        for mes, count, subtotal, iva, total, min_id, max_id, desde, hasta in rows
+    ]
+
+def get_invoice(iid: int, headers_only: bool = False) -> Optional[Invoice]:
+    con = connect()
+    row = con.execute(f"SELECT {HEADER_COLUMNS} FROM facturas WHERE id = ?", (iid,)).fetchone()
+    if row is None:
+        return None
+    return _header(row) if headers_only else _invoice(con, row)
+
+def commit_invoices(stock_deltas: Dict[int, int], invoices: List[Invoice] = (), removed_ids: List[int] = ()) -> None:
+    # Stock y facturas en una sola transaccion
+    con = connect()
+    with con:
+        _apply_inventory_changes(con, stock_deltas, {})
+        for inv in invoices:
+            _insert_invoice(con, inv)
+        con.executemany("DELETE FROM facturas WHERE id = ?", [(iid,) for iid in removed_ids])
+    _touch()
+
+def _recover_sequence(con: sqlite3.Connection, sequence: str) -> int:
+    table = "productos" if sequence == "productos" else "facturas"
+    return con.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+def next_id(sequence: str, count: int = 1) -> int:
+    con = connect()
+    with con:
+        # Bloquear escrituras de otras conexiones mientras se reserva el id
+        con.execute("BEGIN IMMEDIATE")
+        row = con.execute("SELECT ultimo FROM secuencias WHERE nombre = ?", (sequence,)).fetchone()
+        last = row[0] if row is not None else _recover_sequence(con, sequence)
+        con.execute("INSERT OR REPLACE INTO secuencias (nombre, ultimo) VALUES (?, ?)", (sequence, last + count))
+    return last + 1
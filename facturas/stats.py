@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import atexit
+import functools
+import contextlib
+from typing import Any, Callable, Dict, List
+
+# Instrumentacion: tiempo, bytes leidos/escritos, registros y aciertos de cache
+# por operacion. Se activa con FACTURAS_STATS=1 antes de iniciar; con
+# FACTURAS_STATS_FILE=ruta.json ademas se vuelca a JSON al salir.
+#
+# Desactivada, timed() devuelve la funcion original (costo cero) y los
+# contadores se saltan con `if stats.ENABLED`.
+
+STATS_FILE = os.environ.get("FACTURAS_STATS_FILE", "")
+ENABLED = os.environ.get("FACTURAS_STATS", "") not in ("", "0") or bool(STATS_FILE)
+
+COUNTERS = ("bytes_leidos", "bytes_escritos", "registros", "cache_hits", "cache_misses")
+
+# Contadores fuera de cualquier operacion medida
+OUTSIDE = "(sin operacion)"
+
+# nombre -> llamadas, tiempo total, maximo y contadores
+_ops: Dict[str, Dict[str, Any]] = {}
+
+# Operaciones en curso; los contadores se asignan a la mas interna
+_stack: List[str] = []
+
+# Segundos esperando en prompt(): se descuentan del tiempo de las operaciones
+_waiting = [0.0]
+
+_NULL_SPAN = contextlib.nullcontext()
+
+def _entry(name: str) -> Dict[str, Any]:
+    entry = _ops.get(name)
+    if entry is None:
+        entry = _ops[name] = {"llamadas": 0, "tiempo_s": 0.0, "max_ms": 0.0}
+        entry.update((c, 0) for c in COUNTERS)
+    return entry
+
+def _record(name: str, elapsed: float) -> None:
+    entry = _entry(name)
+    entry["llamadas"] += 1
+    entry["tiempo_s"] += elapsed
+    entry["max_ms"] = max(entry["max_ms"], elapsed * 1000)
+
+def add(counter: str, n: int = 1) -> None:
+    """Suma n al contador de la operacion en curso."""
+    _entry(_stack[-1] if _stack else OUTSIDE)[counter] += n
+
+class _Span:
+    __slots__ = ("name", "start", "waited")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        _stack.append(self.name)
+        self.waited = _waiting[0]
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        _record(self.name, time.perf_counter() - self.start - (_waiting[0] - self.waited))
+        _stack.pop()
+
+def span(name: str) -> Any:
+    """Mide un bloque: `with stats.span("io_utils.json_encode"): ...`."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorador que mide cada llamada; sin efecto si la instrumentacion esta apagada."""
+    def decorate(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+        # Importacion diferida: inspect es caro de importar y solo hace falta con la instrumentacion activa
+        import inspect
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                # Solo cuenta el tiempo dentro del generador, no el del consumidor
+                gen = fn(*args, **kwargs)
+                elapsed = 0.0
+                try:
+                    while True:
+                        s = _Span(name)
+                        s.__enter__()
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - s.start
+                            _stack.pop()
+                        yield item
+                finally:
+                    gen.close()
+                    _record(name, elapsed)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def prompt(text: str = "") -> str:
+    """input() para usar dentro de operaciones medidas: la espera no se cuenta en su tiempo."""
+    if not ENABLED:
+        return input(text)
+    start = time.perf_counter()
+    try:
+        return input(text)
+    finally:
+        _waiting[0] += time.perf_counter() - start
+
+def snapshot() -> Dict[str, Any]:
+    ops = {}
+    for name, entry in _ops.items():
+        ops[name] = dict(entry, tiempo_s=round(entry["tiempo_s"], 6), max_ms=round(entry["max_ms"], 3))
+    return {"espera_input_s": round(_waiting[0], 3), "operaciones": ops}
+
+def reset() -> None:
+    _ops.clear()
+    _waiting[0] = 0.0
+
+def dump(path: str = "") -> None:
+    with open(path or STATS_FILE, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=2)
+
+def show_stats() -> None:
+    if not ENABLED:
+        print("Estadisticas desactivadas (iniciar con FACTURAS_STATS=1).")
+        return
+    if not _ops:
+        print("Sin operaciones registradas.")
+        return
+    print("\n=== Estadisticas ===")
+    print(f'{"Operacion":<32} {"Llamadas":>8} {"Total ms":>10} {"Media ms":>9} {"Max ms":>9} '
+          f'{"Leido KB":>9} {"Escrito KB":>10} {"Registros":>9} {"Cache":>9}')
+    for name, e in sorted(_ops.items(), key=lambda kv: kv[1]["tiempo_s"], reverse=True):
+        calls = e["llamadas"]
+        total = e["tiempo_s"] * 1000
+        cache = f'{e["cache_hits"]}/{e["cache_hits"] + e["cache_misses"]}'
+        print(f'{name:<32} {calls:>8} {total:>10.2f} {total / calls if calls else 0:>9.3f} {e["max_ms"]:>9.3f} '
+              f'{e["bytes_leidos"] / 1024:>9.1f} {e["bytes_escritos"] / 1024:>10.1f} {e["registros"]:>9} {cache:>9}')
+    print(f'Espera en input(): {_waiting[0]:.1f} s (excluida de los tiempos)\n')
+
+if ENABLED and STATS_FILE:
+    atexit.register(dump)